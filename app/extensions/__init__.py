@@ -19,6 +19,7 @@ logging = Logging()
 
 import flask.json  # NOQA
 
+import sqlalchemy  # NOQA
 from .flask_sqlalchemy import SQLAlchemy  # NOQA
 from sqlalchemy.ext import mutable  # NOQA
 from sqlalchemy.types import TypeDecorator, CHAR  # NOQA
@@ -340,6 +341,9 @@ class GhostModel(object):
     """
 
 
+LOAD_MULTIPLE_BATCH_SIZE = 500
+
+
 class FeatherModel(GhostModel, TimestampViewed):
     """
     A light-weight model that 1) stores critical information concerning security
@@ -406,17 +410,105 @@ class FeatherModel(GhostModel, TimestampViewed):
         return query
 
     @classmethod
-    def query_search_term_hook(cls, term):
+    def query_search_columns(cls):
+        """Columns matched by ``query_search``, override to search other columns"""
+        return (cls.guid,)
+
+    @classmethod
+    def query_search_document(cls):
+        """
+        All the searchable columns concatenated into one expression.
+
+        Search terms never contain spaces, so a term is contained in the document
+        exactly when it is contained in one of the columns.  Matching on a single
+        expression lets ``search_trigram_index`` build one trigram index serving
+        every ``LIKE '%term%'`` instead of scanning each column.
+        """
         from sqlalchemy_utils.functions import cast_if
-        from sqlalchemy import String
+        from sqlalchemy import String, func, literal_column
 
-        return (cast_if(cls.guid, String).contains(term),)
+        document = None
+        for column in cls.query_search_columns():
+            part = func.coalesce(cast_if(column, String), literal_column("''"))
+            if document is None:
+                document = part
+            else:
+                document = document + literal_column("' '") + part
+        return document
+
+    @classmethod
+    def query_search_term_hook(cls, term):
+        return (cls.query_search_document().contains(term),)
 
     @classmethod
     def get_multiple(cls, guids):
         if not guids or not isinstance(guids, list) or len(guids) < 1:
             return []
-        return cls.query.filter(cls.guid.in_(guids)).all()
+        objs = {}
+        for obj in cls.load_multiple(guids):
+            if obj is not None:
+                objs.setdefault(obj.guid, obj)
+        return list(objs.values())
+
+    @classmethod
+    def load_multiple(cls, guids, batch_size=LOAD_MULTIPLE_BATCH_SIZE):
+        """
+        Returns the objects for ``guids`` in the same order, ``None`` for misses.
+
+        Objects already in the session identity map, or loaded earlier in the
+        same request (application context), are not queried again.  The rest
+        are fetched with one ``IN`` query per ``batch_size`` guids.
+        """
+        from flask import g, has_app_context
+        from sqlalchemy import inspect
+        from sqlalchemy.orm import object_session
+
+        mapper = inspect(cls)
+        session = db.session()
+        cache = None
+        if has_app_context():
+            cache = g.setdefault('_load_multiple_cache', {})
+
+        def identity_key(guid):
+            return mapper.identity_key_from_primary_key([guid])
+
+        def is_usable(obj):
+            return (
+                isinstance(obj, cls)
+                and inspect(obj).persistent
+                and object_session(obj) is session
+            )
+
+        keys = []
+        for guid in guids:
+            try:
+                keys.append(uuid.UUID(str(guid)))
+            except ValueError:
+                keys.append(None)
+
+        found = {}
+        missing = {}
+        for guid in keys:
+            if guid is None or guid in found or guid in missing:
+                continue
+            key = identity_key(guid)
+            obj = session.identity_map.get(key)
+            if obj is None and cache is not None:
+                obj = cache.get(key)
+            if obj is not None and is_usable(obj):
+                found[guid] = obj
+            else:
+                missing[guid] = None
+
+        missing = list(missing)
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start : start + batch_size]
+            for obj in cls.query.filter(cls.guid.in_(batch)):
+                found[obj.guid] = obj
+                if cache is not None:
+                    cache[identity_key(obj.guid)] = obj
+
+        return [found.get(guid) for guid in keys]
 
 
 class HoustonModel(FeatherModel):
@@ -432,6 +524,36 @@ class HoustonModel(FeatherModel):
     """
 
 
+def search_trigram_index(model):
+    """
+    Index for ``model.query_search``, a trigram (GIN) index on PostgreSQL.
+
+    The indexed expression is ``model.query_search_document()``, so every column
+    returned by ``model.query_search_columns()`` must belong to the model's own
+    table.  Other databases get a plain expression index.
+    """
+    table = model.__table__
+    index = db.Index(
+        'ix_%s_search_trgm' % (table.name,),
+        model.query_search_document().label('search_document'),
+        postgresql_using='gin',
+        postgresql_ops={'search_document': 'gin_trgm_ops'},
+    )
+    # Expression indexes are not attached to their table automatically
+    table.append_constraint(index)
+    return index
+
+
+# The trigram operator class used by ``search_trigram_index``
+sqlalchemy.event.listen(
+    db.metadata,
+    'before_create',
+    sqlalchemy.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+        dialect='postgresql'
+    ),
+)
+
+
 ##########################################################################################
 
 
@@ -477,6 +599,162 @@ def parallel(worker_func, args_list, kwargs_list=None, thread=True, workers=None
     return results
 
 
+def _parallel_chunk(worker_func, chunk):
+    # Runs a chunk of calls in a worker, capturing each call's outcome so that
+    # one failure does not lose the results of the rest of the chunk
+    outcomes = []
+    for args, kwargs in chunk:
+        try:
+            outcomes.append((True, worker_func(*args, **kwargs)))
+        except Exception as exception:  # pylint: disable=broad-except
+            outcomes.append((False, exception))
+    return outcomes
+
+
+class _ParallelProgress(object):
+    """Progress reporting for ``parallel_iter``, with tqdm or (headless) logging"""
+
+    def __init__(self, progress, total=None, log_every=None):
+        self.progress = progress
+        self.total = total
+        self.count = 0
+        self.bar = None
+        if progress is True:
+            import tqdm
+
+            self.bar = tqdm.tqdm(total=total)
+        if log_every is None:
+            log_every = max(1, total // 10) if total else 1000
+        self.log_every = log_every
+
+    def update(self):
+        self.count += 1
+        if self.bar is not None:
+            self.bar.update()
+        elif self.progress == 'log' and self.count % self.log_every == 0:
+            total = f'/{self.total}' if self.total else ''
+            logging_native.getLogger(__name__).info(
+                f'parallel: completed {self.count}{total}'
+            )
+
+    def close(self):
+        if self.bar is not None:
+            self.bar.close()
+        elif self.progress == 'log':
+            logging_native.getLogger(__name__).info(
+                f'parallel: finished {self.count} tasks'
+            )
+
+
+def parallel_iter(
+    worker_func,
+    args_list,
+    kwargs_list=None,
+    thread=True,
+    workers=None,
+    in_flight=None,
+    chunksize=1,
+    ordered=False,
+    progress=False,
+    total=None,
+    errors=None,
+):
+    """
+    Streaming version of ``parallel()``.
+
+    ``args_list`` (and ``kwargs_list``) may be any iterable, including a
+    generator, and is consumed lazily: at most ``in_flight`` chunks of
+    ``chunksize`` calls are submitted at any time.  Results are yielded as
+    they complete, or in input order when ``ordered`` is True.
+
+    Use ``thread=False`` with a ``chunksize`` larger than 1 for CPU-bound work,
+    so each process pool submission carries several calls.  ``workers``
+    defaults to ``cpu_count()`` for processes and to ``cpu_count() + 4``
+    (capped at 32) for threads, which suits I/O-bound calls.
+
+    ``progress`` is True for a tqdm bar, ``'log'`` to report progress through
+    logging (headless) or False for no reporting; ``total`` is only used for
+    reporting.
+
+    If ``errors`` is a list, failed calls are appended to it as
+    ``(args, kwargs, exception)`` tuples and the remaining results are still
+    yielded; otherwise the first failure is raised.
+    """
+    from concurrent.futures import (
+        FIRST_COMPLETED,
+        ProcessPoolExecutor,
+        ThreadPoolExecutor,
+        wait,
+    )
+    import itertools
+    import multiprocessing
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+        if thread:
+            workers = min(32, workers + 4)
+
+    if in_flight is None:
+        in_flight = workers * 2
+
+    if kwargs_list is None:
+        kwargs_list = itertools.repeat({})
+
+    calls = zip(args_list, kwargs_list)
+    chunks = iter(lambda: list(itertools.islice(calls, chunksize)), [])
+
+    executor = ThreadPoolExecutor if thread else ProcessPoolExecutor
+    reporter = _ParallelProgress(progress, total=total)
+
+    with executor(max_workers=workers) as pool:
+        pending = {}
+        completed = {}
+        submitted = 0
+        next_index = 0
+        exhausted = False
+
+        while True:
+            # Keep the pool fed without holding more than ``in_flight`` chunks
+            while not exhausted and len(pending) + len(completed) < in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                future = pool.submit(_parallel_chunk, worker_func, chunk)
+                pending[future] = (submitted, chunk)
+                submitted += 1
+
+            if not pending and not completed:
+                break
+
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, chunk = pending.pop(future)
+                    completed[index] = (chunk, future.result())
+
+            if ordered:
+                ready = []
+                while next_index in completed:
+                    ready.append(next_index)
+                    next_index += 1
+            else:
+                ready = sorted(completed)
+
+            for index in ready:
+                chunk, outcomes = completed.pop(index)
+                for (args, kwargs), (success, value) in zip(chunk, outcomes):
+                    reporter.update()
+                    if success:
+                        yield value
+                    elif errors is None:
+                        raise value
+                    else:
+                        errors.append((args, kwargs, value))
+
+    reporter.close()
+
+
 ##########################################################################################
 
 
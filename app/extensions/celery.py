@@ -26,6 +26,9 @@ except RuntimeError:
 if is_module_enabled('job_control'):
     import app.modules.job_control.tasks  # noqa
 
+if is_module_enabled('assets'):
+    import app.modules.assets.tasks  # noqa
+
 if is_module_enabled('asset_groups'):
     import app.modules.asset_groups.tasks  # noqa
 
@@ -9,10 +9,10 @@ from flask import current_app, request, session, render_template  # NOQA
 from flask_login import current_user  # NOQA
 from app.extensions import db
 from app.extensions.restManager.RestManager import RestManager
+from app.extensions.edm.cache import EDMDataCache, find_guids
 from app.utils import HoustonException
 
 import types
-import tqdm
 import keyword
 import uuid
 import sqlalchemy
@@ -98,8 +98,40 @@ class EDMManager(RestManager):
     # fmt: on
 
     def __init__(self, pre_initialize=False, *args, **kwargs):
+        self.data_cache = EDMDataCache()
         super(EDMManager, self).__init__(pre_initialize, *args, **kwargs)
 
+    def get_dict_cached(self, list_name, guid, version, target='default'):
+        """
+        get_dict() served from the data cache while ``version``, the local version
+        of the object, is the one the cached document was fetched for
+        """
+        # Taken before the fetch, so a change made meanwhile isn't cached over
+        generation = self.data_cache.get_generation()
+        response = self.data_cache.get(target, list_name, guid, version)
+        if response is None:
+            response = self.get_dict(list_name, guid, target=target)
+            if isinstance(response, dict) and response.get('success', False):
+                self.data_cache.set(
+                    target, list_name, guid, version, response, generation
+                )
+        return response
+
+    def request_passthrough(
+        self, tag, method, passthrough_kwargs, args=None, target='default'
+    ):
+        try:
+            return super(EDMManager, self).request_passthrough(
+                tag, method, passthrough_kwargs, args=args, target=target
+            )
+        finally:
+            if method.lower() != 'get':
+                # Drop the cached documents of (or embedding) the objects changed
+                guids = find_guids(args)
+                for key in ('data', 'json'):
+                    guids |= find_guids(passthrough_kwargs.get(key))
+                self.data_cache.invalidate(guids)
+
     def version_check(self):
         edm_version = self.get_dict('version.dict', None)
         if edm_version is None or 'date' not in edm_version:
@@ -222,9 +254,95 @@ class EDMManager(RestManager):
         return result
 
 
+def _read_sync_checkpoint(checkpoint):
+    """Guids recorded in a sync checkpoint file, one per line"""
+    import os
+
+    guids = set()
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return guids
+    with open(checkpoint) as checkpoint_file:
+        for line in checkpoint_file:
+            try:
+                guids.add(uuid.UUID(line.strip()))
+            except ValueError:
+                # A partial line from an interrupted write
+                pass
+    return guids
+
+
+def _write_sync_checkpoint(checkpoint, guids):
+    if checkpoint is None:
+        return
+    with open(checkpoint, 'a') as checkpoint_file:
+        checkpoint_file.writelines(f'{guid}\n' for guid in guids)
+        checkpoint_file.flush()
+
+
 class EDMObjectMixin(object):
     @classmethod
-    def edm_sync_all(cls, verbose=True, refresh=False):
+    def edm_sync_plan(cls, edm_items, refresh=False, skip=None):
+        """
+        Diff the EDM list against the local versions, loaded with one query.
+
+        Returns the guids of the new items and the ``(guid, version)`` of all the
+        items to fetch (new ones included).
+        """
+        local_versions = dict(db.session.query(cls.guid, cls.version))
+        skip = skip or set()
+
+        new_guids = []
+        stale_items = []
+        for guid, item_version in edm_items.items():
+            version = item_version.get('version', None)
+            assert version is not None
+            if guid in skip:
+                continue
+
+            is_new = guid not in local_versions
+            if is_new:
+                new_guids.append(guid)
+
+            if is_new or local_versions[guid] != version or refresh:
+                stale_items.append((guid, version))
+
+        return new_guids, stale_items
+
+    @classmethod
+    def edm_sync_all(
+        cls,
+        verbose=True,
+        refresh=False,
+        dry_run=False,
+        checkpoint=None,
+        batch_size=None,
+        workers=None,
+    ):
+        """
+        Sync all the EDM items of this class onto the local models.
+
+        The stale items are fetched concurrently by ``workers`` threads and are
+        committed in chunks of ``batch_size``.  When ``checkpoint`` is the path of
+        a file, the guids of the committed items are appended to it and skipped
+        by the next run, so an interrupted ``refresh`` can be resumed (without
+        ``refresh`` the synced versions already act as a checkpoint); the file is
+        removed once a sync completes without failed items.  With ``dry_run``
+        nothing is fetched or written and the new and updated items are returned
+        as guids.
+
+        Returns the EDM list and the new, updated and failed items; items that
+        could not be fetched are reported as failed guids.
+        """
+        import os
+
+        from app.extensions import parallel_iter
+
+        if batch_size is None:
+            batch_size = current_app.config.get('EDM_SYNC_BATCH_SIZE', 500)
+        if workers is None:
+            workers = current_app.config.get('EDM_SYNC_WORKERS', 8)
+        batch_size = max(1, int(batch_size))
+
         edm_items = current_app.edm.get_list('%s.list' % (cls.EDM_NAME,))
 
         if verbose:
@@ -233,37 +351,123 @@ class EDMObjectMixin(object):
                 % (len(edm_items), cls.EDM_NAME)
             )
 
-        new_items = []
-        stale_items = []
-        for guid in tqdm.tqdm(edm_items):
-            item_version = edm_items[guid]
-            version = item_version.get('version', None)
-            assert version is not None
+        done = _read_sync_checkpoint(checkpoint)
+        new_guids, stale_items = cls.edm_sync_plan(edm_items, refresh=refresh, skip=done)
 
-            model_obj, is_new = cls.ensure_edm_obj(guid)
-            if is_new:
-                new_items.append(model_obj)
+        if verbose or dry_run:
+            log.info(
+                f'{cls.EDM_NAME} sync{" (dry run)" if dry_run else ""}: '
+                f'{len(edm_items)} in EDM, {len(done)} already synced (checkpoint), '
+                f'{len(new_guids)} new, {len(stale_items) - len(new_guids)} stale'
+            )
 
-            if model_obj.version != version or refresh:
-                stale_items.append((model_obj, version))
+        if dry_run:
+            new_set = set(new_guids)
+            stale_guids = [guid for guid, version in stale_items if guid not in new_set]
+            return edm_items, new_guids, stale_guids, []
 
-        if verbose:
-            log.info(f'Added {len(new_items)} new {cls.EDM_NAME}s')
-            log.info(f'Updating {len(stale_items)} stale {cls.EDM_NAME}s using EDM...')
+        app = current_app._get_current_object()
+        item_name = '%s.data' % (cls.EDM_NAME,)
+
+        def fetch(guid, version):
+            with app.app_context():
+                return guid, version, cls._fetch_edm_data(guid, item_name)
 
+        new_set = set(new_guids)
+        new_items = []
         updated_items = []
         failed_items = []
-        for model_obj, version in tqdm.tqdm(stale_items):
-            try:
-                model_obj._sync_item(model_obj.guid, version)
-                updated_items.append(model_obj)
-            except sqlalchemy.exc.IntegrityError:
-                log.exception(f'Error updating {cls.EDM_NAME} {model_obj}')
 
-                failed_items.append(model_obj)
+        def apply_chunk(chunk):
+            new_, updated_, failed_ = cls._edm_sync_chunk(chunk, new_set)
+            new_items.extend(new_)
+            updated_items.extend(updated_)
+            failed_items.extend(failed_)
+            _write_sync_checkpoint(checkpoint, [obj.guid for obj in new_ + updated_])
+
+        errors = []
+        chunk = []
+        for result in parallel_iter(
+            fetch,
+            stale_items,
+            workers=workers,
+            progress=verbose,
+            total=len(stale_items),
+            errors=errors,
+        ):
+            chunk.append(result)
+            if len(chunk) >= batch_size:
+                apply_chunk(chunk)
+                chunk = []
+        if chunk:
+            apply_chunk(chunk)
+
+        for (guid, version), kwargs, exception in errors:
+            log.error(f'Could not fetch {cls.EDM_NAME} {guid} from EDM: {exception}')
+            failed_items.append(guid)
+
+        if checkpoint is not None and not failed_items and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        if verbose:
+            log.info(
+                f'Added {len(new_items)} new and updated {len(updated_items)} '
+                f'{cls.EDM_NAME}s ({len(failed_items)} failed)'
+            )
 
         return edm_items, new_items, updated_items, failed_items
 
+    @classmethod
+    def _edm_sync_chunk(cls, chunk, new_guids):
+        """Apply fetched ``(guid, version, data)`` in one transaction, falling back
+        to one transaction per item when the chunk fails"""
+        local_objs = {
+            obj.guid: obj
+            for obj in cls.query.filter(cls.guid.in_([guid for guid, _, _ in chunk]))
+        }
+
+        def apply_item(guid, version, data):
+            model_obj = local_objs.get(guid)
+            if model_obj is None:
+                model_obj, is_new = cls.ensure_edm_obj(guid)
+            model_obj._process_edm_data(data, version)
+            return model_obj
+
+        try:
+            with db.session.begin(subtransactions=True):
+                model_objs = [apply_item(*item) for item in chunk]
+        except sqlalchemy.exc.IntegrityError:
+            log.warning(f'Syncing a chunk of {cls.EDM_NAME}s failed, retrying one by one')
+            # The rollback expired the loaded objects and dropped the new ones
+            local_objs = {}
+            model_objs = []
+            failed_items = []
+            for guid, version, data in chunk:
+                try:
+                    with db.session.begin(subtransactions=True):
+                        model_objs.append(apply_item(guid, version, data))
+                except sqlalchemy.exc.IntegrityError:
+                    log.exception(f'Error updating {cls.EDM_NAME} {guid}')
+                    failed_items.append(guid)
+        else:
+            failed_items = []
+
+        new_items = [obj for obj in model_objs if obj.guid in new_guids]
+        updated_items = [obj for obj in model_objs if obj.guid not in new_guids]
+        return new_items, updated_items, failed_items
+
+    @classmethod
+    def _fetch_edm_data(cls, guid, item_name=None):
+        if item_name is None:
+            item_name = '%s.data' % (cls.EDM_NAME,)
+        response = current_app.edm.get_data_item(guid, item_name)
+
+        assert response.success
+        data = response.result
+
+        assert uuid.UUID(data.id) == guid
+        return data
+
     def _process_edm_attribute(self, data, edm_attribute):
         edm_attribute = edm_attribute.strip()
         edm_attribute = edm_attribute.strip('.')
@@ -338,7 +542,7 @@ class EDMObjectMixin(object):
         else:
             self.version = found_version
 
-        with db.session.begin():
+        with db.session.begin(subtransactions=True):
             db.session.merge(self)
 
         if found_version is None:
@@ -347,13 +551,7 @@ class EDMObjectMixin(object):
             log.info('Updating to found version %r' % (found_version,))
 
     def _sync_item(self, guid, version):
-        response = current_app.edm.get_data_item(guid, '%s.data' % (self.EDM_NAME,))
-
-        assert response.success
-        data = response.result
-
-        assert uuid.UUID(data.id) == guid
-
+        data = self._fetch_edm_data(guid)
         self._process_edm_data(data, version)
 
 
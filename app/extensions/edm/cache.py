@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Versioned read-through cache of EDM documents (e.g. ``sighting.data_complete``).
+
+A document is served from the cache while the local ``version`` of its object
+matches the one it was fetched for.  As documents embed other objects (a
+sighting embeds its encounters), the ids found in a document are indexed so
+changing any of them invalidates it too.
+
+A document fetched while an invalidation ran may predate the change, so
+``get_generation()`` is taken before fetching and ``set()`` drops the document
+if any invalidation happened since.
+"""
+import collections
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+from app.utils import LRUCache
+
+log = logging.getLogger(__name__)
+
+UUID_PATTERN = re.compile(
+    r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.IGNORECASE
+)
+
+REDIS_PREFIX = 'edm-data'
+REDIS_GENERATION_KEY = f'{REDIS_PREFIX}/generation'
+
+
+def find_guids(value):
+    """Guids mentioned in a value (e.g. a passthrough path or body)"""
+    if value is None:
+        return set()
+    if isinstance(value, uuid.UUID):
+        return {str(value)}
+    if not isinstance(value, str):
+        try:
+            value = json.dumps(value, default=str)
+        except (TypeError, ValueError):
+            value = str(value)
+    return set(guid.lower() for guid in UUID_PATTERN.findall(value))
+
+
+class EDMDataCache(object):
+    """
+    Redis cache of EDM documents when ``EDM_DATA_CACHE_REDIS`` is set, so the
+    documents (and their invalidations) are shared by all the processes.
+    Otherwise an in process LRU of ``EDM_DATA_CACHE_SIZE`` documents, which only
+    sees the changes made by its own process.
+    """
+
+    def __init__(self):
+        self._entries = None
+        # Guid to the cache keys of the documents containing it
+        self._dependents = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        # Number of invalidations, see get_generation()
+        self._generation = 0
+        self._redis = None
+        self.stats = collections.Counter()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name, count=1):
+        # The cache is shared by the threads of fan_out()
+        with self._stats_lock:
+            self.stats[name] += count
+
+    @property
+    def enabled(self):
+        if current_app.config.get('EDM_DATA_CACHE_REDIS', False):
+            return True
+        return current_app.config.get('EDM_DATA_CACHE_SIZE', 0) > 0
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = LRUCache(
+                maxsize=max(1, current_app.config.get('EDM_DATA_CACHE_SIZE', 0))
+            )
+        return self._entries
+
+    def _get_redis(self):
+        if not current_app.config.get('EDM_DATA_CACHE_REDIS', False):
+            return None
+        if self._redis is None:
+            import redis
+
+            self._redis = redis.from_url(current_app.config['REDIS_CONNECTION_STRING'])
+        return self._redis
+
+    def _redis_call(self, func):
+        # The cache works without Redis, so errors only cost a refetch
+        import redis
+
+        try:
+            return func(self._redis)
+        except redis.exceptions.RedisError:
+            log.warning('EDM data cache Redis error', exc_info=True)
+            self._count('redis_errors')
+            return None
+
+    def _get_key(self, target, tag, guid):
+        return f'{target}/{tag}/{str(guid).lower()}'
+
+    def get_generation(self):
+        """Taken before fetching a document, to be passed to ``set()``"""
+        if self._get_redis() is None:
+            with self._lock:
+                return self._generation
+        return self._redis_call(
+            lambda redis_: int(redis_.get(REDIS_GENERATION_KEY) or 0)
+        )
+
+    def get(self, target, tag, guid, version):
+        """The cached document, or None if missing or not of ``version``"""
+        if not self.enabled or version is None:
+            return None
+
+        key = self._get_key(target, tag, guid)
+        redis_key = f'{REDIS_PREFIX}/{key}'
+        if self._get_redis() is None:
+            entry = self.entries.get(key)
+        else:
+            value = self._redis_call(lambda redis_: redis_.get(redis_key))
+            entry = None if value is None else json.loads(value)
+
+        if entry is None:
+            self._count('misses')
+            return None
+        if entry['version'] != version or entry['expires'] < time.time():
+            self._count('stale')
+            if self._get_redis() is None:
+                self.entries.pop(key)
+            else:
+                self._redis_call(lambda redis_: redis_.delete(redis_key))
+            return None
+
+        self._count('hits')
+        # Decoded for each caller, as the callers modify the documents
+        return json.loads(entry['data'])
+
+    def set(self, target, tag, guid, version, document, generation):
+        """
+        Cache the document of ``version``, unless there was an invalidation since
+        ``generation`` was taken (see ``get_generation()``)
+        """
+        if not self.enabled or version is None or generation is None:
+            return
+
+        key = self._get_key(target, tag, guid)
+        data = json.dumps(document)
+        ttl = current_app.config.get('EDM_DATA_CACHE_TTL', 3600)
+        entry = {
+            'version': version,
+            'data': data,
+            'expires': time.time() + ttl,
+            'guids': sorted(find_guids(data) | {str(guid).lower()}),
+        }
+        if self._get_redis() is None:
+            stored = self._set_entry(key, entry, generation)
+        else:
+
+            def store(redis_):
+                import redis
+
+                with redis_.pipeline() as pipeline:
+                    # Not stored if an invalidation ran since, or runs meanwhile
+                    pipeline.watch(REDIS_GENERATION_KEY)
+                    if int(pipeline.get(REDIS_GENERATION_KEY) or 0) != generation:
+                        return False
+                    pipeline.multi()
+                    pipeline.set(f'{REDIS_PREFIX}/{key}', json.dumps(entry), ex=ttl)
+                    for dependency in entry['guids']:
+                        dependents_key = f'{REDIS_PREFIX}/dependents/{dependency}'
+                        pipeline.sadd(dependents_key, key)
+                        pipeline.expire(dependents_key, ttl)
+                    try:
+                        pipeline.execute()
+                    except redis.exceptions.WatchError:
+                        return False
+                return True
+
+            stored = self._redis_call(store)
+        if not stored:
+            self._count('dropped')
+
+    def _set_entry(self, key, entry, generation):
+        with self._lock:
+            if generation != self._generation:
+                return False
+            self.entries.set(key, entry)
+            for dependency in entry['guids']:
+                self._dependents[dependency].add(key)
+            if len(self._dependents) > 8 * self.entries.maxsize:
+                # Forget the documents evicted from the LRU
+                self._dependents.clear()
+                for key_, entry_ in self.entries.items():
+                    for dependency in entry_['guids']:
+                        self._dependents[dependency].add(key_)
+        return True
+
+    def invalidate(self, guids):
+        """Drop the documents of, or containing, any of the guids"""
+        guids = set(str(guid).lower() for guid in guids)
+        if not guids or not self.enabled:
+            return
+
+        if self._get_redis() is not None:
+
+            def delete(redis_):
+                # First, so documents being fetched or stored are dropped
+                redis_.incr(REDIS_GENERATION_KEY)
+                dependents_keys = [
+                    f'{REDIS_PREFIX}/dependents/{guid}' for guid in sorted(guids)
+                ]
+                redis_keys = set()
+                pipeline = redis_.pipeline()
+                for dependents_key in dependents_keys:
+                    pipeline.smembers(dependents_key)
+                for members in pipeline.execute():
+                    redis_keys |= set(member.decode() for member in members)
+                redis_.delete(
+                    *dependents_keys, *[f'{REDIS_PREFIX}/{key}' for key in redis_keys]
+                )
+                return len(redis_keys)
+
+            self._count('invalidations', self._redis_call(delete) or 0)
+        else:
+            keys = set()
+            with self._lock:
+                self._generation += 1
+                for guid in guids:
+                    keys |= self._dependents.pop(guid, set())
+                for key in keys:
+                    self.entries.pop(key)
+            self._count('invalidations', len(keys))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.entries.clear()
+            self._dependents.clear()
+
+    def get_stats(self):
+        names = ['hits', 'misses', 'stale', 'dropped', 'invalidations', 'redis_errors']
+        with self._stats_lock:
+            stats = {name: self.stats[name] for name in names}
+        lookups = stats['hits'] + stats['misses'] + stats['stale']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+        stats['redis'] = current_app.config.get('EDM_DATA_CACHE_REDIS', False)
+        if not stats['redis']:
+            # Counting the Redis entries would mean scanning the keys
+            stats['size'] = len(self.entries)
+        return stats
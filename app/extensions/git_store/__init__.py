@@ -8,6 +8,7 @@ import logging
 from flask import current_app, request, session, render_template  # NOQA
 from flask_login import current_user  # NOQA
 from app.extensions import db
+import sqlalchemy
 from app.utils import HoustonException
 import requests.exceptions
 import utool as ut
@@ -40,15 +41,30 @@ KEYWORD_SET = set(keyword.kwlist)
 log = logging.getLogger(__name__)
 
 
-def compute_xxhash64_digest_filepath(filepath):
+XXHASH64_CHUNK_SIZE = 1024 * 1024
+
+FILE_CACHE_FILENAME = 'houston_file_cache.json'
+
+
+def compute_xxhash64_digest_filepath(filepath, chunk_size=XXHASH64_CHUNK_SIZE):
+    # Hash the file incrementally so that at most chunk_size bytes are in
+    # memory, whatever the size of the file
     try:
         import xxhash
         import os
 
         assert os.path.exists(filepath)
 
-        with open(filepath, 'rb') as file_:
-            digest = xxhash.xxh64_hexdigest(file_.read())
+        hasher = xxhash.xxh64()
+        buffer_ = bytearray(chunk_size)
+        view = memoryview(buffer_)
+        with open(filepath, 'rb', buffering=0) as file_:
+            while True:
+                size = file_.readinto(buffer_)
+                if not size:
+                    break
+                hasher.update(view[:size])
+        digest = hasher.hexdigest()
     except Exception:  # pragma: no cover
         digest = None
     return digest
@@ -152,6 +168,11 @@ class GitStore(db.Model, HoustonModel):
 
     config = db.Column(db.JSON, default=lambda: {}, nullable=False)
 
+    # Messages of the changes queued by git_commit_delay() and not yet committed
+    pending_commit_messages = db.Column(db.JSON, default=lambda: [], nullable=True)
+    # Last commit known to be on the remote
+    pushed_commit = db.Column(db.String(length=40), nullable=True)
+
     __mapper_args__ = {
         'confirm_deleted_rows': False,
         'polymorphic_identity': 'gitstore',
@@ -185,6 +206,12 @@ class GitStore(db.Model, HoustonModel):
     def git_push_delay(self):
         raise NotImplementedError()
 
+    def git_commit_pending_delay(self):
+        raise NotImplementedError()
+
+    def ensure_remote(self):
+        raise NotImplementedError()
+
     def delete_remote_delay(self):
         raise NotImplementedError()
 
@@ -195,6 +222,16 @@ class GitStore(db.Model, HoustonModel):
     def bulk_upload(self):
         return isinstance(self.config, dict) and self.config.get('uploadType') == 'bulk'
 
+    @property
+    def git_state(self):
+        """One of ``pending`` (changes not committed yet), ``committed`` (commits
+        not pushed yet) or ``pushed``"""
+        if self.pending_commit_messages:
+            return 'pending'
+        if self.commit is not None and self.commit != self.pushed_commit:
+            return 'committed'
+        return 'pushed'
+
     @property
     def anonymous(self):
         return self.owner is User.get_public_user()
@@ -274,6 +311,20 @@ class GitStore(db.Model, HoustonModel):
             assert None not in [git_remote_public_name, git_remote_email]
             repo.git.config('user.name', git_remote_public_name)
             repo.git.config('user.email', git_remote_email)
+
+            # Store large files without delta compression, deltas of media
+            # files are expensive to compute and save next to nothing
+            big_file_threshold = current_app.config.get('GIT_BIG_FILE_THRESHOLD', None)
+            if big_file_threshold:
+                repo.git.config('core.bigFileThreshold', big_file_threshold)
+
+            lfs_patterns = current_app.config.get('GIT_LFS_PATTERNS', [])
+            if lfs_patterns:
+                if shutil.which('git-lfs'):
+                    repo.git.lfs('install', '--local')
+                    repo.git.lfs('track', *lfs_patterns)
+                else:
+                    log.warning('GIT_LFS_PATTERNS is set but git-lfs is not installed')
         else:
             repo = Repo(local_store_path)
 
@@ -361,6 +412,8 @@ class GitStore(db.Model, HoustonModel):
             json.dump(local_store_metadata, local_store_metadata_file)
 
         # repo.index.add('.gitignore')
+        if os.path.exists(os.path.join(local_store_path, '.gitattributes')):
+            repo.index.add('.gitattributes')
         repo.index.add('_assets/')
         repo.index.add('_%s/' % (self.GIT_STORE_NAME,))
         repo.index.add('metadata.json')
@@ -369,6 +422,96 @@ class GitStore(db.Model, HoustonModel):
 
         self.update_metadata_from_commit(commit)
 
+    def _lock_pending_commit_messages(self):
+        """
+        Reload the queued commit messages, locking the row until the end of the
+        transaction so concurrent updates of the queue don't overwrite each other
+        """
+        query = type(self).query.filter_by(guid=self.guid)
+        query.with_for_update().populate_existing().one()
+        return list(self.pending_commit_messages or [])
+
+    def git_commit_delay(self, message):
+        """
+        Queue a commit of the current changes to be made in the background
+
+        The Assets must already be up to date (see ``update_asset_symlinks()``).
+        Changes queued before the background commit runs are coalesced into a
+        single commit, see ``git_commit_pending()``.
+        """
+        with db.session.begin(subtransactions=True):
+            pending_commit_messages = self._lock_pending_commit_messages()
+            self.pending_commit_messages = pending_commit_messages + [message]
+
+        # Only the first change schedules a commit, later ones ride along with it
+        if not pending_commit_messages:
+            self.git_commit_pending_delay()
+
+    @classmethod
+    def git_commit_pending_sweep(cls):
+        """
+        Queue the commit of the stores that still have pending changes, in case
+        their commit task was lost or gave up, returns the number of stores
+        """
+        # Compared as text, as JSON values can't be compared in every database
+        pending_commit_messages = sqlalchemy.cast(cls.pending_commit_messages, db.String)
+        stores = cls.query.filter(pending_commit_messages.notin_(['[]', 'null'])).all()
+        for store in stores:
+            log.info(f'Queueing the commit of the pending changes of {store!r}')
+            store.git_commit_pending_delay()
+        return len(stores)
+
+    def git_commit_pending(self):
+        """
+        Commit the changes queued by ``git_commit_delay()`` and queue a push
+
+        Returns False if there was nothing to commit.
+        """
+        with db.session.begin(subtransactions=True):
+            messages = self._lock_pending_commit_messages()
+        if not messages:
+            return False
+
+        if len(messages) == 1:
+            message = messages[0]
+        else:
+            message = '\n'.join(
+                ['Commit of %d changes' % (len(messages),), '']
+                + ['- %s' % (message,) for message in messages]
+            )
+        log.info('Committing %d queued changes for %r' % (len(messages), self))
+        self.git_commit(message, update=False)
+
+        # Changes queued while committing are kept for the next commit
+        with db.session.begin(subtransactions=True):
+            self.pending_commit_messages = self._lock_pending_commit_messages()[
+                len(messages) :
+            ]
+        if self.pending_commit_messages:
+            self.git_commit_pending_delay()
+        else:
+            self.git_push_delay()
+        return True
+
+    def git_push(self):
+        """
+        Push the local commits to the remote, returns False if there was nothing to push
+
+        Pushes queued behind one another collapse into a single push, as the
+        later ones find the remote up to date.
+        """
+        repo = self.get_repository()
+        if repo is None or self.git_state == 'pushed':
+            return False
+        if 'origin' not in repo.remotes:
+            self.ensure_remote()
+        log.debug('Pushing to authorized URL')
+        repo.git.push('--set-upstream', repo.remotes.origin, repo.head.ref)
+        log.debug(f'...pushed to {repo.head.ref}')
+        with db.session.begin(subtransactions=True):
+            self.pushed_commit = repo.head.commit.hexsha
+        return True
+
     def git_pull(self):
         repo = self.get_repository()
         assert repo is not None
@@ -545,11 +688,11 @@ class GitStore(db.Model, HoustonModel):
         assets_added = []
         if num_files > 0:
             log.debug('Tus collect for %d files moved' % (num_files))
-            self.git_commit('Tus collect commit for %d files.' % (num_files,))
-
-            # Do git push to gitlab in the background (we won't wait for its
-            # completion here)
-            self.git_push_delay()
+            # Update the Assets now, the git commit and push to gitlab happen
+            # in the background (we won't wait for their completion here)
+            self.realize_local_store()
+            self.update_asset_symlinks()
+            self.git_commit_delay('Tus collect commit for %d files.' % (num_files,))
 
             for asset in self.assets:
                 if asset.path in paths_added:
@@ -578,11 +721,15 @@ class GitStore(db.Model, HoustonModel):
         ]
         pass
 
-    def update_asset_symlinks(self, verbose=True, existing_filepath_guid_mapping={}):
+    def update_asset_symlinks(self, verbose=True, existing_filepath_guid_mapping=None):
         """
         Traverse the files in the _<self.GIT_STORE_NAME>/ folder and add/update symlinks
         for any relevant files we identify
 
+        This is incremental: files whose size and modification time have not
+        changed since the last run are not inspected or hashed again, and only
+        the Assets and symlinks that changed are updated.
+
         Ref:
             https://pypi.org/project/python-magic/
             https://developer.mozilla.org/en-US/docs/Web/HTTP/Basics_of_HTTP/MIME_types/Common_types
@@ -591,14 +738,22 @@ class GitStore(db.Model, HoustonModel):
         import utool as ut
         import magic
 
+        if existing_filepath_guid_mapping is None:
+            existing_filepath_guid_mapping = {}
+
         local_store_path = self.get_absolute_path()
         local_name_path = os.path.join(local_store_path, '_%s' % (self.GIT_STORE_NAME,))
         local_assets_path = os.path.join(local_store_path, '_assets')
 
+        # Results of previous runs, by path relative to the store
+        file_cache = self.load_file_cache()
+        updated_file_cache = {}
+
         # Walk the local store path, looking for white-listed MIME type files
         files = []
         skipped = []
         errors = []
+        inspected = 0
         walk_list = sorted(list(os.walk(local_name_path)))
         for root, directories, filenames in tqdm.tqdm(walk_list):
             filenames = sorted(filenames)
@@ -632,26 +787,41 @@ class GitStore(db.Model, HoustonModel):
                         # Skip any symbolic links (sanity check)
                         skipped.append((filepath, extension))
                         continue
-                    mime_type = magic.from_file(filepath, mime=True)
+
+                    stat = os.stat(filepath)
+                    relative_path = os.path.relpath(filepath, local_store_path)
+                    cached = file_cache.get(relative_path)
+                    if cached is None or (cached['size'], cached['mtime']) != (
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                    ):
+                        # New or modified file
+                        cached = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+                    if cached.get('mime_type') is None:
+                        inspected += 1
+                        cached['mime_type'] = magic.from_file(filepath, mime=True)
+                    updated_file_cache[relative_path] = cached
+
+                    mime_type = cached['mime_type']
                     if mime_type not in self.mime_type_whitelist:
                         # Skip any unsupported MIME types
                         skipped.append((filepath, extension))
                         continue
 
-                    magic_signature = magic.from_file(filepath)
-                    size_bytes = os.path.getsize(filepath)
+                    if cached.get('magic_signature') is None:
+                        cached['magic_signature'] = magic.from_file(filepath)
 
                     file_data = {
                         'filepath': filepath,
                         'path': basename,
                         'extension': extension,
                         'mime_type': mime_type,
-                        'magic_signature': magic_signature,
-                        'size_bytes': size_bytes,
+                        'magic_signature': cached['magic_signature'],
+                        'size_bytes': stat.st_size,
                         'git_store_guid': self.guid,
                     }
 
-                    files.append(file_data)
+                    files.append((file_data, cached))
                 except Exception:  # pragma: no cover
                     logging.exception('Got exception in update_asset_symlinks')
                     errors.append(filepath)
@@ -659,6 +829,7 @@ class GitStore(db.Model, HoustonModel):
         if verbose:
             print('Processed asset files from: %r' % (self,))
             print('\tFiles   : %d' % (len(files),))
+            print('\tChanged : %d' % (inspected,))
             print('\tSkipped : %d' % (len(skipped),))
             if len(skipped) > 0:
                 skipped_ext_list = [skip[1] for skip in skipped]
@@ -667,34 +838,52 @@ class GitStore(db.Model, HoustonModel):
                 print('\t\t%s' % (skipped_ext_str,))
             print('\tErrors  : %d' % (len(errors),))
 
-        # Compute the xxHash64 for all found files
-        filepath_list = [file_data_['filepath'] for file_data_ in files]
-        arguments_list = list(zip(filepath_list))
-        print('Computing filesystem xxHash64...')
-        filesystem_xxhash64_list = parallel(
-            compute_xxhash64_digest_filepath, arguments_list
+        # Compute the xxHash64 for the new or modified files
+        unhashed = [
+            (file_data, cached)
+            for file_data, cached in files
+            if cached.get('filesystem_xxhash64') is None
+        ]
+        print('Computing filesystem xxHash64 for %d files...' % (len(unhashed),))
+        # Each worker holds one chunk in memory at a time
+        arguments_list = [(file_data['filepath'],) for file_data, _ in unhashed]
+        digests = parallel(compute_xxhash64_digest_filepath, arguments_list)
+        for (_, cached), digest in zip(unhashed, digests):
+            cached['filesystem_xxhash64'] = digest
+
+        # Only keep the current files, and do not remember failures so they are
+        # retried next time
+        self.save_file_cache(
+            {
+                relative_path: cached
+                for relative_path, cached in updated_file_cache.items()
+                if cached.get('filesystem_xxhash64') is not None
+                or cached['mime_type'] not in self.mime_type_whitelist
+            }
         )
-        filesystem_guid_list = list(map(ut.hashable_to_uuid, filesystem_xxhash64_list))
 
         # Update file_data with the filesystem and semantic hash information
-        zipped = zip(files, filesystem_xxhash64_list, filesystem_guid_list)
-        for file_data, filesystem_xxhash64, filesystem_guid in zipped:
+        for file_data, cached in files:
+            filesystem_xxhash64 = cached['filesystem_xxhash64']
             file_data['filesystem_xxhash64'] = filesystem_xxhash64
-            file_data['filesystem_guid'] = filesystem_guid
+            file_data['filesystem_guid'] = ut.hashable_to_uuid(filesystem_xxhash64)
 
             semantic_guid_data = [
                 file_data['git_store_guid'],
                 file_data['filesystem_guid'],
             ]
             file_data['semantic_guid'] = ut.hashable_to_uuid(semantic_guid_data)
+        files = [file_data for file_data, _ in files]
 
-        # Delete all existing symlinks
+        # Find the existing symlinks, and the Asset GUIDs they can give back
+        existing_symlink_targets = {}
         existing_asset_symlinks = ut.glob(os.path.join(local_assets_path, '*'))
         for existing_asset_symlink in existing_asset_symlinks:
             basename = os.path.basename(existing_asset_symlink)
             if basename in ['.touch', 'derived']:
                 continue
             existing_asset_target = os.readlink(existing_asset_symlink)
+            existing_symlink_targets[basename] = existing_asset_target
             existing_asset_target_ = os.path.abspath(
                 os.path.join(local_assets_path, existing_asset_target)
             )
@@ -708,71 +897,151 @@ class GitStore(db.Model, HoustonModel):
                         ] = uuid.UUID(uuid_str)
                     except Exception:
                         pass
-            os.remove(existing_asset_symlink)
 
-        # Add new or update any existing Assets found in the Git Store
+        # Add new or update any existing Assets found in the Git Store, with one
+        # query for the existing Assets and bulk inserts and updates
         local_asset_filepath_list = [
             file_data.pop('filepath', None) for file_data in files
         ]
-        assets = []
-        # TODO: slim down this DB context
-        with db.session.begin(subtransactions=True):
-            for file_data, local_asset_filepath in zip(files, local_asset_filepath_list):
-                semantic_guid = file_data.get('semantic_guid', None)
-                asset = Asset.query.filter(Asset.semantic_guid == semantic_guid).first()
-                if asset is None:
+        semantic_guids = [file_data['semantic_guid'] for file_data in files]
+        existing_assets = {}
+        if semantic_guids:
+            query = Asset.query.filter(Asset.semantic_guid.in_(semantic_guids))
+            for asset in query:
+                existing_assets[asset.semantic_guid] = asset
+
+        search_keys = [
+            'filesystem_guid',
+            'semantic_guid',
+            'git_store_guid',
+        ]
+        insert_mappings = {}
+        update_mappings = {}
+        asset_guids = []
+        for file_data, local_asset_filepath in zip(files, local_asset_filepath_list):
+            semantic_guid = file_data['semantic_guid']
+            asset = existing_assets.get(semantic_guid, None)
+            if asset is None:
+                # Create record if asset is new
+                mapping = insert_mappings.get(semantic_guid, None)
+                if mapping is None:
                     # Check if we can recycle existing GUID from symlink
                     recycle_guid = existing_filepath_guid_mapping.get(
                         local_asset_filepath, None
                     )
-                    if recycle_guid is not None:
-                        file_data['guid'] = recycle_guid
-                    # Create record if asset is new
-                    asset = Asset(**file_data)
-                    db.session.add(asset)
-                else:
-                    # Update record if Asset exists
-                    search_keys = [
-                        'filesystem_guid',
-                        'semantic_guid',
-                        'git_store_guid',
-                    ]
-
-                    for key in file_data:
-                        if key in search_keys:
-                            continue
-                        value = file_data[key]
-                        setattr(asset, key, value)
-                    db.session.merge(asset)
-                assets.append(asset)
-
-        # Update all symlinks for each Asset
+                    if recycle_guid is None:
+                        recycle_guid = uuid.uuid4()
+                    mapping = {'guid': recycle_guid}
+                    insert_mappings[semantic_guid] = mapping
+                mapping.update(file_data)
+                asset_guids.append(mapping['guid'])
+            else:
+                # Update record if Asset exists and changed
+                for key in file_data:
+                    if key in search_keys:
+                        continue
+                    value = file_data[key]
+                    if getattr(asset, key) != value:
+                        mapping = update_mappings.setdefault(asset.guid, {})
+                        mapping['guid'] = asset.guid
+                        mapping[key] = value
+                asset_guids.append(asset.guid)
+        changed_asset_guids = {mapping['guid'] for mapping in insert_mappings.values()}
+        changed_asset_guids |= set(update_mappings)
+
+        with db.session.begin(subtransactions=True):
+            if insert_mappings:
+                db.session.bulk_insert_mappings(Asset, list(insert_mappings.values()))
+            if update_mappings:
+                db.session.bulk_update_mappings(Asset, list(update_mappings.values()))
+
+        # Load the current Assets with one query
+        assets_by_guid = {}
+        if asset_guids:
+            query = Asset.query.filter(Asset.guid.in_(asset_guids)).populate_existing()
+            assets_by_guid = {asset.guid: asset for asset in query}
+        assets = [assets_by_guid[asset_guid] for asset_guid in asset_guids]
+        changed_assets = {assets_by_guid[asset_guid] for asset_guid in changed_asset_guids}
+
+        # Update the symlinks that changed, and remove the ones without an Asset
+        git_store_path = pathlib.Path(local_store_path)
+        asset_symlinks = set()
         for asset, local_asset_filepath in zip(assets, local_asset_filepath_list):
-            db.session.refresh(asset)
-            asset.update_symlink(local_asset_filepath)
-            asset.set_derived_meta()
-            if verbose:
-                print(filepath)
-                print('\tAsset         : %s' % (asset,))
-                print('\tSemantic GUID : %s' % (asset.semantic_guid,))
-                print('\tExtension     : %s' % (asset.extension,))
-                print('\tMIME type     : %s' % (asset.mime_type,))
-                print('\tSignature     : %s' % (asset.magic_signature,))
-                print('\tSize bytes    : %s' % (asset.size_bytes,))
-                print('\tFS xxHash64   : %s' % (asset.filesystem_xxhash64,))
-                print('\tFS GUID       : %s' % (asset.filesystem_guid,))
-
-        # Get all historical and current Assets for this Git Store
-        db.session.refresh(self)
+            symlink_name = asset.get_filename()
+            asset_symlinks.add(symlink_name)
+            symlink_target = pathlib.Path('..') / pathlib.Path(
+                local_asset_filepath
+            ).relative_to(git_store_path)
+            if existing_symlink_targets.get(symlink_name) != str(symlink_target):
+                asset.update_symlink(local_asset_filepath)
+                existing_symlink_targets[symlink_name] = str(symlink_target)
+                changed_assets.add(asset)
+        for symlink_name in set(existing_symlink_targets) - asset_symlinks:
+            os.remove(os.path.join(local_assets_path, symlink_name))
+
+        changed_assets = sorted(changed_assets)
+        with db.session.begin(subtransactions=True):
+            for asset in changed_assets:
+                asset.set_derived_meta()
+                if verbose:
+                    print('\tAsset         : %s' % (asset,))
+                    print('\tSemantic GUID : %s' % (asset.semantic_guid,))
+                    print('\tExtension     : %s' % (asset.extension,))
+                    print('\tMIME type     : %s' % (asset.mime_type,))
+                    print('\tSignature     : %s' % (asset.magic_signature,))
+                    print('\tSize bytes    : %s' % (asset.size_bytes,))
+                    print('\tFS xxHash64   : %s' % (asset.filesystem_xxhash64,))
+                    print('\tFS GUID       : %s' % (asset.filesystem_guid,))
+
+            # Make the derived images in the background, so that they do not
+            # have to be made while serving the first request for them
+            Asset.make_derived_images_delay(changed_assets)
 
         # Delete any historical Assets that have been deleted from this commit
-        deleted_assets = list(set(self.assets) - set(assets))
+        deleted_asset_guids = [
+            asset_guid
+            for (asset_guid,) in db.session.query(Asset.guid).filter(
+                Asset.git_store_guid == self.guid
+            )
+            if asset_guid not in assets_by_guid
+        ]
         if verbose:
-            print('Deleting %d orphaned Assets' % (len(deleted_assets),))
-        with db.session.begin(subtransactions=True):
-            for deleted_asset in deleted_assets:
-                deleted_asset.delete()
+            print('Deleting %d orphaned Assets' % (len(deleted_asset_guids),))
+        Asset.bulk_delete_cascade(deleted_asset_guids)
         db.session.refresh(self)
+        if deleted_asset_guids:
+            self.justify_existence()
+
+    def get_file_cache_path(self):
+        # Kept inside .git so that it is never committed
+        return os.path.join(self.get_absolute_path(), '.git', FILE_CACHE_FILENAME)
+
+    def load_file_cache(self):
+        """
+        Returns what ``update_asset_symlinks`` found out about each file the last
+        time, by path relative to the store.
+
+        Each entry has the ``size`` and ``mtime`` (in nanoseconds) of the file
+        when it was inspected, so modified files are inspected again.
+        """
+        cache_path = self.get_file_cache_path()
+        if not os.path.exists(cache_path):
+            return {}
+        try:
+            with open(cache_path, 'r') as cache_file:
+                return json.load(cache_file)
+        except ValueError:
+            log.warning(f'Ignoring invalid file cache {cache_path}')
+            return {}
+
+    def save_file_cache(self, file_cache):
+        cache_path = self.get_file_cache_path()
+        if not os.path.exists(os.path.dirname(cache_path)):
+            return
+        temp_cache_path = f'{cache_path}.tmp'
+        with open(temp_cache_path, 'w') as cache_file:
+            json.dump(file_cache, cache_file)
+        os.replace(temp_cache_path, cache_path)
 
     def update_metadata_from_project(self, project):
         # Update any local metadata from sub
@@ -837,11 +1106,39 @@ class GitStore(db.Model, HoustonModel):
         if os.path.exists(self.get_absolute_path()):
             shutil.rmtree(self.get_absolute_path())
 
+    def _get_asset_path_map(self):
+        """Path to Asset map of the loaded ``assets``, None if they are not loaded"""
+        if 'assets' in sqlalchemy.inspect(self).unloaded:
+            return None
+        assets = self.assets
+        # The collection is replaced when reloaded and the paths of Assets do
+        # not change, so the map only needs rebuilding when the list changes
+        source = getattr(self, '_asset_path_map_source', None)
+        if source is not assets or self._asset_path_map_size != len(assets):
+            self._asset_path_map = {asset.path: asset for asset in reversed(assets)}
+            self._asset_path_map_source = assets
+            self._asset_path_map_size = len(assets)
+        return self._asset_path_map
+
     def get_asset_for_file(self, filename):
-        for asset in self.assets:
-            if asset.path == filename:
-                return asset
-        return None
+        return self.get_assets_for_files([filename])[0]
+
+    def get_assets_for_files(self, filenames):
+        """Returns the Assets of ``filenames`` in the same order, None for misses"""
+        asset_path_map = self._get_asset_path_map()
+        if asset_path_map is None:
+            # Use the (git_store_guid, path) index rather than loading all the assets
+            asset_path_map = {}
+            for asset in (
+                Asset.query.filter(
+                    Asset.git_store_guid == self.guid,
+                    Asset.path.in_(set(filenames)),
+                )
+                .order_by(Asset.guid.desc())
+                .all()
+            ):
+                asset_path_map[asset.path] = asset
+        return [asset_path_map.get(filename) for filename in filenames]
 
     # stub of DEX-220 ... to be continued
     def justify_existence(self):
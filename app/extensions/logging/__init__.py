@@ -107,6 +107,22 @@ class Logging(object):
 
         AuditLog.create(msg, audit_type, module_name, obj.guid, *args, **kwargs)
 
+    @classmethod
+    def audit_log_objects(cls, logger, objs, msg='', audit_type=AuditType.Other):
+        """As for audit_log_object() for many objects of the same type at once"""
+        if not objs:
+            return
+        assert isinstance(audit_type, cls.AuditType)
+
+        module_name = objs[0].__class__.__name__
+        for obj in objs:
+            log_msg = f'{module_name} {audit_type} {obj.guid} {msg}'
+            cls._log_message(logger, log_msg, audit_type)
+
+        from app.modules.audit_logs.models import AuditLog
+
+        AuditLog.create_multiple(msg, audit_type, module_name, [obj.guid for obj in objs])
+
     @classmethod
     def user_create_object(cls, logger, obj, msg='', *args, **kwargs):
         cls.audit_log_object(logger, obj, msg, cls.AuditType.UserCreate, *args, **kwargs)
@@ -117,6 +133,10 @@ class Logging(object):
             logger, obj, msg, cls.AuditType.SystemCreate, *args, **kwargs
         )
 
+    @classmethod
+    def system_create_objects(cls, logger, objs, msg=''):
+        cls.audit_log_objects(logger, objs, msg, cls.AuditType.SystemCreate)
+
     @classmethod
     def backend_fault(cls, logger, msg='', obj=None, *args, **kwargs):
         if obj:
@@ -5,24 +5,37 @@ Rest Manager base class, to be used for any entity (EDM/ACM) where we need to in
 system using REST API
 
 """
+import concurrent.futures
 import logging
 from werkzeug.exceptions import BadRequest
 from flask import current_app, request, session, render_template  # NOQA
+from flask import _request_ctx_stack
 from flask_login import current_user  # NOQA
 import requests
 from collections import namedtuple
+import functools
 import utool as ut
 import json
 import keyword
+import threading
 import uuid
 
 KEYWORD_SET = set(keyword.kwlist)
 
+# Defaults of <NAME>_POOL_CONNECTIONS and <NAME>_POOL_MAXSIZE
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+# Default of <NAME>_COALESCED_TIMEOUT
+DEFAULT_COALESCED_TIMEOUT = 300
+
 log = logging.getLogger(__name__)
 
 
-def _json_object_hook(data):
-    keys = list(data.keys())
+@functools.lru_cache(maxsize=1024)
+def _get_record_type(keys):
+    """Namedtuple class for a tuple of JSON keys, EDM responses repeat the same few
+    shapes so creating a new class for every object is by far the slowest part of
+    decoding them"""
     keys_set = set(keys)
     keys_ = []
     for key in keys:
@@ -32,9 +45,16 @@ def _json_object_hook(data):
         else:
             key_ = key
         keys_.append(key_)
-    values = data.values()
-    data_ = namedtuple('obj', keys_)(*values)
-    return data_
+    return namedtuple('obj', keys_)
+
+
+def _json_object_hook(data):
+    return _get_record_type(tuple(data))(*data.values())
+
+
+def decode_json_objects(content):
+    """Decode a JSON response (str or bytes) into attribute access records"""
+    return json.loads(content, object_hook=_json_object_hook)
 
 
 # Not entirely certain how appropriate this is as a Mixin as it's dependent on a couple of things in
@@ -92,10 +112,22 @@ class RestManager(RestManagerUserMixin):
 
         # Start with all contents as empty structures
         self.targets = set([])
-        self.sessions = {}
         self.uris = {}
         self.auths = {}
 
+        # The connection pools (adapters) and login cookies of each target are
+        # shared by all threads, the sessions using them are per thread (or per
+        # greenlet when monkey patched) as requests.Session is not thread safe
+        self._adapters = {}
+        self._cookies = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        # Futures of the GETs in flight by endpoint, and the semaphores limiting
+        # the concurrent fan out calls by target
+        self._in_flight = {}
+        self._semaphores = {}
+
         if pre_initialize:
             self._ensure_initialized()
 
@@ -177,6 +209,68 @@ class RestManager(RestManagerUserMixin):
             # Assign local references to the configuration settings
             self.auths = authns
 
+    @property
+    def sessions(self):
+        """Sessions of the current thread by target"""
+        sessions = getattr(self._local, 'sessions', None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+        return sessions
+
+    def _get_adapter(self, target):
+        with self._lock:
+            if target not in self._adapters:
+                self._adapters[target] = requests.adapters.HTTPAdapter(
+                    pool_connections=current_app.config.get(
+                        f'{self.NAME}_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS
+                    ),
+                    pool_maxsize=current_app.config.get(
+                        f'{self.NAME}_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE
+                    ),
+                )
+                self._cookies[target] = requests.cookies.RequestsCookieJar()
+            return self._adapters[target]
+
+    def _create_session(self, target):
+        """New session on the long lived connection pool and cookies of the target"""
+        adapter = self._get_adapter(target)
+        session_ = requests.Session()
+        session_.mount('https://', adapter)
+        session_.mount('http://', adapter)
+        session_.cookies = self._cookies[target]
+        return session_
+
+    def get_pool_stats(self):
+        """Connection pool usage by target, for monitoring"""
+        stats = {}
+        with self._lock:
+            adapters = dict(self._adapters)
+        for target, adapter in adapters.items():
+            pools = adapter.poolmanager.pools
+            pools = [pools[key] for key in pools.keys()]
+            stats[target] = {
+                'pools': len(pools),
+                'maxsize': adapter._pool_maxsize,
+                'connections': sum(pool.num_connections for pool in pools),
+                'requests': sum(pool.num_requests for pool in pools),
+            }
+        return stats
+
+    def _get_concurrency_limit(self, target):
+        # Defaults to the connection pool size, so no connection is discarded
+        limit = current_app.config.get(
+            f'{self.NAME}_MAX_CONCURRENCY',
+            current_app.config.get(f'{self.NAME}_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE),
+        )
+        return max(1, limit)
+
+    def _get_semaphore(self, target):
+        with self._lock:
+            if target not in self._semaphores:
+                limit = self._get_concurrency_limit(target)
+                self._semaphores[target] = threading.BoundedSemaphore(limit)
+            return self._semaphores[target]
+
     def _init_all_sessions(self):
         for target in self.uris:
             self._ensure_session(target)
@@ -188,7 +282,7 @@ class RestManager(RestManagerUserMixin):
         """
         if target not in self.sessions:
             log.debug(f'Creating anonymous session for {target}')
-            self.sessions[target] = requests.Session()
+            self.sessions[target] = self._create_session(target)
 
         if target in self.auths:
             auth = self.auths[target]
@@ -278,20 +372,25 @@ class RestManager(RestManagerUserMixin):
             log.debug(f'Sending {method} request to {self.NAME}: {endpoint_encoded}')
             log.debug(f'Contents {passthrough_kwargs}')
 
+        if target_session is None and target not in self.sessions:
+            # First request of this thread, the login cookies are already shared
+            self.sessions[target] = self._create_session(target)
         session_ = target_session or self.sessions[target]
 
-        with session_:
-            if _pre_request_func is not None:
-                session_ = _pre_request_func(session_)
+        # Not closing the session (with session_:), that would close the pooled
+        # connections and every request would open a new one
+        if _pre_request_func is not None:
+            session_ = _pre_request_func(session_)
 
-            request_func = getattr(session_, method, None)
-            assert request_func is not None
+        request_func = getattr(session_, method, None)
+        assert request_func is not None
 
-            response = request_func(endpoint_encoded, **passthrough_kwargs)
+        response = request_func(endpoint_encoded, **passthrough_kwargs)
 
         if response.ok:
             if decode_as_object:
-                response = json.loads(response.text, object_hook=_json_object_hook)
+                # Decoding the bytes skips the charset detection of response.text
+                response = decode_json_objects(response.content)
         elif response.status_code == 401 and not reauthenticated:
             # Try re-authenticating
             self._ensure_session(target, reauthenticating=True)
@@ -319,6 +418,102 @@ class RestManager(RestManagerUserMixin):
             )
         return response
 
+    def _request_coalesced(self, method, tag, *args, target='default', **kwargs):
+        """
+        Send a request unless the same one is already in flight (from any thread),
+        in which case wait for it and share its response.  Only use this for
+        requests without side effects, and decode the shared response per caller.
+
+        A caller waits at most ``<NAME>_COALESCED_TIMEOUT`` seconds for the
+        request in flight, then sends its own.
+        """
+        key = (method, tag, args, target, tuple(sorted(kwargs.items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._in_flight[key] = concurrent.futures.Future()
+
+        if not is_leader:
+            log.debug(f'Coalesced {method} request to {self.NAME}: {tag} {args}')
+            timeout = current_app.config.get(
+                f'{self.NAME}_COALESCED_TIMEOUT', DEFAULT_COALESCED_TIMEOUT
+            )
+            try:
+                return future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                log.warning(
+                    f'Coalesced {method} request to {self.NAME} timed out: {tag} {args}'
+                )
+                return self._request(method, tag, *args, target=target, **kwargs)
+
+        try:
+            response = self._request(method, tag, *args, target=target, **kwargs)
+        except BaseException as exception:
+            # Including interruptions (e.g. a gevent Timeout), the waiters must
+            # not be left waiting for a response that will never come
+            future.set_exception(exception)
+            raise
+        else:
+            future.set_result(response)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return response
+
+    def fan_out(self, func, args_list, kwargs_list=None, return_exceptions=False):
+        """
+        Run ``func`` (a method of this manager, e.g. ``get_dict`` or
+        ``request_passthrough_parsed``) for each of ``args_list`` (and
+        ``kwargs_list``) concurrently, returning the results in order.
+
+        At most ``<NAME>_MAX_CONCURRENCY`` calls run against a target at any time,
+        pass the target as the ``target`` keyword argument.  The first failure is
+        raised, unless ``return_exceptions`` is True in which case exceptions are
+        returned in place of the results.
+        """
+        from app.extensions import parallel_iter
+
+        args_list = [tuple(args) for args in args_list]
+        if kwargs_list is None:
+            kwargs_list = [{} for _ in args_list]
+        if not args_list:
+            return []
+
+        self._ensure_initialized()
+        app = current_app._get_current_object()
+        request_context = _request_ctx_stack.top
+
+        def call(args, kwargs):
+            # The passthroughs forward headers of the incoming request, each call
+            # gets its own copy of the request context as they are not thread safe
+            if request_context is None:
+                context = app.app_context()
+            else:
+                context = request_context.copy()
+            semaphore = self._get_semaphore(kwargs.get('target', 'default'))
+            try:
+                with context, semaphore:
+                    return True, func(*args, **kwargs)
+            except Exception as exception:  # pylint: disable=broad-except
+                return False, exception
+
+        targets = set(kwargs.get('target', 'default') for kwargs in kwargs_list)
+        workers = sum(self._get_concurrency_limit(target) for target in targets)
+        outcomes = parallel_iter(
+            call,
+            zip(args_list, kwargs_list),
+            workers=min(len(args_list), workers),
+            ordered=True,
+        )
+
+        results = []
+        for success, value in outcomes:
+            if not success and not return_exceptions:
+                raise value
+            results.append(value)
+        return results
+
     def get_list(self, list_name, target='default'):
         response = self._request('get', list_name, target=target)
 
@@ -340,7 +535,9 @@ class RestManager(RestManagerUserMixin):
 
     def get_dict(self, list_name, guid, target='default'):
 
-        response = self._request(
+        # Concurrent reads of the same item share one request, each caller gets
+        # its own decoded copy
+        response = self._request_coalesced(
             'get',
             list_name,
             guid,
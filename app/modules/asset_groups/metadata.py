@@ -154,8 +154,9 @@ class AssetGroupMetadata(object):
                 log, f'{debug} annotations:{str(annotations)} not in curating group'
             )
 
-        for annot_uuid in annotations:
-            if not Annotation.query.get(annot_uuid):
+        annots = Annotation.load_multiple(annotations)
+        for annot_uuid, annot in zip(annotations, annots):
+            if not annot:
                 raise AssetGroupMetadataError(
                     log, f'{debug} annotation:{str(annot_uuid)} not found'
                 )
@@ -7,7 +7,8 @@ import copy
 import enum
 from flask import current_app
 from flask_login import current_user  # NOQA
-from datetime import datetime  # NOQA
+from sqlalchemy import func
+from datetime import datetime, timedelta  # NOQA
 from app.extensions import db, HoustonModel
 import app.extensions.logging as AuditLog  # NOQA
 from app.extensions.git_store import GitStore
@@ -16,7 +17,7 @@ from app.modules.assets.models import Asset
 from app.modules.encounters.models import Encounter
 from app.modules.sightings.models import Sighting, SightingStage
 from app.modules.users.models import User
-from app.utils import HoustonException
+from app.utils import HoustonException, LRUCache
 
 import logging
 import uuid
@@ -36,6 +37,84 @@ class AssetGroupSightingStage(str, enum.Enum):
     failed = 'failed'
 
 
+class AssetGroupSightingJobStatus(str, enum.Enum):
+    active = 'active'
+    completed = 'completed'
+    failed = 'failed'
+
+
+class AssetGroupSightingJob(db.Model):
+    """
+    Registry of the detection jobs of AssetGroupSightings.
+
+    The details of each job stay in ``AssetGroupSighting.jobs``, this table
+    indexes them so active jobs and completion can be found without reading
+    the JSON of every AssetGroupSighting.  A job shared by many sightings (see
+    ``send_detection_batch_to_sage()``) has a row per sighting.
+    """
+
+    # Active jobs older than this are reported by the job sweep
+    STALE_AGE = timedelta(hours=1)
+
+    job_guid = db.Column(db.GUID, primary_key=True)
+    asset_group_sighting_guid = db.Column(
+        db.GUID,
+        db.ForeignKey('asset_group_sighting.guid', ondelete='CASCADE'),
+        primary_key=True,
+        index=True,
+    )
+    asset_group_sighting = db.relationship(
+        'AssetGroupSighting', back_populates='detection_jobs'
+    )
+    model = db.Column(db.String, nullable=True)
+    status = db.Column(
+        db.Enum(AssetGroupSightingJobStatus),
+        default=AssetGroupSightingJobStatus.active,
+        index=True,
+        nullable=False,
+    )
+    active = db.Column(db.Boolean, default=True, nullable=False)
+    start = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_asset_group_sighting_job_active_start', 'active', 'start'),
+    )
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'job_guid={self.job_guid}, '
+            'asset_group_sighting_guid={self.asset_group_sighting_guid}, '
+            "status='{self.status}'"
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    @classmethod
+    def get_active_jobs(cls, started_before=None):
+        query = cls.query.filter(cls.active.is_(True))
+        if started_before is not None:
+            query = query.filter(cls.start < started_before)
+        return query.order_by(cls.start).all()
+
+    @classmethod
+    def set_status(cls, asset_group_sighting_guid, job_guid, status):
+        with db.session.begin(subtransactions=True):
+            cls.query.filter_by(
+                asset_group_sighting_guid=asset_group_sighting_guid,
+                job_guid=job_guid,
+            ).update(
+                {
+                    cls.status: status,
+                    cls.active: status == AssetGroupSightingJobStatus.active,
+                },
+                synchronize_session='fetch',
+            )
+
+
+# Rendered AssetGroupSighting encounters, see _render_encounters_json()
+_encounter_json_cache = LRUCache(maxsize=256)
+
+
 # AssetGroup can have many sightings, so needs a table
 class AssetGroupSighting(db.Model, HoustonModel):
 
@@ -64,12 +143,20 @@ class AssetGroupSighting(db.Model, HoustonModel):
 
     # May have multiple jobs outstanding, store as Json obj uuid_str is key, In_progress Bool is value
     jobs = db.Column(db.JSON, default=lambda: {}, nullable=True)
+    # Indexed registry of the jobs above
+    detection_jobs = db.relationship(
+        'AssetGroupSightingJob',
+        back_populates='asset_group_sighting',
+        cascade='all, delete-orphan',
+    )
 
     curation_start = db.Column(
         db.DateTime, index=True, default=datetime.utcnow, nullable=False
     )
 
-    def __init__(self, asset_group, sighting_config, detection_configs):
+    def __init__(
+        self, asset_group, sighting_config, detection_configs, defer_detection=False
+    ):
         self.asset_group = asset_group
         self.config = sighting_config
 
@@ -93,7 +180,9 @@ class AssetGroupSighting(db.Model, HoustonModel):
         else:
             self.stage = AssetGroupSightingStage.detection
 
-        if self.stage == AssetGroupSightingStage.detection:
+        # Deferred detection is started for many sightings at once by the
+        # caller, see start_detection_batch()
+        if self.stage == AssetGroupSightingStage.detection and not defer_detection:
             try:
                 self.start_detection()
 
@@ -191,8 +280,9 @@ class AssetGroupSighting(db.Model, HoustonModel):
         with db.session.begin(subtransactions=True):
             db.session.add(sighting)
         # Add the assets for all of the encounters to the created sighting object
-        for reference in self.config.get('assetReferences', []):
-            asset = self.asset_group.get_asset_for_file(reference)
+        for asset in self.asset_group.get_assets_for_files(
+            self.config.get('assetReferences', [])
+        ):
             assert asset
             sighting.add_asset(asset)
 
@@ -308,13 +398,22 @@ class AssetGroupSighting(db.Model, HoustonModel):
         # some stages are either all or nothing, these just use the base sizes above.
         # For those that have granularity we need to know the size range available and estimate how much has been done
         if self.stage == AssetGroupSightingStage.detection:
-            if self.jobs:
+            num_jobs, num_active_jobs = (
+                db.session.query(
+                    func.count(AssetGroupSightingJob.job_guid),
+                    func.count(AssetGroupSightingJob.job_guid).filter(
+                        AssetGroupSightingJob.active.is_(True)
+                    ),
+                )
+                .filter(AssetGroupSightingJob.asset_group_sighting_guid == self.guid)
+                .one()
+            )
+            if num_jobs:
                 size_range = (
                     stage_base_sizes[AssetGroupSightingStage.curation]
                     - stage_base_sizes[self.stage]
                 )
-                complete_jobs = [job for job in self.jobs.values() if not job['active']]
-                completion += size_range * (len(complete_jobs) / len(self.jobs))
+                completion += size_range * ((num_jobs - num_active_jobs) / num_jobs)
         elif self.stage == AssetGroupSightingStage.processed:
             assert len(self.sighting) == 1
             size_range = 100 - stage_base_sizes[self.stage]
@@ -371,73 +470,132 @@ class AssetGroupSighting(db.Model, HoustonModel):
     def get_custom_fields(self):
         return self.__class__.config_field_getter('customFields', default={})(self)
 
-    def _augment_encounter_json(self, encounter_data):
+    def _get_encounter_owners(self, encounters):
+        """Owners of the encounters by ``ownerEmail``, loaded in one query"""
+        # As User.find(), which also accepts local accounts without a domain
+        emails = {enc['ownerEmail'] for enc in encounters if 'ownerEmail' in enc}
+        candidates = list(emails) + ['%s@localhost' % (email,) for email in emails]
+        users = {}
+        if candidates:
+            users = {
+                user.email: user
+                for user in User.query.filter(User.email.in_(candidates)).all()
+            }
+        return {
+            email: users.get(email) or users.get('%s@localhost' % (email,))
+            for email in emails
+        }
+
+    def _render_encounters_json(self, encounters):
         from app.modules.users.schemas import PublicUserSchema
         from app.modules.annotations.schemas import BaseAnnotationSchema
 
+        annot_guids = [
+            annot_guid for enc in encounters for annot_guid in enc.get('annotations', [])
+        ]
+        annotations = dict(zip(annot_guids, Annotation.load_multiple(annot_guids)))
+        owners = self._get_encounter_owners(encounters)
+        default_owner = self.asset_group.owner
+        submitter = self.asset_group.submitter
+
+        # The config may be changed without being flushed yet, which would
+        # leave self.updated as it is, so the encounters are part of the key
+        users = [default_owner, submitter] + list(owners.values())
+        cache_key = (
+            self.guid,
+            self.updated,
+            json.dumps(encounters, sort_keys=True, default=str),
+            max((a.updated for a in annotations.values() if a), default=None),
+            max((u.updated for u in users if u), default=None),
+        )
+        enc_jsons = _encounter_json_cache.get(cache_key)
+        if enc_jsons is not None:
+            return enc_jsons
+
         user_schema = PublicUserSchema()
         annot_schema = BaseAnnotationSchema()
-        enc_json = copy.deepcopy(encounter_data)
-        enc_json['createdHouston'] = self.created
-        enc_json['updatedHouston'] = self.updated
-        enc_json['annotations'] = []
-        if 'annotations' in encounter_data.keys():
+        user_jsons = {}
+
+        def dump_user(user):
+            if user not in user_jsons:
+                user_jsons[user] = user_schema.dump(user).data
+            return user_jsons[user]
+
+        enc_jsons = []
+        for encounter_data in encounters:
+            enc_json = copy.deepcopy(encounter_data)
+            enc_json['createdHouston'] = self.created
+            enc_json['updatedHouston'] = self.updated
             enc_json['annotations'] = []
-            for annot_guid in encounter_data['annotations']:
-                annot_json = annot_schema.dump(Annotation.query.get(annot_guid)).data
+            for annot_guid in encounter_data.get('annotations', []):
+                annot_json = annot_schema.dump(annotations[annot_guid]).data
                 annot_json['encounter_guid'] = encounter_data['guid']
                 enc_json['annotations'].append(annot_json)
 
-        owner = self.asset_group.owner
-        if 'ownerEmail' in encounter_data:
-            owner = User.find(email=encounter_data['ownerEmail'])
-            # Validated in the metadata code so must be correct
-            assert owner
-        enc_json['owner'] = user_schema.dump(owner).data
-        if self.asset_group.submitter_guid:
-            submitter = User.find(self.asset_group.submitter_guid)
-            enc_json['submitter'] = user_schema.dump(submitter).data
-        return enc_json
+            owner = default_owner
+            if 'ownerEmail' in encounter_data:
+                owner = owners[encounter_data['ownerEmail']]
+                # Validated in the metadata code so must be correct
+                assert owner
+            enc_json['owner'] = dump_user(owner)
+            if self.asset_group.submitter_guid:
+                enc_json['submitter'] = dump_user(submitter)
+            enc_jsons.append(enc_json)
+
+        _encounter_json_cache.set(cache_key, enc_jsons)
+        return enc_jsons
 
     def get_encounter_json(self, encounter_guid):
         encounters = self.config and self.config.get('encounters') or []
-        enc_json = None
-        for encounter in encounters:
+        for encounter, enc_json in zip(
+            encounters, self._render_encounters_json(encounters)
+        ):
             if encounter['guid'] == str(encounter_guid):
-                enc_json = self._augment_encounter_json(encounter)
-                break
-        return enc_json
+                return enc_json
+        return None
 
     def get_encounters_json(self):
+        """
+        Encounters of the config augmented with their annotations, owner and
+        submitter.  The JSON is cached, so must not be modified by the caller.
+        """
         encounters = self.config and self.config.get('encounters') or []
-        enc_json = []
-        for encounter in encounters:
-            enc_json.append(self._augment_encounter_json(encounter))
-
-        return enc_json
+        return self._render_encounters_json(encounters)
 
     @classmethod
     def check_jobs(cls):
-        for asset_group_sighting in AssetGroupSighting.query.all():
-            asset_group_sighting.check_all_job_status()
+        cls._check_job_status(AssetGroupSightingJob.get_active_jobs())
+
+        stale_before = datetime.utcnow() - AssetGroupSightingJob.STALE_AGE
+        for job in AssetGroupSightingJob.get_active_jobs(started_before=stale_before):
+            # TODO If UTC Start more than {arbitrary limit} ago.... do something
+            log.warning(
+                f'AssetGroupSighting:{job.asset_group_sighting_guid} Job:{job.job_guid} '
+                f'Model:{job.model} still active since UTC Start:{job.start}'
+            )
+
+    @classmethod
+    def _check_job_status(cls, jobs):
+        checked = set()
+        for job in jobs:
+            # Jobs shared by many sightings are only checked once
+            if job.job_guid in checked:
+                continue
+            checked.add(job.job_guid)
+            current_app.acm.request_passthrough_result(
+                'job.response', 'post', {}, str(job.job_guid)
+            )
+            # TODO Process response
 
     def check_all_job_status(self):
-        jobs = self.jobs
-        if not jobs:
-            return
-        for job_id in jobs.keys():
-            job = jobs[job_id]
-            if job['active']:
-                current_app.acm.request_passthrough_result(
-                    'job.response', 'post', {}, job_id
-                )
-                # TODO Process response
-                # TODO If UTC Start more than {arbitrary limit} ago.... do something
+        self._check_job_status(job for job in self.detection_jobs if job.active)
 
     @classmethod
     def print_jobs(cls):
-        for asset_group_sighting in AssetGroupSighting.query.all():
-            asset_group_sighting.print_active_jobs()
+        for job in AssetGroupSightingJob.get_active_jobs():
+            log.warning(
+                f'AssetGroupSighting:{job.asset_group_sighting_guid} Job:{job.job_guid} Model:{job.model} UTC Start:{job.start}'
+            )
 
     def print_active_jobs(self):
         jobs = self.jobs
@@ -449,14 +607,11 @@ class AssetGroupSighting(db.Model, HoustonModel):
                 )
 
     def any_jobs_active(self):
-        jobs = self.jobs
-        if not jobs:
-            return False
-        for job_id in jobs.keys():
-            job = jobs[job_id]
-            if job['active']:
-                return True
-        return False
+        return db.session.query(
+            AssetGroupSightingJob.query.filter_by(
+                asset_group_sighting_guid=self.guid, active=True
+            ).exists()
+        ).scalar()
 
     # Build up dict to print out status (calling function chooses what to collect and print)
     def get_job_details(self, verbose):
@@ -474,14 +629,12 @@ class AssetGroupSighting(db.Model, HoustonModel):
 
         return details
 
-    def build_detection_request(self, job_uuid, model):
+    @staticmethod
+    def _build_sage_detection_request(job_uuid, model, callback_path, asset_guids):
         from app.modules.ia_config_reader import IaConfig
 
         base_url = current_app.config.get('BASE_URL')
-        callback_url = urljoin(
-            base_url,
-            f'/api/v1/asset_groups/sighting/{str(self.guid)}/sage_detected/{str(job_uuid)}',
-        )
+        callback_url = urljoin(base_url, callback_path)
 
         ia_config_reader = IaConfig(current_app.config.get('CONFIG_MODEL'))
         detector_config = ia_config_reader.get_named_detector_config(model)
@@ -497,23 +650,40 @@ class AssetGroupSighting(db.Model, HoustonModel):
         model_config.update(detector_config)
         asset_url = urljoin(base_url, '/api/v1/assets/src_raw/')
 
+        model_config['image_uuid_list'] = json.dumps(
+            [
+                f'houston+{urljoin(asset_url, str(asset_guid))}'
+                for asset_guid in asset_guids
+            ]
+        )
+        return model_config
+
+    def get_detection_asset_guids(self):
         asset_guids = []
         if 'updatedAssets' in self.config:
             asset_guids = self.config['updatedAssets']
         else:
-            for filename in self.config.get('assetReferences'):
-                asset = self.asset_group.get_asset_for_file(filename)
+            seen = set()
+            for asset in self.asset_group.get_assets_for_files(
+                self.config.get('assetReferences')
+            ):
                 assert asset
-                if asset.guid not in asset_guids:
+                if asset.guid not in seen:
+                    seen.add(asset.guid)
                     asset_guids.append(asset.guid)
+        return asset_guids
 
-        model_config['image_uuid_list'] = json.dumps(
-            [
-                f'houston+{urljoin(asset_url, str(asset_guid))}'
-                for asset_guid in asset_guids
-            ]
+    def build_detection_request(self, job_uuid, model):
+        if self.jobs and 'batch_offset' in self.jobs.get(str(job_uuid), {}):
+            # Part of a job shared with other sightings of the asset group
+            callback_path = f'/api/v1/asset_groups/{str(self.asset_group_guid)}/sage_detected/{str(job_uuid)}'
+            asset_guids = self.jobs[str(job_uuid)]['asset_ids']
+        else:
+            callback_path = f'/api/v1/asset_groups/sighting/{str(self.guid)}/sage_detected/{str(job_uuid)}'
+            asset_guids = self.get_detection_asset_guids()
+        return self._build_sage_detection_request(
+            job_uuid, model, callback_path, asset_guids
         )
-        return model_config
 
     def send_detection_to_sage(self, model):
         job_id = uuid.uuid4()
@@ -543,6 +713,14 @@ class AssetGroupSighting(db.Model, HoustonModel):
 
             with db.session.begin(subtransactions=True):
                 db.session.merge(self)
+                db.session.add(
+                    AssetGroupSightingJob(
+                        job_guid=job_id,
+                        asset_group_sighting_guid=self.guid,
+                        model=model,
+                        start=self.jobs[str(job_id)]['start'],
+                    )
+                )
         except HoustonException:
             log.warning(
                 f'Sage Detection on AssetGroupSighting({self.guid}) Job{job_id} failed to start'
@@ -550,6 +728,126 @@ class AssetGroupSighting(db.Model, HoustonModel):
             # TODO Celery will retry, do we want it to?
             self.stage = AssetGroupSightingStage.failed
 
+    @classmethod
+    def send_detection_batch_to_sage(cls, asset_group_sightings, model):
+        """
+        Send the detection of many sightings of an asset group as few Sage jobs
+
+        The images of the sightings are packed in order into jobs of at most
+        SAGE_DETECTION_BATCH_SIZE images, so a sighting may be split over
+        consecutive jobs.  Each sighting records the part of every job it is in
+        (``batch_offset`` and ``asset_ids``), so ``AssetGroup.detected()`` can
+        fan the results back out.
+
+        A retried call resumes: the images already in an active job of ``model``
+        are not sent again, and the sightings failed by an earlier batch are
+        skipped.
+        """
+        if not asset_group_sightings:
+            return
+        asset_group_guid = asset_group_sightings[0].asset_group_guid
+        assert all(
+            ags.asset_group_guid == asset_group_guid for ags in asset_group_sightings
+        )
+        batch_size = max(1, current_app.config.get('SAGE_DETECTION_BATCH_SIZE', 500))
+
+        # Each batch is a list of (asset_group_sighting, batch_offset, asset_guids)
+        batches = [[]]
+        batch_count = 0
+        for asset_group_sighting in asset_group_sightings:
+            if asset_group_sighting.stage != AssetGroupSightingStage.detection:
+                continue
+            sent_jobs = [
+                job
+                for job in (asset_group_sighting.jobs or {}).values()
+                if job.get('model') == model and job.get('active')
+            ]
+            sent_asset_ids = {
+                asset_id for job in sent_jobs for asset_id in job.get('asset_ids', [])
+            }
+            asset_guids = [
+                asset_guid
+                for asset_guid in asset_group_sighting.get_detection_asset_guids()
+                if str(asset_guid) not in sent_asset_ids
+            ]
+            if not asset_guids and not sent_jobs:
+                # Still needs a (empty) part of a job to leave detection
+                batches[-1].append((asset_group_sighting, batch_count, []))
+            while asset_guids:
+                if batch_count == batch_size:
+                    batches.append([])
+                    batch_count = 0
+                part = asset_guids[: batch_size - batch_count]
+                asset_guids = asset_guids[len(part) :]
+                batches[-1].append((asset_group_sighting, batch_count, part))
+                batch_count += len(part)
+
+        for batch in [batch for batch in batches if batch]:
+            job_id = uuid.uuid4()
+            asset_guids = [asset_guid for _, _, part in batch for asset_guid in part]
+            detection_request = cls._build_sage_detection_request(
+                job_id,
+                model,
+                f'/api/v1/asset_groups/{str(asset_group_guid)}/sage_detected/{str(job_id)}',
+                asset_guids,
+            )
+            log.info(
+                f'Sending detection message to Sage for {model} with {len(asset_guids)} '
+                f'images of {len(batch)} sightings'
+            )
+            try:
+                current_app.acm.request_passthrough_result(
+                    'job.detect_request',
+                    'post',
+                    {'params': detection_request},
+                    'cnn/lightnet',
+                )
+            except HoustonException:
+                log.warning(
+                    f'Sage Detection on AssetGroup({asset_group_guid}) Job{job_id} failed to start'
+                )
+                with db.session.begin(subtransactions=True):
+                    for asset_group_sighting, _, _ in batch:
+                        asset_group_sighting.fail_detection()
+                continue
+
+            start = datetime.utcnow()
+            with db.session.begin(subtransactions=True):
+                for asset_group_sighting, batch_offset, part in batch:
+                    # Assign a new dict, the JSON column does not track mutations
+                    jobs = dict(asset_group_sighting.jobs or {})
+                    jobs[str(job_id)] = {
+                        'model': model,
+                        'active': True,
+                        'start': start,
+                        'asset_ids': [str(asset_guid) for asset_guid in part],
+                        'batch_offset': batch_offset,
+                    }
+                    asset_group_sighting.jobs = jobs
+                    db.session.add(
+                        AssetGroupSightingJob(
+                            job_guid=job_id,
+                            asset_group_sighting_guid=asset_group_sighting.guid,
+                            model=model,
+                            start=start,
+                        )
+                    )
+
+    def fail_detection(self):
+        """
+        Fail the detection, including the jobs already sent for other parts of
+        the sighting, so their responses are not waited for
+        """
+        jobs = dict(self.jobs or {})
+        for job_id, job in jobs.items():
+            if job.get('active'):
+                jobs[job_id] = dict(job, active=False)
+                AssetGroupSightingJob.set_status(
+                    self.guid, job_id, AssetGroupSightingJobStatus.failed
+                )
+        self.jobs = jobs
+        self.stage = AssetGroupSightingStage.failed
+
     def check_job_status(self, job_id):
         if str(job_id) not in self.jobs:
             log.warning(f'check_job_status called for invalid job {job_id}')
@@ -582,6 +880,9 @@ class AssetGroupSighting(db.Model, HoustonModel):
             raise HoustonException(log, 'No status in response from Sage')
 
         if status != 'completed':
+            AssetGroupSightingJob.set_status(
+                self.guid, job_id, AssetGroupSightingJobStatus.failed
+            )
             self.set_stage(AssetGroupSightingStage.failed)
             # This is not an exception as the message from Sage was valid
             msg = f'JobID {str(job_id)} failed with status: {status} exception: {response.get("json_result")}'
@@ -621,9 +922,9 @@ class AssetGroupSighting(db.Model, HoustonModel):
                 f'image list from sage {len(sage_image_uuids)} does not match local image list {len(job["asset_ids"])}',
             )
 
+        assets = Asset.load_multiple(job['asset_ids'])
         annotations = []
-        for i, asset_id in enumerate(job['asset_ids']):
-            asset = Asset.find(asset_id)
+        for i, (asset_id, asset) in enumerate(zip(job['asset_ids'], assets)):
             if not asset:
                 raise HoustonException(log, f'Asset Id {asset_id} not found')
 
@@ -648,16 +949,22 @@ class AssetGroupSighting(db.Model, HoustonModel):
                     Annotation(
                         guid=uuid.uuid4(),
                         content_guid=content_guid,
-                        asset=asset,
+                        asset_guid=asset.guid,
                         ia_class=ia_class,
                         viewpoint=viewpoint,
                         bounds=bounds,
                     )
                 )
-        for new_annot in annotations:
-            AuditLog.system_create_object(log, new_annot, 'from Sage detection response')
-            with db.session.begin(subtransactions=True):
-                db.session.add(new_annot)
+
+        # One insert for all the annotations and one for their audit logs
+        with db.session.begin(subtransactions=True):
+            db.session.bulk_save_objects(annotations)
+            AuditLog.system_create_objects(
+                log, annotations, 'from Sage detection response'
+            )
+        # Bulk inserts bypass the relationships, reload them when next used
+        for asset in assets:
+            db.session.expire(asset, ['annotations'])
         self.job_complete(str(job_id))
 
     # Record that the asset has been updated for future re detection
@@ -695,13 +1002,38 @@ class AssetGroupSighting(db.Model, HoustonModel):
             # Call sage_detection in the background by doing .delay()
             sage_detection.delay(str(self.guid), config)
 
+    @classmethod
+    def start_detection_batch(cls, asset_group_sightings):
+        """As for start_detection() for many sightings of an asset group"""
+        from app.modules.asset_groups.tasks import sage_detection_batch
+
+        if not asset_group_sightings:
+            return
+        asset_group_config = asset_group_sightings[0].asset_group.config
+        assert 'speciesDetectionModel' in asset_group_config
+        assert all(
+            ags.stage == AssetGroupSightingStage.detection
+            for ags in asset_group_sightings
+        )
+
+        # Temporary restriction for MVP
+        assert len(asset_group_config['speciesDetectionModel']) == 1
+        asset_group_sighting_guids = [str(ags.guid) for ags in asset_group_sightings]
+        for config in asset_group_config['speciesDetectionModel']:
+            log.info(
+                f'ia pipeline starting detection {config} on {len(asset_group_sighting_guids)} AssetGroupSightings'
+            )
+            # Call sage_detection_batch in the background by doing .delay()
+            sage_detection_batch.delay(asset_group_sighting_guids, config)
+
     # Used to build the response to AssetGroupSighting GET
     def get_assets(self):
         assets = []
         if not self.config.get('assetReferences'):
             return assets
-        for filename in self.config.get('assetReferences'):
-            asset = self.asset_group.get_asset_for_file(filename)
+        for asset in self.asset_group.get_assets_for_files(
+            self.config.get('assetReferences')
+        ):
             assert asset
             assets.append(asset)
         assets.sort(key=lambda ast: ast.guid)
@@ -719,6 +1051,9 @@ class AssetGroupSighting(db.Model, HoustonModel):
     def job_complete(self, job_id_str):
         if job_id_str in self.jobs:
             self.jobs[job_id_str]['active'] = False
+            AssetGroupSightingJob.set_status(
+                self.guid, job_id_str, AssetGroupSightingJobStatus.completed
+            )
 
             outstanding_jobs = []
             for job in self.jobs.keys():
@@ -826,6 +1161,16 @@ class AssetGroup(GitStore):
 
         git_push.delay(str(self.guid))
 
+    def git_commit_pending_delay(self):
+        from .tasks import git_commit_pending
+
+        git_commit_pending.delay(str(self.guid))
+
+    def ensure_remote(self):
+        from .tasks import ensure_remote
+
+        ensure_remote(str(self.guid))
+
     def delete_remote_delay(self):
         from .tasks import delete_remote
 
@@ -865,8 +1210,19 @@ class AssetGroup(GitStore):
     def is_processed(self):
         return self.is_completely_in_stage(AssetGroupSightingStage.processed)
 
-    def get_asset_group_sightings_for_asset(self, asset):
-        return [ags for ags in self.asset_group_sightings if ags.has_filename(asset.path)]
+    def get_filename_asset_group_sightings(self):
+        """Reverse index of the sightings' ``assetReferences``, filename to sightings"""
+        filename_sightings = {}
+        for ags in self.asset_group_sightings:
+            filenames = ags.config.get('assetReferences', []) if ags.config else []
+            for filename in set(filenames):
+                filename_sightings.setdefault(filename, []).append(ags)
+        return filename_sightings
+
+    def get_asset_group_sightings_for_asset(self, asset, filename_sightings=None):
+        if filename_sightings is None:
+            filename_sightings = self.get_filename_asset_group_sightings()
+        return filename_sightings.get(asset.path, [])
 
     def get_unprocessed_asset_group_sightings(self):
         return [
@@ -889,17 +1245,30 @@ class AssetGroup(GitStore):
         self.config = dict(metadata.request)
         del self.config['sightings']
 
+        asset_group_sightings = []
         for sighting_meta in metadata.request['sightings']:
             # All encounters in the metadata need to be allocated a pseudo ID for later patching
             for encounter_num in range(len(sighting_meta['encounters'])):
                 sighting_meta['encounters'][encounter_num]['guid'] = str(uuid.uuid4())
 
-            AssetGroupSighting(
-                asset_group=self,
-                sighting_config=copy.deepcopy(sighting_meta),
-                detection_configs=metadata.detection_configs,
+            asset_group_sightings.append(
+                AssetGroupSighting(
+                    asset_group=self,
+                    sighting_config=copy.deepcopy(sighting_meta),
+                    detection_configs=metadata.detection_configs,
+                    defer_detection=True,
+                )
             )
 
+        # Detect the images of all the sightings together
+        AssetGroupSighting.start_detection_batch(
+            [
+                ags
+                for ags in asset_group_sightings
+                if ags.stage == AssetGroupSightingStage.detection
+            ]
+        )
+
         # make sure the repo is created
         self.ensure_repository()
 
@@ -910,7 +1279,57 @@ class AssetGroup(GitStore):
         description = 'Adding Creation metadata'
         if metadata.description != '':
             description = metadata.description
-        self.git_commit(description)
+        self.update_asset_symlinks()
+        self.git_commit_delay(description)
+
+    def detected(self, job_id, response):
+        """Fan the response of a Sage job shared by many sightings out to them"""
+        log.info(f'Received Sage detection response on AssetGroup {self.guid}')
+        parts = [
+            (ags, ags.jobs[str(job_id)])
+            for ags in self.asset_group_sightings
+            if ags.jobs and 'batch_offset' in ags.jobs.get(str(job_id), {})
+        ]
+        if not parts:
+            raise HoustonException(log, f'job_id {job_id} not found in AssetGroup')
+
+        json_result = response.get('json_result', None)
+        if response.get('status') == 'completed' and isinstance(json_result, dict):
+            sage_image_uuids = json_result.get('image_uuid_list', [])
+            results_list = json_result.get('results_list', [])
+            num_images = sum(len(job['asset_ids']) for _, job in parts)
+            if len(sage_image_uuids) != num_images or len(results_list) != num_images:
+                raise HoustonException(
+                    log,
+                    f'image list len {len(sage_image_uuids)} and results len {len(results_list)} '
+                    f'do not match local image list {num_images}',
+                )
+
+        error = None
+        for asset_group_sighting, job in parts:
+            if not job.get('active'):
+                # The sighting's detection failed since, or this part is done
+                log.info(f'Ignoring inactive job {job_id} of {asset_group_sighting}')
+                continue
+            part_response = response
+            if response.get('status') == 'completed' and isinstance(json_result, dict):
+                start = job['batch_offset']
+                end = start + len(job['asset_ids'])
+                part_response = dict(
+                    response,
+                    json_result=dict(
+                        json_result,
+                        image_uuid_list=sage_image_uuids[start:end],
+                        results_list=results_list[start:end],
+                    ),
+                )
+            # A bad part must not hold back the other sightings
+            try:
+                asset_group_sighting.detected(job_id, part_response)
+            except HoustonException as ex:
+                error = error or ex
+        if error is not None:
+            raise error
 
     def asset_updated(self, asset):
         for ags in self.get_asset_group_sightings_for_asset(asset):
@@ -924,9 +1343,12 @@ class AssetGroup(GitStore):
         super(AssetGroup, self).delete()
 
     def delete_asset_group_sighting(self, asset_group_sighting):
+        filename_sightings = self.get_filename_asset_group_sightings()
         with db.session.begin(subtransactions=True):
             for asset in self.assets:
-                asset_ags = self.get_asset_group_sightings_for_asset(asset)
+                asset_ags = self.get_asset_group_sightings_for_asset(
+                    asset, filename_sightings
+                )
                 if asset_ags == [asset_group_sighting]:
                     asset.delete_cascade()
             asset_group_sighting.delete()
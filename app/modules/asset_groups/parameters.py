@@ -106,9 +106,10 @@ class PatchAssetGroupSightingDetailsParameters(PatchJSONParameters):
     # metadata functionality
     @classmethod
     def validate_asset_references(cls, obj, asset_refs):
-        for filename in asset_refs:
+        assets = obj.asset_group.get_assets_for_files(asset_refs)
+        for filename, asset in zip(asset_refs, assets):
             # asset must exist and must be part of the group
-            if not obj.asset_group.get_asset_for_file(filename):
+            if not asset:
                 raise AssetGroupMetadataError(
                     log, f'{filename} not in Group for assetGroupSighting {obj.guid}'
                 )
@@ -276,8 +277,8 @@ class PatchAssetGroupSightingEncounterDetailsParameters(PatchJSONParameters):
                 annot_guids,
                 f'Encounter {encounter_uuid}',
             )
-            for annot_guid in annot_guids:
-                annot = Annotation.query.get(annot_guid)
+            annots = Annotation.load_multiple(annot_guids)
+            for annot_guid, annot in zip(annot_guids, annots):
                 assert annot
                 if (
                     annot.encounter
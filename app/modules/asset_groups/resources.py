@@ -651,6 +651,33 @@ class AssetGroupSightingDetected(Resource):
             abort(ex.status_code, ex.message, errorFields=ex.get_val('error', 'Error'))
 
 
+@api.route('/<uuid:asset_group_guid>/sage_detected/<uuid:job_guid>')
+@api.login_required(oauth_scopes=['asset_group_sightings:write'])
+@api.response(
+    code=HTTPStatus.NOT_FOUND,
+    description='Asset_group not found.',
+)
+@api.resolve_object_by_model(AssetGroup, 'asset_group')
+class AssetGroupDetected(Resource):
+    """
+    Detection of a Sage job shared by Asset Group Sightings complete
+    """
+
+    @api.permission_required(
+        permissions.ObjectAccessPermission,
+        kwargs_on_request=lambda kwargs: {
+            'obj': kwargs['asset_group'],
+            'action': AccessOperation.WRITE_PRIVILEGED,
+        },
+    )
+    def post(self, asset_group, job_guid):
+        try:
+            asset_group.detected(job_guid, json.loads(request.data))
+        except HoustonException as ex:
+            log.exception(f'sage_detected error: {request.data}')
+            abort(ex.status_code, ex.message, errorFields=ex.get_val('error', 'Error'))
+
+
 @api.route('/tus/collect/<uuid:asset_group_guid>')
 @api.login_required(oauth_scopes=['asset_groups:read'])
 @api.response(
@@ -12,6 +12,13 @@ from app.extensions.gitlab import GitlabInitializationError
 log = logging.getLogger(__name__)
 
 
+@celery.on_after_configure.connect
+def setup_periodic_tasks(sender, **kwargs):
+    sender.add_periodic_task(
+        10 * 60, git_commit_pending_sweep.s(), name='Commit Pending AssetGroup Changes'
+    )
+
+
 @celery.task(
     autoretry_for=(GitlabInitializationError, requests.exceptions.RequestException),
     default_retry_delay=600,
@@ -51,6 +58,27 @@ def delete_remote(asset_group_guid, ignore_error=True):
             raise
 
 
+@celery.task(
+    autoretry_for=(git.exc.GitCommandError, OSError, sqlalchemy.exc.SQLAlchemyError),
+    default_retry_delay=60,
+    max_retries=10,
+)
+def git_commit_pending(asset_group_guid):
+    from .models import AssetGroup
+
+    asset_group = AssetGroup.query.get(asset_group_guid)
+    if asset_group is None:
+        return  # asset group doesn't exist in the database
+    asset_group.git_commit_pending()
+
+
+@celery.task
+def git_commit_pending_sweep():
+    from .models import AssetGroup
+
+    AssetGroup.git_commit_pending_sweep()
+
+
 @celery.task(
     autoretry_for=(
         GitlabInitializationError,
@@ -66,12 +94,7 @@ def git_push(asset_group_guid):
     asset_group = AssetGroup.query.get(asset_group_guid)
     if asset_group is None:
         return  # asset group doesn't exist in the database
-    repo = asset_group.get_repository()
-    if 'origin' not in repo.remotes:
-        ensure_remote(asset_group_guid)
-    log.debug('Pushing to authorized URL')
-    repo.git.push('--set-upstream', repo.remotes.origin, repo.head.ref)
-    log.debug(f'...pushed to {repo.head.ref}')
+    asset_group.git_push()
 
 
 @celery.task(
@@ -86,3 +109,24 @@ def sage_detection(asset_group_sighting_guid, model):
     if asset_group_sighting:
         log.debug(f'Celery running sage detection for {asset_group_sighting_guid}')
         asset_group_sighting.send_detection_to_sage(model)
+
+
+@celery.task(
+    autoretry_for=(requests.exceptions.RequestException, sqlalchemy.exc.SQLAlchemyError),
+    default_retry_delay=10,
+    max_retries=10,
+)
+def sage_detection_batch(asset_group_sighting_guids, model):
+    from .models import AssetGroupSighting
+
+    asset_group_sightings = [
+        asset_group_sighting
+        for asset_group_sighting in AssetGroupSighting.load_multiple(
+            asset_group_sighting_guids
+        )
+        if asset_group_sighting is not None
+    ]
+    log.debug(
+        f'Celery running sage detection for {len(asset_group_sightings)} AssetGroupSightings'
+    )
+    AssetGroupSighting.send_detection_batch_to_sage(asset_group_sightings, model)
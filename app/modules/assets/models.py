@@ -5,10 +5,13 @@ Assets database models
 """
 # from flask import current_app
 from functools import total_ordering
+import fcntl
+import os
 import pathlib
+import tempfile
 
 from app.extensions import db, HoustonModel
-from app.modules import module_required
+from app.modules import is_module_enabled, module_required
 from app.utils import HoustonException
 
 from PIL import Image
@@ -27,6 +30,69 @@ class AssetTags(db.Model, HoustonModel):
     tag = db.relationship('Keyword')
 
 
+def save_image_atomically(image, target_path, temp_dir=None):
+    """
+    Save through a temporary file, so readers never see a partial image
+
+    ``temp_dir`` must be on the same filesystem as ``target_path``, it defaults
+    to the directory of ``target_path``.
+    """
+    target_path = pathlib.Path(target_path)
+    if temp_dir is None:
+        temp_dir = target_path.parent
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f'.{target_path.name}.', suffix='.tmp', dir=temp_dir
+    )
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            image.save(temp_file, format='JPEG')
+        os.replace(temp_path, target_path)
+    except Exception:
+        pathlib.Path(temp_path).unlink(missing_ok=True)
+        raise
+
+
+def make_derived_images(source_path, formats, lock_path):
+    """
+    Make the missing derived images of an asset, returns the formats made.
+
+    ``formats`` maps each format name to its ``(path, size)``.  The source is
+    decoded once, using ``thumbnail()`` which lets PIL ``draft()`` and
+    ``reduce()`` JPEG images while decoding, and each format is made from the
+    next larger one.  ``lock_path`` serializes concurrent calls for the same
+    asset, including from other processes, and the images are written through
+    temporary files in its directory.
+
+    This does not need an application context, so it can run in any worker.
+    """
+    by_size = sorted(formats.items(), key=lambda item: max(item[1][1]), reverse=True)
+    for path, _ in formats.values():
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+    temp_dir = pathlib.Path(lock_path).parent
+    temp_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            missing = [
+                format for format, (path, _) in by_size if not os.path.exists(path)
+            ]
+            if not missing:
+                return []
+
+            with Image.open(source_path) as source_image:
+                source_image.thumbnail(by_size[0][1][1])
+                image = source_image.convert('RGB')
+
+            for format, (path, size) in by_size:
+                image.thumbnail(size)
+                if format in missing:
+                    save_image_atomically(image, path, temp_dir=temp_dir)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return missing
+
+
 @total_ordering
 class Asset(db.Model, HoustonModel):
     """
@@ -83,6 +149,11 @@ class Asset(db.Model, HoustonModel):
 
     classifications = db.Column(db.JSON, nullable=True)
 
+    __table_args__ = (
+        # Look up of the Assets of a GitStore by filename
+        db.Index('ix_asset_git_store_guid_path', 'git_store_guid', 'path'),
+    )
+
     DERIVED_EXTENSION = 'jpg'
     DERIVED_MIME_TYPE = 'image/jpeg'
 
@@ -208,6 +279,13 @@ class Asset(db.Model, HoustonModel):
         filename = f'{self.guid}.{format}.{self.DERIVED_EXTENSION}'
         return assets_path / 'derived' / filename
 
+    def is_format_available(self, format):
+        """Whether the format can be served without updating the git store"""
+        if self.get_derived_path(format).exists():
+            return True
+        # The derived file can be made from the original
+        return self.get_symlink().exists()
+
     def update_symlink(self, asset_git_store_filepath):
         target_path = pathlib.Path(asset_git_store_filepath)
         assert target_path.exists()
@@ -277,6 +355,30 @@ class Asset(db.Model, HoustonModel):
     def dimensions(self):
         return self.get_dimensions()
 
+    def get_derived_lock_path(self):
+        # In the store, so every host making the derived images locks the same
+        # file, but inside .git so neither the lock nor the temporary images
+        # written next to it are ever committed
+        git_store_path = pathlib.Path(self.git_store.get_absolute_path())
+        return str(git_store_path / '.git' / 'houston_derived' / f'{self.guid}.lock')
+
+    def get_make_derived_images_args(self):
+        formats = {
+            format: (str(self.get_derived_path(format)), tuple(size))
+            for format, size in self.FORMATS.items()
+        }
+        return (str(self.get_symlink()), formats, self.get_derived_lock_path())
+
+    @classmethod
+    def make_derived_images_delay(cls, assets):
+        from .tasks import make_derived_images
+
+        asset_guids = [
+            str(asset.guid) for asset in assets if asset.is_mime_type_major('image')
+        ]
+        if asset_guids:
+            make_derived_images.delay(asset_guids)
+
     def get_or_make_format_path(self, format):
         assert format in self.FORMATS
         target_path = self.get_derived_path(format)
@@ -290,14 +392,13 @@ class Asset(db.Model, HoustonModel):
             )
         )
 
-        # we make all non-master images _from_ master format (where we assume more work will be done?
-        source_path = self.get_or_make_master_format_path()
-        if format == 'master':  # if so, we are done!
-            return source_path
-
-        with Image.open(source_path) as source_image:
-            source_image.thumbnail(self.FORMATS[format])
-            source_image.save(target_path)
+        if not self.get_symlink().exists():
+            raise HoustonException(
+                log,
+                'Asset does not have a valid path, needs to be within an AssetGroup',
+            )
+        # All the missing formats are made at once, decoding the original once
+        make_derived_images(*self.get_make_derived_images_args())
 
         return target_path
 
@@ -350,22 +451,7 @@ class Asset(db.Model, HoustonModel):
     # note: Image seems to *strip exif* sufficiently here (tested with gps, comments, etc) so this may be enough!
     # also note: this fails horribly in terms of exif orientation.  wom-womp
     def get_or_make_master_format_path(self):
-        source_path = self.get_symlink()
-        if not source_path.exists():
-            raise HoustonException(
-                log,
-                'Asset does not have a valid path, needs to be within an AssetGroup',
-            )
-        target_path = self.get_derived_path('master')
-        target_path.parent.mkdir(parents=True, exist_ok=True)
-        if target_path.exists():
-            return target_path
-        log.info('make_master_format() creating master format as %r' % (target_path,))
-        with Image.open(source_path) as source_image:
-            source_image.thumbnail(self.FORMATS['master'])
-            rgb = source_image.convert('RGB')
-            rgb.save(target_path)
-        return target_path
+        return self.get_or_make_format_path('master')
 
     # Delete of an asset as part of deletion of git_store
     def delete_cascade(self):
@@ -381,6 +467,77 @@ class Asset(db.Model, HoustonModel):
                 ref.tag.delete_if_unreferenced()
             db.session.delete(self)
 
+    @classmethod
+    def bulk_delete_cascade(cls, asset_guids):
+        """
+        Set-based ``delete_cascade()`` of many Assets.
+
+        Runs a fixed number of statements whatever the number of Assets, plus
+        the unreferenced Keyword checks.
+        """
+        from app.modules.annotations.models import Annotation, AnnotationKeywords
+        from app.modules.keywords.models import Keyword
+
+        if not asset_guids:
+            return
+
+        annotation_guids = db.session.query(Annotation.guid).filter(
+            Annotation.asset_guid.in_(asset_guids)
+        )
+        deletes = [
+            AnnotationKeywords.query.filter(
+                AnnotationKeywords.annotation_guid.in_(annotation_guids)
+            ),
+            AssetTags.query.filter(AssetTags.asset_guid.in_(asset_guids)),
+        ]
+        if is_module_enabled('missions'):
+            from app.modules.missions.models import (
+                MissionTaskAnnotationParticipation,
+                MissionTaskAssetParticipation,
+            )
+
+            deletes += [
+                MissionTaskAnnotationParticipation.query.filter(
+                    MissionTaskAnnotationParticipation.annotation_guid.in_(
+                        annotation_guids
+                    )
+                ),
+                MissionTaskAssetParticipation.query.filter(
+                    MissionTaskAssetParticipation.asset_guid.in_(asset_guids)
+                ),
+            ]
+        if is_module_enabled('sightings'):
+            from app.modules.sightings.models import SightingAssets
+
+            deletes.append(
+                SightingAssets.query.filter(SightingAssets.asset_guid.in_(asset_guids))
+            )
+        deletes += [
+            Annotation.query.filter(Annotation.asset_guid.in_(asset_guids)),
+            cls.query.filter(cls.guid.in_(asset_guids)),
+        ]
+
+        with db.session.begin(subtransactions=True):
+            keyword_guids = {
+                guid
+                for (guid,) in db.session.query(AnnotationKeywords.keyword_guid).filter(
+                    AnnotationKeywords.annotation_guid.in_(annotation_guids)
+                )
+            }
+            keyword_guids |= {
+                guid
+                for (guid,) in db.session.query(AssetTags.tag_guid).filter(
+                    AssetTags.asset_guid.in_(asset_guids)
+                )
+            }
+            for query in deletes:
+                # Also removes the deleted objects from the session
+                query.delete(synchronize_session='fetch')
+
+            if keyword_guids:
+                for keyword in Keyword.query.filter(Keyword.guid.in_(keyword_guids)):
+                    keyword.delete_if_unreferenced()
+
     # delete not part of asset group deletion so must inform asset group that we're gone
     def delete(self):
         self.delete_cascade()
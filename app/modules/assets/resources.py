@@ -145,8 +145,11 @@ class AssetSrcUByID(Resource):
         },
     )
     def get(self, asset, format):
-        cls = type(asset.git_store)
-        cls.ensure_store(asset.git_store_guid)
+        if not asset.is_format_available(format):
+            # Only hydrate the store (which pulls from the remote) when the
+            # files are missing locally
+            cls = type(asset.git_store)
+            cls.ensure_store(asset.git_store_guid)
 
         try:
             asset_format_path = asset.get_or_make_format_path(format)
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from app.extensions import parallel_iter
+from app.extensions.celery import celery
+
+
+log = logging.getLogger(__name__)
+
+
+@celery.task
+def make_derived_images(asset_guids):
+    from .models import Asset, make_derived_images
+
+    args_list = []
+    for asset in Asset.load_multiple(asset_guids):
+        if asset is not None and asset.get_symlink().exists():
+            args_list.append(asset.get_make_derived_images_args())
+
+    # Pillow releases the GIL while decoding and resampling, so threads run the
+    # images in parallel (celery prefork workers cannot start a process pool)
+    errors = []
+    made = parallel_iter(make_derived_images, args_list, errors=errors)
+    count = sum(1 for formats in made if formats)
+    for args, _, exception in errors:
+        log.warning(f'Failed to make derived images of {args[0]}: {exception!r}')
+    log.info(f'Made derived images for {count} of {len(asset_guids)} assets')
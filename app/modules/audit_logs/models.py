@@ -46,15 +46,15 @@ class AuditLog(db.Model, Timestamp):
         )
 
     @classmethod
-    def create(
-        cls, msg, audit_type, module_name=None, item_guid=None, user=None, *args, **kwargs
-    ):
-        user_email = 'anonymous user'
+    def _get_user_email(cls, user):
         if user and not user.is_anonymous:
-            user_email = user.email
+            return user.email
         elif current_user and not current_user.is_anonymous:
-            user_email = current_user.email
+            return current_user.email
+        return 'anonymous user'
 
+    @classmethod
+    def _truncate_message(cls, msg):
         # Some messages back from EDM are enormous and we can only store so much data
         if len(msg) > 2500:
             # The start and the end are usually the most useful
@@ -63,6 +63,14 @@ class AuditLog(db.Model, Timestamp):
             new_msg += msg[-1000:]
             log.warning(f'Truncating message. Was {len(msg)}, now {len(new_msg)}.')
             msg = new_msg
+        return msg
+
+    @classmethod
+    def create(
+        cls, msg, audit_type, module_name=None, item_guid=None, user=None, *args, **kwargs
+    ):
+        user_email = cls._get_user_email(user)
+        msg = cls._truncate_message(msg)
 
         duration = None
         if 'duration' in kwargs:
@@ -89,3 +97,22 @@ class AuditLog(db.Model, Timestamp):
 
         with db.session.begin(subtransactions=True):
             db.session.add(log_entry)
+
+    @classmethod
+    def create_multiple(cls, msg, audit_type, module_name, item_guids, user=None):
+        """As for create() with the same message for many items, in a single insert"""
+        user_email = cls._get_user_email(user)
+        msg = cls._truncate_message(msg)
+        mappings = [
+            {
+                'guid': uuid.uuid4(),
+                'module_name': module_name,
+                'item_guid': item_guid,
+                'user_email': user_email,
+                'message': msg,
+                'audit_type': audit_type,
+            }
+            for item_guid in item_guids
+        ]
+        with db.session.begin(subtransactions=True):
+            db.session.bulk_insert_mappings(cls, mappings)
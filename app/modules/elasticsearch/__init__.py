@@ -7,4 +7,11 @@ if not is_module_enabled('elasticsearch'):
 
 
 def init_app(app, **kwargs):
-    pass
+    # pylint: disable=unused-argument,unused-variable
+    """
+    Init Elasticsearch module.
+    """
+    from .models import listen_for_index_changes
+
+    # Record changed objects in the index change feed
+    listen_for_index_changes()
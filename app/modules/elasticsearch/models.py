@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Elasticsearch database models
+--------------------
+"""
+import logging
+import uuid
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect
+
+from app.extensions import db
+
+log = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class IndexChange(db.Model):
+    """
+    Change feed (outbox) of objects whose search index documents are out of date.
+
+    Rows are written in the same flush as the change that caused them (see
+    ``record_index_changes``) and are removed once the indexer has reindexed
+    the object, so the indexer's work is proportional to what actually changed.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)  # pylint: disable=invalid-name
+    index_type = db.Column(db.String(length=20), nullable=False)
+    guid = db.Column(db.GUID, nullable=False)
+    created = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return (
+            '<{class_name}('
+            'id={self.id}, '
+            "index_type='{self.index_type}', "
+            'guid={self.guid}'
+            ')>'.format(class_name=self.__class__.__name__, self=self)
+        )
+
+    @classmethod
+    def get_batch(cls, batch_size, after_id=None, up_to_id=None):
+        query = cls.query
+        if after_id is not None:
+            query = query.filter(cls.id > after_id)
+        if up_to_id is not None:
+            query = query.filter(cls.id <= up_to_id)
+        return query.order_by(cls.id).limit(batch_size).all()
+
+    @classmethod
+    def get_last_id(cls):
+        return db.session.query(func.max(cls.id)).scalar() or 0
+
+    @classmethod
+    def record(cls, index_type, guids):
+        with db.session.begin(subtransactions=True):
+            for guid in guids:
+                db.session.add(cls(index_type=index_type, guid=uuid.UUID(str(guid))))
+
+    @classmethod
+    def forget(cls, ids):
+        # Delete by id rather than by range, so changes committed after the
+        # batch was read (even with a lower id) are left for the next batch
+        with db.session.begin(subtransactions=True):
+            cls.query.filter(cls.id.in_(ids)).delete(synchronize_session=False)
+
+
+def _history_values(obj, attr_name):
+    """Current and previous (pre-flush) values of an attribute, without Nones"""
+    history = inspect(obj).attrs[attr_name].history
+    values = list(history.added) + list(history.unchanged) + list(history.deleted)
+    return [value for value in values if value is not None]
+
+
+def _related_guids(obj, relationship_name):
+    """Guids of the current and previous objects of a many-to-one relationship
+
+    Both the foreign key column and the relationship are checked, as the
+    foreign key is only synchronized from the relationship during the flush.
+    """
+    guids = set(_history_values(obj, f'{relationship_name}_guid'))
+    for related in _history_values(obj, relationship_name):
+        guids.add(related.guid)
+    return guids
+
+
+def get_index_changes(obj, session):
+    """Returns the ``(index_type, guid)`` pairs that need reindexing when ``obj`` changes"""
+    from app.modules.complex_date_time.models import ComplexDateTime
+    from app.modules.encounters.models import Encounter
+    from app.modules.individuals.models import Individual
+    from app.modules.names.models import Name
+    from app.modules.sightings.models import Sighting
+
+    changes = set()
+    if isinstance(obj, Encounter):
+        changes.add(('encounter', obj.guid))
+        # The sighting and individual documents embed encounter data, this
+        # includes the ones the encounter was just moved away from
+        for sighting_guid in _related_guids(obj, 'sighting'):
+            changes.add(('sighting', sighting_guid))
+        for individual_guid in _related_guids(obj, 'individual'):
+            changes.add(('individual', individual_guid))
+    elif isinstance(obj, Sighting):
+        changes.add(('sighting', obj.guid))
+    elif isinstance(obj, Individual):
+        changes.add(('individual', obj.guid))
+    elif isinstance(obj, Name):
+        for individual_guid in _related_guids(obj, 'individual'):
+            changes.add(('individual', individual_guid))
+    elif isinstance(obj, ComplexDateTime) and obj.guid is not None:
+        with session.no_autoflush:
+            for (guid,) in session.query(Encounter.guid).filter(
+                Encounter.time_guid == obj.guid
+            ):
+                changes.add(('encounter', guid))
+            for (guid,) in session.query(Sighting.guid).filter(
+                Sighting.time_guid == obj.guid
+            ):
+                changes.add(('sighting', guid))
+    return changes
+
+
+def record_index_changes(session, flush_context, instances):
+    """``before_flush`` listener adding ``IndexChange`` rows for the objects being flushed"""
+    objs = list(session.new) + list(session.deleted)
+    objs += [obj for obj in session.dirty if session.is_modified(obj)]
+    changes = set()
+    for obj in objs:
+        if not isinstance(obj, IndexChange):
+            changes |= get_index_changes(obj, session)
+
+    for index_type, guid in sorted(changes, key=str):
+        if guid is not None:
+            session.add(IndexChange(index_type=index_type, guid=guid))
+
+
+def listen_for_index_changes():
+    if not event.contains(db.session, 'before_flush', record_index_changes):
+        event.listen(db.session, 'before_flush', record_index_changes)
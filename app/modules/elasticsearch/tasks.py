@@ -1,20 +1,23 @@
 # -*- coding: utf-8 -*-
+import functools
 import logging
+import os
+import uuid
 
-import json
+from celery.signals import worker_process_shutdown
+from elasticsearch.helpers import parallel_bulk
 from flask import current_app
 from gumby.models import Individual, Encounter, Sighting
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, exc, text
 from sqlalchemy.engine import Engine
-from datetime import datetime, timedelta
+from sqlalchemy.engine.url import make_url
+from datetime import datetime, timedelta, timezone
 from app.extensions.celery import celery
 from app.modules.site_settings.models import SiteSetting
 
 
 log = logging.getLogger(__name__)
 
-zero_uuid = '00000000-0000-0000-0000-000000000000'
-
 
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
@@ -23,32 +26,128 @@ def setup_periodic_tasks(sender, **kwargs):
     )
 
 
+# Process-wide engine registry, keyed by database URI
+_ENGINES = {}
+
+
+def get_engine(uri) -> Engine:
+    """Returns the pooled SQLAlchemy Engine for ``uri``, creating it on first use
+
+    Engines live for the lifetime of the worker process so that the periodic
+    indexing tasks reuse pooled connections instead of reconnecting every run.
+    """
+    engine = _ENGINES.get(uri)
+    if engine is None:
+        config = current_app.config
+        kwargs = {'pool_pre_ping': True}
+        if make_url(uri).get_backend_name() != 'sqlite':
+            kwargs.update(
+                pool_size=config['WILDBOOK_DB_POOL_SIZE'],
+                max_overflow=config['WILDBOOK_DB_MAX_OVERFLOW'],
+                pool_recycle=config['WILDBOOK_DB_POOL_RECYCLE'],
+            )
+        engine = create_engine(uri, **kwargs)
+        _protect_engine_across_fork(engine)
+        _ENGINES[uri] = engine
+    return engine
+
+
+def _protect_engine_across_fork(engine):
+    # Connections inherited from a parent process must never be used (or
+    # closed) by a forked child, see "Using Connection Pools with
+    # Multiprocessing" in the SQLAlchemy documentation
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+
+    @event.listens_for(engine, 'checkout')
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        pid = os.getpid()
+        if connection_record.info['pid'] != pid:
+            connection_record.connection = connection_proxy.connection = None
+            raise exc.DisconnectionError(
+                f"Connection record belongs to pid {connection_record.info['pid']}, "
+                f'attempting to check out in pid {pid}'
+            )
+
+
+@worker_process_shutdown.connect
+def dispose_engines(**kwargs):
+    """Closes the pooled connections of every engine in the registry"""
+    while _ENGINES:
+        _, engine = _ENGINES.popitem()
+        engine.dispose()
+
+
 def create_wildbook_engine() -> Engine:
-    """Creates a SQLAlchemy Engine for connecting to the Wildbook database"""
-    return create_engine(current_app.config['WILDBOOK_DB_URI'])
+    """Returns the SQLAlchemy Engine for connecting to the Wildbook database"""
+    return get_engine(current_app.config['WILDBOOK_DB_URI'])
 
 
 def create_houston_engine() -> Engine:
-    """Creates a SQLAlchemy Engine for connecting to the houston database"""
-    return create_engine(current_app.config['SQLALCHEMY_DATABASE_URI'])
+    """Returns the SQLAlchemy Engine for connecting to the houston database"""
+    return get_engine(current_app.config['SQLALCHEMY_DATABASE_URI'])
+
+
+# State of the houston schema last mirrored into the wildbook database by this
+# worker process, see ``ensure_houston_tables``
+_houston_schema_state = {}
+
+
+def get_houston_schema_fingerprint():
+    """Returns a fingerprint of the houston database schema (its migration revision)"""
+    h_engine = create_houston_engine()
+    with h_engine.connect() as h_conn:
+        return h_conn.execute(text(SCHEMA_FINGERPRINT_SQL_QUERY)).scalar()
+
+
+def ensure_houston_tables():
+    """Sets up the houston tables in the wildbook database if needed
+
+    The setup runs once per worker process and again only when the houston
+    schema fingerprint changes (i.e. after a migration), so the periodic
+    indexing does not re-inspect the database catalogs every cycle.
+
+    Returns True if the setup was run.
+    """
+    fingerprint = get_houston_schema_fingerprint()
+    if (
+        'fingerprint' in _houston_schema_state
+        and _houston_schema_state['fingerprint'] == fingerprint
+    ):
+        return False
+    log.info(f'setting up houston tables for schema fingerprint {fingerprint}')
+    set_up_houston_tables()
+    _houston_schema_state['fingerprint'] = fingerprint
+    return True
 
 
 def set_up_houston_tables():
-    # Fetch houston enum types
+    # Fetch houston enum types and tables
     h_engine = create_houston_engine()
     with h_engine.connect() as h_conn:
         results = h_conn.execute(text(ENUM_TYPE_LIST_SQL_QUERY))
         enum_list = results.fetchall()
+        results = h_conn.execute(text(HOUSTON_TABLE_LIST_SQL_QUERY))
+        table_list = [table_name for (table_name,) in results.fetchall()]
 
     wb_engine = create_wildbook_engine()
     with wb_engine.connect() as wb_conn:
-        # Create houston enum types
+        # Create houston enum types, or add any new labels to existing ones
         results = wb_conn.execute(text(ENUM_TYPE_LIST_SQL_QUERY))
         wb_enum_list = dict(results.fetchall())
         for enum_name, enum_labels in enum_list:
             if enum_name not in wb_enum_list:
                 enum_values = ', '.join(repr(label) for label in enum_labels)
                 wb_conn.execute(text(f'CREATE TYPE {enum_name} AS ENUM ({enum_values})'))
+                continue
+            for label in enum_labels:
+                if label not in wb_enum_list[enum_name]:
+                    wb_conn.execute(
+                        text(
+                            f'ALTER TYPE {enum_name} ADD VALUE IF NOT EXISTS {repr(label)}'
+                        )
+                    )
 
         # Import houston tables if schema 'houston' doesn't exist
         if not wb_conn.execute(
@@ -75,6 +174,101 @@ def set_up_houston_tables():
                     }
                 )
             )
+        else:
+            # Import only the houston tables added since the schema was imported
+            results = wb_conn.execute(text(FOREIGN_TABLE_LIST_SQL_QUERY))
+            wb_table_list = {table_name for (table_name,) in results.fetchall()}
+            new_tables = [name for name in table_list if name not in wb_table_list]
+            if new_tables:
+                log.info(f'importing new houston tables: {new_tables}')
+                wb_conn.execute(
+                    text(
+                        IMPORT_FOREIGN_TABLES_SQL
+                        % {'tables': ', '.join(f'"{name}"' for name in new_tables)}
+                    )
+                )
+
+
+def bulk_index(documents):
+    """Index documents in elasticsearch using the bulk API
+
+    The documents are streamed into batches bounded by both document count
+    and byte size (see ``ELASTICSEARCH_BULK_*`` in the configuration), with
+    several bulk requests in flight at once.  Failures are reported per
+    document instead of aborting the whole run.
+
+    Returns a tuple of the number of indexed documents and a list of the
+    failed bulk items.
+    """
+    actions = (document.to_dict(include_meta=True) for document in documents)
+    success_count, errors = bulk_actions(actions)
+    log.info(f'bulk indexed {success_count} documents ({len(errors)} errors)')
+    return success_count, errors
+
+
+def bulk_actions(actions, ignore_status=()):
+    """Send bulk API actions in parallel, as configured by ``ELASTICSEARCH_BULK_*``
+
+    Items failing with one of ``ignore_status`` count as successful.  Returns
+    a tuple of the number of successful actions and a list of the failed items.
+    """
+    config = current_app.config
+    success_count, errors = 0, []
+    for ok, item in parallel_bulk(
+        current_app.elasticsearch,
+        actions,
+        thread_count=config['ELASTICSEARCH_BULK_THREAD_COUNT'],
+        chunk_size=config['ELASTICSEARCH_BULK_CHUNK_SIZE'],
+        max_chunk_bytes=config['ELASTICSEARCH_BULK_MAX_CHUNK_BYTES'],
+        raise_on_error=False,
+        raise_on_exception=False,
+    ):
+        # Bulk items are keyed by their action, e.g. {'index': {'status': ...}}
+        if ok or any(result.get('status') in ignore_status for result in item.values()):
+            success_count += 1
+        else:
+            log.error(f'elasticsearch bulk action failed: {item}')
+            errors.append(item)
+    return success_count, errors
+
+
+def stream_query(conn, sql):
+    """Executes ``sql`` with a server-side cursor and returns the streamed results
+
+    Rows are fetched ``ELASTICSEARCH_INDEX_FETCH_SIZE`` at a time, so memory use
+    stays flat regardless of the number of rows the query matches.
+    """
+    fetch_size = current_app.config['ELASTICSEARCH_INDEX_FETCH_SIZE']
+    return conn.execution_options(
+        stream_results=True, max_row_buffer=fetch_size
+    ).execute(text(sql))
+
+
+def index_rows(rows, build_document):
+    """Bulk index the documents built from ``rows``
+
+    Returns the guids of the documents, in row order, and the guids of the
+    documents that failed to index.
+    """
+    guids = []
+    guids_by_id = {}
+
+    def documents():
+        for row in rows:
+            document = build_document(row)
+            guids.append(document.id)
+            guids_by_id[document.meta.id] = document.id
+            yield document
+
+    success_count, errors = bulk_index(documents())
+    failed_guids = []
+    for item in errors:
+        # Bulk items are keyed by their action, e.g. {'index': {'_id': ...}}
+        for result in item.values():
+            guid = guids_by_id.get(result.get('_id'))
+            if guid is not None:
+                failed_guids.append(guid)
+    return guids, failed_guids
 
 
 ENUM_TYPE_LIST_SQL_QUERY = """\
@@ -103,33 +297,64 @@ IMPORT FOREIGN SCHEMA public FROM SERVER houston INTO houston;
 """
 
 
+SCHEMA_FINGERPRINT_SQL_QUERY = """\
+SELECT string_agg(version_num, ',' ORDER BY version_num) FROM alembic_version
+"""
+
+
+HOUSTON_TABLE_LIST_SQL_QUERY = """\
+SELECT table_name
+FROM information_schema.tables
+WHERE table_schema = 'public'
+ORDER BY table_name
+"""
+
+
+FOREIGN_TABLE_LIST_SQL_QUERY = """\
+SELECT foreign_table_name
+FROM information_schema.foreign_tables
+WHERE foreign_table_schema = 'houston'
+"""
+
+
+IMPORT_FOREIGN_TABLES_SQL = """\
+IMPORT FOREIGN SCHEMA public LIMIT TO (%(tables)s) FROM SERVER houston INTO houston;
+"""
+
+
 def load_individuals_index(
-    catchup_index_before=None, catchup_index_batch_size=0, catchup_index_mark=None
+    catchup_index_before=None,
+    catchup_index_batch_size=0,
+    catchup_index_mark=None,
+    catchup_index_end=None,
+    index_guids=None,
 ):
     if catchup_index_before:
-        where_clause = f"WHERE hind.updated < '{catchup_index_before}' AND hind.guid > '{catchup_index_mark}' ORDER BY hind.guid LIMIT {catchup_index_batch_size}"
+        guid_clause = catchup_guid_clause('hind.guid', catchup_index_mark, catchup_index_end)
+        where_clause = f"WHERE hind.updated < '{catchup_index_before}' AND {guid_clause} ORDER BY hind.guid LIMIT {catchup_index_batch_size}"
+    elif index_guids is not None:
+        where_clause = f'WHERE hind.guid IN ({guid_list_clause(index_guids)})'
     else:
         cutoff = update_incremental_cutoff('individual')
         where_clause = f"WHERE hind.updated >= '{cutoff}'"
-    last_guid = None
     wb_engine = create_wildbook_engine()
     with wb_engine.connect() as wb_conn:
         # Query for marked individual records
         sql = WILDBOOK_MARKEDINDIVIDUAL_SQL_QUERY
         sql = sql.replace('{where_clause}', where_clause)
-        results = wb_conn.execute(text(sql))
-        for result in results:
-            result = combine_names(result)
-            # Create the document object
-            indv = Individual(**result)
-            # Assign the elasticsearch document identify
-            indv.meta.id = f'markedindividual_{indv.id}'
-            # Augment records with houston data points
-            pass
-            # Save document to elasticsearch
-            indv.save(using=current_app.elasticsearch)
-            last_guid = indv.id
-    return last_guid
+        results = stream_query(wb_conn, sql)
+        return index_rows(results, build_individual_document)
+
+
+def build_individual_document(row):
+    result = combine_names(row)
+    # Create the document object
+    indv = Individual(**result)
+    # Assign the elasticsearch document identify
+    indv.meta.id = f'markedindividual_{indv.id}'
+    # Augment records with houston data points
+    pass
+    return indv
 
 
 WILDBOOK_MARKEDINDIVIDUAL_SQL_QUERY = """\
@@ -191,30 +416,35 @@ FROM
 
 
 def load_encounters_index(
-    catchup_index_before=None, catchup_index_batch_size=0, catchup_index_mark=None
+    catchup_index_before=None,
+    catchup_index_batch_size=0,
+    catchup_index_mark=None,
+    catchup_index_end=None,
+    index_guids=None,
 ):
     if catchup_index_before:
-        where_clause = f"WHERE hen.updated < '{catchup_index_before}' AND hen.guid > '{catchup_index_mark}' ORDER BY hen.guid LIMIT {catchup_index_batch_size}"
+        guid_clause = catchup_guid_clause('hen.guid', catchup_index_mark, catchup_index_end)
+        where_clause = f"WHERE hen.updated < '{catchup_index_before}' AND {guid_clause} ORDER BY hen.guid LIMIT {catchup_index_batch_size}"
+    elif index_guids is not None:
+        where_clause = f'WHERE hen.guid IN ({guid_list_clause(index_guids)})'
     else:
         cutoff = update_incremental_cutoff('encounter')
         where_clause = f"WHERE hen.updated >= '{cutoff}'"
     wb_engine = create_wildbook_engine()
-    last_guid = None
     with wb_engine.connect() as wb_conn:
         sql = ENCOUNTERS_INDEX_SQL
         sql = sql.replace('{where_clause}', where_clause)
-        results = wb_conn.execute(text(sql))
-        for row in results:
-            result = combine_datetime(row)
-            result = combine_customfields(result)
-            # Create the document object
-            encounter = Encounter(**result)
-            # Assign the elasticsearch document identify
-            encounter.meta.id = f'encounter_{encounter.id}'
-            # Save document to elasticsearch
-            encounter.save(using=current_app.elasticsearch)
-            last_guid = encounter.id
-    return last_guid
+        results = stream_query(wb_conn, sql)
+        return index_rows(results, build_encounter_document)
+
+
+def build_encounter_document(row):
+    result = combine_datetime(row)
+    # Create the document object
+    encounter = Encounter(**result)
+    # Assign the elasticsearch document identify
+    encounter.meta.id = f'encounter_{encounter.id}'
+    return encounter
 
 
 ENCOUNTERS_INDEX_SQL = """\
@@ -232,26 +462,39 @@ SELECT
   left(right(cdt.timezone, 5), 3) || ':' || right(cdt.timezone, 2) AS timezone,
   cdt.specificity AS time_specificity,
   (SELECT
-    NULLIF(
-      array_to_json(array_agg((
-        '{' ||
-        to_json(cfv."DEFINITION_ID_OID") ||
-        ':' ||
-        coalesce(
-          to_json(cfd."VALUE"),
-          to_json(cfdo."VALUE"),
-          to_json(cfi."VALUE"),
-          to_json(cfs."VALUE")
-        ) || '}')::json))::text,
-      '[null]')
-   FROM
-    "APICUSTOMFIELDS_CUSTOMFIELDVALUES" cf
-    LEFT JOIN "CUSTOMFIELDVALUEDATE" cfd ON cf."ID_EID" = cfd."ID"
-    LEFT JOIN "CUSTOMFIELDVALUEDOUBLE" cfdo ON cf."ID_EID" = cfdo."ID"
-    LEFT JOIN "CUSTOMFIELDVALUEINTEGER" cfi ON cf."ID_EID" = cfi."ID"
-    LEFT JOIN "CUSTOMFIELDVALUESTRING" cfs ON cf."ID_EID" = cfs."ID"
-    LEFT JOIN "CUSTOMFIELDVALUE" cfv ON cf."ID_EID" = cfv."ID"
-   WHERE en."ID" = cf."ID_OID"
+    -- one value per custom field, or a list of the values if there are several
+    jsonb_object_agg(
+      cfvals.field,
+      CASE WHEN jsonb_array_length(cfvals.field_values) = 1
+           THEN cfvals.field_values -> 0
+           ELSE cfvals.field_values
+      END)
+   FROM (
+    SELECT
+      cfv."DEFINITION_ID_OID"::text AS field,
+      jsonb_agg(coalesce(
+        to_jsonb(cfd."VALUE"),
+        to_jsonb(cfdo."VALUE"),
+        to_jsonb(cfi."VALUE"),
+        to_jsonb(cfs."VALUE")
+      )) FILTER (WHERE coalesce(
+        to_jsonb(cfd."VALUE"),
+        to_jsonb(cfdo."VALUE"),
+        to_jsonb(cfi."VALUE"),
+        to_jsonb(cfs."VALUE")
+      ) IS NOT NULL) AS field_values
+    FROM
+     "APICUSTOMFIELDS_CUSTOMFIELDVALUES" cf
+     LEFT JOIN "CUSTOMFIELDVALUEDATE" cfd ON cf."ID_EID" = cfd."ID"
+     LEFT JOIN "CUSTOMFIELDVALUEDOUBLE" cfdo ON cf."ID_EID" = cfdo."ID"
+     LEFT JOIN "CUSTOMFIELDVALUEINTEGER" cfi ON cf."ID_EID" = cfi."ID"
+     LEFT JOIN "CUSTOMFIELDVALUESTRING" cfs ON cf."ID_EID" = cfs."ID"
+     LEFT JOIN "CUSTOMFIELDVALUE" cfv ON cf."ID_EID" = cfv."ID"
+    WHERE en."ID" = cf."ID_OID"
+      AND cfv."DEFINITION_ID_OID" IS NOT NULL
+    GROUP BY cfv."DEFINITION_ID_OID"
+   ) AS cfvals
+   WHERE cfvals.field_values IS NOT NULL
   ) AS custom_fields
 FROM
   "ENCOUNTER" AS en
@@ -263,33 +506,39 @@ FROM
 
 
 def load_sightings_index(
-    catchup_index_before=None, catchup_index_batch_size=0, catchup_index_mark=None
+    catchup_index_before=None,
+    catchup_index_batch_size=0,
+    catchup_index_mark=None,
+    catchup_index_end=None,
+    index_guids=None,
 ):
     if catchup_index_before:
-        where_clause = f"WHERE si.updated < '{catchup_index_before}' AND si.guid > '{catchup_index_mark}'"
+        guid_clause = catchup_guid_clause('si.guid', catchup_index_mark, catchup_index_end)
+        where_clause = f"WHERE si.updated < '{catchup_index_before}' AND {guid_clause}"
         order_clause = f'ORDER BY id LIMIT {catchup_index_batch_size}'
+    elif index_guids is not None:
+        where_clause = f'WHERE si.guid IN ({guid_list_clause(index_guids)})'
+        order_clause = ''
     else:
         cutoff = update_incremental_cutoff('sighting')
         where_clause = f"WHERE si.updated >= '{cutoff}'"
         order_clause = ''
-    last_guid = None
     wb_engine = create_wildbook_engine()
     with wb_engine.connect() as wb_conn:
         sql = SIGHTINGS_INDEX_SQL
         sql = sql.replace('{where_clause}', where_clause)
         sql = sql.replace('{order_clause}', order_clause)
-        results = wb_conn.execute(text(sql))
-        for i, row in enumerate(results):
-            result = combine_datetime(row)
-            result = combine_customfields(result)
-            # Create the document object
-            sighting = Sighting(**result)
-            # Assign the elasticsearch document identify
-            sighting.meta.id = f'sighting_{sighting.id}'
-            # Save document to elasticsearch
-            sighting.save(using=current_app.elasticsearch)
-            last_guid = sighting.id
-    return last_guid
+        results = stream_query(wb_conn, sql)
+        return index_rows(results, build_sighting_document)
+
+
+def build_sighting_document(row):
+    result = combine_datetime(row)
+    # Create the document object
+    sighting = Sighting(**result)
+    # Assign the elasticsearch document identify
+    sighting.meta.id = f'sighting_{sighting.id}'
+    return sighting
 
 
 SIGHTINGS_INDEX_SQL = """\
@@ -305,27 +554,39 @@ SELECT
   (array_agg(ta."SCIENTIFICNAME"))[1] AS taxonomy,
   oc."COMMENTS" AS comments,
   (SELECT
-    NULLIF(
-      array_to_json(array_agg((
-        '{' ||
-        to_json(cfv."DEFINITION_ID_OID") ||
-        ':' ||
-        coalesce(
-          to_json(cfd."VALUE"),
-          to_json(cfdo."VALUE"),
-          to_json(cfi."VALUE"),
-          to_json(cfs."VALUE")
-        ) || '}')::json))::text,
-      '[null]')
-   FROM
-    "APICUSTOMFIELDS_CUSTOMFIELDVALUES" cf
-    LEFT JOIN "CUSTOMFIELDVALUEDATE" cfd ON cf."ID_EID" = cfd."ID"
-    LEFT JOIN "CUSTOMFIELDVALUEDOUBLE" cfdo ON cf."ID_EID" = cfdo."ID"
-    LEFT JOIN "CUSTOMFIELDVALUEINTEGER" cfi ON cf."ID_EID" = cfi."ID"
-    LEFT JOIN "CUSTOMFIELDVALUESTRING" cfs ON cf."ID_EID" = cfs."ID"
-    LEFT JOIN "CUSTOMFIELDVALUE" cfv ON cf."ID_EID" = cfv."ID"
-   WHERE
-    cf."ID_OID" = oc."ID"
+    -- one value per custom field, or a list of the values if there are several
+    jsonb_object_agg(
+      cfvals.field,
+      CASE WHEN jsonb_array_length(cfvals.field_values) = 1
+           THEN cfvals.field_values -> 0
+           ELSE cfvals.field_values
+      END)
+   FROM (
+    SELECT
+      cfv."DEFINITION_ID_OID"::text AS field,
+      jsonb_agg(coalesce(
+        to_jsonb(cfd."VALUE"),
+        to_jsonb(cfdo."VALUE"),
+        to_jsonb(cfi."VALUE"),
+        to_jsonb(cfs."VALUE")
+      )) FILTER (WHERE coalesce(
+        to_jsonb(cfd."VALUE"),
+        to_jsonb(cfdo."VALUE"),
+        to_jsonb(cfi."VALUE"),
+        to_jsonb(cfs."VALUE")
+      ) IS NOT NULL) AS field_values
+    FROM
+     "APICUSTOMFIELDS_CUSTOMFIELDVALUES" cf
+     LEFT JOIN "CUSTOMFIELDVALUEDATE" cfd ON cf."ID_EID" = cfd."ID"
+     LEFT JOIN "CUSTOMFIELDVALUEDOUBLE" cfdo ON cf."ID_EID" = cfdo."ID"
+     LEFT JOIN "CUSTOMFIELDVALUEINTEGER" cfi ON cf."ID_EID" = cfi."ID"
+     LEFT JOIN "CUSTOMFIELDVALUESTRING" cfs ON cf."ID_EID" = cfs."ID"
+     LEFT JOIN "CUSTOMFIELDVALUE" cfv ON cf."ID_EID" = cfv."ID"
+    WHERE cf."ID_OID" = oc."ID"
+      AND cfv."DEFINITION_ID_OID" IS NOT NULL
+    GROUP BY cfv."DEFINITION_ID_OID"
+   ) AS cfvals
+   WHERE cfvals.field_values IS NOT NULL
   ) AS custom_fields,
   (array_agg(DISTINCT hen.owner_guid))[1] AS owner
 FROM
@@ -342,33 +603,25 @@ GROUP BY id, datetime, timezone, specificity
 """
 
 
+@functools.lru_cache(maxsize=None)
+def parse_timezone_offset(offset):
+    """Returns the tzinfo for a UTC offset string such as ``+03:00``"""
+    sign = -1 if offset.startswith('-') else 1
+    hours, minutes = offset.lstrip('+-').split(':')
+    return timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+
+
 def combine_datetime(row):
     result = dict(row)
-    if row['datetime']:
-        result['datetime'] = datetime.fromisoformat(
-            row['datetime'].isoformat() + result.pop('timezone')
+    if result['datetime']:
+        # The wall clock datetime is in the row's timezone, attach the
+        # (cached) offset instead of formatting and re-parsing the datetime
+        result['datetime'] = result['datetime'].replace(
+            tzinfo=parse_timezone_offset(result.pop('timezone'))
         )
     return result
 
 
-def combine_customfields(result):
-    if result['custom_fields']:
-        custom_fields = {}
-        # [{"5fda2b91-d4aa-4f5e-9479-9845402a9386":"Giraffe"}]
-        for field_value_dict in json.loads(result['custom_fields']):
-            if not field_value_dict or not isinstance(field_value_dict, dict):
-                continue
-            for field, value in field_value_dict.items():
-                if field in custom_fields:
-                    if not isinstance(custom_fields[field], list):
-                        custom_fields[field] = [custom_fields[field]]
-                    custom_fields[field].append(value)
-                else:
-                    custom_fields[field] = value
-        result['custom_fields'] = custom_fields
-    return result
-
-
 def combine_names(row):
     result = dict(row)
     if (
@@ -399,27 +652,122 @@ def update_incremental_cutoff(key_prefix):
     return cutoff
 
 
+def guid_list_clause(guids):
+    # Round trip through UUID so only well-formed guids reach the SQL
+    return ', '.join(f"'{uuid.UUID(str(guid))}'" for guid in guids)
+
+
+def drain_index_changes():
+    """Indexes the objects recorded in the index change feed, batch by batch
+
+    Each batch is removed from the feed only after it has been indexed, so a
+    failure leaves the changes in place to be retried on the next run.  This
+    includes documents elasticsearch failed to index; only the changes up to
+    the last one recorded when the run started are processed, so failing
+    changes are not retried over and over within a run.
+
+    Objects no longer found (i.e. deleted) have their documents removed from
+    the index.
+
+    Returns the number of changes processed.
+    """
+    from app.modules.elasticsearch.models import IndexChange
+
+    batch_size = current_app.config['ELASTICSEARCH_INDEX_CHANGE_BATCH_SIZE']
+    last_id = IndexChange.get_last_id()
+    after_id = 0
+    total = 0
+    while True:
+        changes = IndexChange.get_batch(batch_size, after_id=after_id, up_to_id=last_id)
+        if not changes:
+            break
+        after_id = changes[-1].id
+        guids_by_type = {}
+        for change in changes:
+            guids_by_type.setdefault(change.index_type, set()).add(str(change.guid))
+        failed = set()
+        for index_type, guids in guids_by_type.items():
+            indexed_guids, failed_guids = INDEX_LOADERS[index_type](
+                index_guids=sorted(guids)
+            )
+            failed |= {(index_type, str(uuid.UUID(guid))) for guid in failed_guids}
+            deleted_guids = guids - {str(uuid.UUID(guid)) for guid in indexed_guids}
+            if deleted_guids:
+                delete_documents(index_type, sorted(deleted_guids))
+        IndexChange.forget(
+            [
+                change.id
+                for change in changes
+                if (change.index_type, str(change.guid)) not in failed
+            ]
+        )
+        total += len(changes) - len(failed)
+    log.info(f'indexed {total} changes from the index change feed')
+    return total
+
+
 @celery.task
 def load_codex_indexes():
     log.info('incremental indexing started')
-    set_up_houston_tables()
-    load_individuals_index()
-    load_encounters_index()
-    load_sightings_index()
+    ensure_houston_tables()
+    drain_index_changes()
+
+
+INDEX_LOADERS = {
+    'encounter': load_encounters_index,
+    'sighting': load_sightings_index,
+    'individual': load_individuals_index,
+}
+
+# Document class and document id prefix of each index type
+INDEX_DOCUMENTS = {
+    'encounter': (Encounter, 'encounter_'),
+    'sighting': (Sighting, 'sighting_'),
+    'individual': (Individual, 'markedindividual_'),
+}
+
+
+def delete_documents(index_type, guids):
+    """Remove the documents of the objects ``guids`` from the index
+
+    Returns a tuple of the number of deleted (or already missing) documents and
+    a list of the failed bulk items.
+    """
+    document_class, prefix = INDEX_DOCUMENTS[index_type]
+
+    def delete_action(guid):
+        document = document_class(meta={'id': f'{prefix}{guid}'})
+        action = document.to_dict(include_meta=True)
+        action.pop('_source', None)
+        return dict(action, _op_type='delete')
+
+    success_count, errors = bulk_actions(
+        (delete_action(guid) for guid in guids), ignore_status=(404,)
+    )
+    log.info(f'deleted {success_count} {index_type} documents ({len(errors)} errors)')
+    return success_count, errors
+
+
+CATCHUP_INDEX_CONF_KEY = 'elasticsearch_catchup_index_conf'
+CATCHUP_INDEX_PARTITION_KEY_PREFIX = 'elasticsearch_catchup_index_partition_'
+
+
+def catchup_guid_clause(column, mark, end=None):
+    clause = f"{column} > '{mark}'"
+    if end:
+        clause += f" AND {column} <= '{end}'"
+    return clause
 
 
 def catchup_index_get():
-    conf_key = 'elasticsearch_catchup_index_conf'
-    conf = SiteSetting.get_json(conf_key)
+    conf = SiteSetting.get_json(CATCHUP_INDEX_CONF_KEY)
     if not conf or 'before' not in conf:
         return
     # conf must have 'before' value; the rest can use these defaults
     def_conf = {
         'batch_size': 250,
         'batch_pause': 5,
-        'encounter_mark': zero_uuid,
-        'sighting_mark': zero_uuid,
-        'individual_mark': zero_uuid,
+        'partitions': 4,
     }
     def_conf.update(conf)
     return def_conf
@@ -428,69 +776,174 @@ def catchup_index_get():
 def catchup_index_set(conf):
     if not conf or 'before' not in conf:
         return
-    conf_key = 'elasticsearch_catchup_index_conf'
-    SiteSetting.set(conf_key, data=conf)
+    SiteSetting.set(CATCHUP_INDEX_CONF_KEY, data=conf)
+
+
+def catchup_index_partition_bounds(partitions):
+    """Splits the guid keyspace into ``partitions`` contiguous ``(start, end]`` ranges"""
+    starts = [uuid.UUID(int=(i << 128) // partitions) for i in range(partitions)]
+    ends = starts[1:] + [uuid.UUID(int=(1 << 128) - 1)]
+    return [(str(start), str(end)) for start, end in zip(starts, ends)]
+
+
+def catchup_index_partition_key(index_type, partition):
+    return f'{CATCHUP_INDEX_PARTITION_KEY_PREFIX}{index_type}_{partition}'
+
+
+def catchup_index_partition_get(index_type, partition):
+    return SiteSetting.get_json(catchup_index_partition_key(index_type, partition))
+
+
+def catchup_index_partition_set(index_type, partition, state):
+    SiteSetting.set(catchup_index_partition_key(index_type, partition), data=state)
 
 
 @celery.task
 def catchup_index_start():
+    """Starts (or resumes) the catchup index
+
+    Each index type's guid keyspace is split into ``partitions`` ranges that
+    are indexed concurrently by separate ``catchup_index_partition`` tasks,
+    each keeping its own checkpoint.  Calling this again (e.g. after a crash)
+    resumes every unfinished range from its checkpoint; any task chains still
+    running from a previous start see the new generation and stop.
+    """
     conf = catchup_index_get()
     if not conf:
         log.info('catchup_index_start found no conf -- bailing.')
         return
+    conf['generation'] = conf.get('generation', 0) + 1
+    conf.setdefault('started', datetime.utcnow().isoformat())
+    catchup_index_set(conf)
     log.info(f'catchup index commencing with: {conf}')
 
-    last_guid_encounter = load_encounters_index(
-        catchup_index_before=conf['before'],
-        catchup_index_batch_size=conf['batch_size'],
-        catchup_index_mark=conf['encounter_mark'] or zero_uuid,
-    )
-    conf['encounter_mark'] = last_guid_encounter
-    log.debug(
-        f"catchup index finished encounters batch (size={conf['batch_size']}) on guid {last_guid_encounter}"
-    )
+    bounds = catchup_index_partition_bounds(conf['partitions'])
+    for index_type in INDEX_LOADERS:
+        for partition, (start, end) in enumerate(bounds):
+            state = catchup_index_partition_get(index_type, partition)
+            if not state:
+                state = {
+                    'start': start,
+                    'end': end,
+                    'mark': start,
+                    'batches': 0,
+                    'done': False,
+                }
+                catchup_index_partition_set(index_type, partition, state)
+            if state['done']:
+                continue
+            catchup_index_partition.delay(index_type, partition, conf['generation'])
 
-    last_guid_sighting = load_sightings_index(
-        catchup_index_before=conf['before'],
-        catchup_index_batch_size=conf['batch_size'],
-        catchup_index_mark=conf['sighting_mark'] or zero_uuid,
-    )
-    conf['sighting_mark'] = last_guid_sighting
-    log.debug(
-        f"catchup index finished sightings batch (size={conf['batch_size']}) on guid {last_guid_sighting}"
-    )
 
-    last_guid_individual = load_individuals_index(
+@celery.task
+def catchup_index_partition(index_type, partition, generation):
+    """Indexes the next batch of one guid range, then reschedules itself"""
+    conf = catchup_index_get()
+    # if gone, means a reset() was submitted; if the generation changed, the
+    # catchup was restarted and another task chain now owns this range
+    if not conf or conf.get('generation') != generation:
+        log.info(
+            f'catchup index [{index_type} {partition}] superseded or reset -- STOPPING.'
+        )
+        return
+    state = catchup_index_partition_get(index_type, partition)
+    if not state or state['done']:
+        return
+
+    guids, failed_guids = INDEX_LOADERS[index_type](
         catchup_index_before=conf['before'],
         catchup_index_batch_size=conf['batch_size'],
-        catchup_index_mark=conf['individual_mark'] or zero_uuid,
+        catchup_index_mark=state['mark'],
+        catchup_index_end=state['end'],
     )
-    conf['individual_mark'] = last_guid_individual
+    if failed_guids:
+        from app.modules.elasticsearch.models import IndexChange
+
+        # Retried by the incremental indexer from the index change feed, rather
+        # than holding the mark back on documents that may never index
+        IndexChange.record(index_type, failed_guids)
+    last_guid = guids[-1] if guids else None
+    if last_guid:
+        state['mark'] = str(last_guid)
+        state['batches'] += 1
+    else:
+        state['done'] = True
     log.debug(
-        f"catchup index finished individuals batch (size={conf['batch_size']}) on guid {last_guid_individual}"
+        f"catchup index finished {index_type} batch (size={conf['batch_size']}) on partition {partition}, guid {last_guid}"
     )
 
-    conf_check = catchup_index_get()  # if gone, means a reset() was submitted, so we bail
-    if not conf_check:
+    conf_check = catchup_index_get()
+    if not conf_check or conf_check.get('generation') != generation:
         log.info(
-            'catchup index batch cycle finished, but no conf found -- assumed reset, so STOPPING.'
+            f'catchup index [{index_type} {partition}] batch finished, but conf was reset or restarted -- STOPPING.'
         )
         return
-    elif not last_guid_encounter and not last_guid_individual and not last_guid_sighting:
-        catchup_index_reset()
-        log.info(
-            'catchup index finished all batches with no results.  ENDING CATCHUP INDEX.'
+    catchup_index_partition_set(index_type, partition, state)
+
+    if not state['done']:
+        start_time = datetime.utcnow() + timedelta(seconds=conf['batch_pause'])
+        catchup_index_partition.apply_async(
+            (index_type, partition, generation), eta=start_time
         )
+    elif catchup_index_progress()['fraction'] >= 1.0:
+        catchup_index_reset()
+        log.info('catchup index finished all partitions.  ENDING CATCHUP INDEX.')
+
+
+def catchup_index_partition_fraction(state):
+    """Estimates the completed fraction of a partition from its checkpoint
+
+    Guids are uniformly distributed, so the position of the mark within the
+    range is a good estimate of the work done.
+    """
+    if not state:
+        return 0.0
+    if state['done']:
+        return 1.0
+    start = uuid.UUID(state['start']).int
+    end = uuid.UUID(state['end']).int
+    mark = uuid.UUID(state['mark']).int
+    return (mark - start) / (end - start)
+
+
+def catchup_index_progress():
+    """Returns the aggregate progress of the catchup index, with an ETA estimate"""
+    conf = catchup_index_get()
+    if not conf:
         return
-    else:
-        log.info(
-            f"catchup index finished all batches with more work to do; pausing {conf['batch_pause']} sec before next round"
-        )
-        catchup_index_set(conf)
-        start_time = datetime.utcnow() + timedelta(seconds=conf['batch_pause'])
-        catchup_index_start.apply_async(eta=start_time)
+    progress = {
+        'before': conf['before'],
+        'started': conf.get('started'),
+        'partitions': conf['partitions'],
+        'types': {},
+    }
+    fractions = []
+    for index_type in INDEX_LOADERS:
+        states = [
+            catchup_index_partition_get(index_type, partition)
+            for partition in range(conf['partitions'])
+        ]
+        type_fractions = [catchup_index_partition_fraction(state) for state in states]
+        fractions.extend(type_fractions)
+        progress['types'][index_type] = {
+            'partitions_done': len([state for state in states if state and state['done']]),
+            'batches': sum(state['batches'] for state in states if state),
+            'fraction': sum(type_fractions) / len(type_fractions),
+        }
+    progress['fraction'] = sum(fractions) / len(fractions)
+
+    progress['eta'] = None
+    if progress['started'] and 0 < progress['fraction'] < 1:
+        elapsed = datetime.utcnow() - datetime.fromisoformat(progress['started'])
+        remaining = elapsed * (1 - progress['fraction']) / progress['fraction']
+        progress['eta'] = (datetime.utcnow() + remaining).isoformat()
+    return progress
 
 
 def catchup_index_reset():
-    conf_key = 'elasticsearch_catchup_index_conf'
-    SiteSetting.forget_key_value(conf_key)
+    SiteSetting.forget_key_value(CATCHUP_INDEX_CONF_KEY)
+    partition_settings = SiteSetting.query.filter(
+        SiteSetting.key.startswith(CATCHUP_INDEX_PARTITION_KEY_PREFIX)
+    ).all()
+    for setting in partition_settings:
+        SiteSetting.forget_key_value(setting.key)
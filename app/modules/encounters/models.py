@@ -110,7 +110,9 @@ class Encounter(db.Model, FeatherModel):
         return self.sighting
 
     def get_location(self):
-        edm_data = current_app.edm.get_dict('encounter.data_complete', self.guid)
+        edm_data = current_app.edm.get_dict_cached(
+            'encounter.data_complete', self.guid, self.version
+        )
         location_id = None
         if isinstance(edm_data, dict) and edm_data.get('success', False):
             edm_json = edm_data['result']
@@ -82,7 +82,9 @@ class EncounterByID(Resource):
         # note: should probably _still_ check edm for: stale cache, deletion!
         #      user.edm_sync(version)
 
-        response = current_app.edm.get_dict('encounter.data_complete', encounter.guid)
+        response = current_app.edm.get_dict_cached(
+            'encounter.data_complete', encounter.guid, encounter.version
+        )
         if not isinstance(response, dict):  # some non-200 thing, incl 404
             return response
         if not response.get('success', False):
@@ -269,7 +269,9 @@ class IndividualByID(Resource):
 
         from app.modules.individuals.schemas import DetailedIndividualSchema
 
-        rtn_json = current_app.edm.get_dict('individual.data_complete', individual.guid)
+        rtn_json = current_app.edm.get_dict_cached(
+            'individual.data_complete', individual.guid, individual.version
+        )
 
         if not isinstance(rtn_json, dict) or not rtn_json.get('success', False):
             return rtn_json
@@ -6,7 +6,7 @@ Missions database models
 import uuid
 import enum
 
-from app.extensions import db, HoustonModel, Timestamp
+from app.extensions import db, HoustonModel, Timestamp, search_trigram_index
 from app.extensions.git_store import GitStore
 
 from flask import current_app
@@ -81,14 +81,11 @@ class Mission(db.Model, HoustonModel, Timestamp):
         return title
 
     @classmethod
-    def query_search_term_hook(cls, term):
-        from sqlalchemy_utils.functions import cast_if
-        from sqlalchemy import String
-
+    def query_search_columns(cls):
         return (
-            cast_if(cls.guid, String).contains(term),
-            cls.title.contains(term),
-            cast_if(cls.owner_guid, String).contains(term),
+            cls.guid,
+            cls.title,
+            cls.owner_guid,
         )
 
     @property
@@ -245,6 +242,9 @@ class Mission(db.Model, HoustonModel, Timestamp):
             db.session.delete(self)
 
 
+search_trigram_index(Mission)
+
+
 class MissionCollection(GitStore):
     """
     MissionCollection database model.
@@ -298,6 +298,16 @@ class MissionCollection(GitStore):
 
         git_push.delay(str(self.guid))
 
+    def git_commit_pending_delay(self):
+        from .tasks import git_commit_pending
+
+        git_commit_pending.delay(str(self.guid))
+
+    def ensure_remote(self):
+        from .tasks import ensure_remote
+
+        ensure_remote(str(self.guid))
+
     def delete_remote_delay(self):
         from .tasks import delete_remote
 
@@ -436,15 +446,12 @@ class MissionTask(db.Model, HoustonModel, Timestamp):
         )
 
     @classmethod
-    def query_search_term_hook(cls, term):
-        from sqlalchemy_utils.functions import cast_if
-        from sqlalchemy import String
-
+    def query_search_columns(cls):
         return (
-            cast_if(cls.guid, String).contains(term),
-            cls.title.contains(term),
-            cast_if(cls.owner_guid, String).contains(term),
-            cast_if(cls.mission_guid, String).contains(term),
+            cls.guid,
+            cls.title,
+            cls.owner_guid,
+            cls.mission_guid,
         )
 
     @property
@@ -555,3 +562,6 @@ class MissionTask(db.Model, HoustonModel, Timestamp):
         while self.annotation_participations:
             db.session.delete(self.annotation_participations.pop())
         db.session.delete(self)
+
+
+search_trigram_index(MissionTask)
@@ -4,6 +4,7 @@ import logging
 import git
 from flask import current_app
 import requests.exceptions
+import sqlalchemy.exc
 
 from app.extensions.celery import celery
 from app.extensions.gitlab import GitlabInitializationError
@@ -12,6 +13,15 @@ from app.extensions.gitlab import GitlabInitializationError
 log = logging.getLogger(__name__)
 
 
+@celery.on_after_configure.connect
+def setup_periodic_tasks(sender, **kwargs):
+    sender.add_periodic_task(
+        10 * 60,
+        git_commit_pending_sweep.s(),
+        name='Commit Pending MissionCollection Changes',
+    )
+
+
 @celery.task(
     autoretry_for=(requests.exceptions.RequestException,),
     default_retry_delay=600,
@@ -67,6 +77,27 @@ def delete_remote(mission_collection_guid, ignore_error=True):
             raise
 
 
+@celery.task(
+    autoretry_for=(git.exc.GitCommandError, OSError, sqlalchemy.exc.SQLAlchemyError),
+    default_retry_delay=60,
+    max_retries=10,
+)
+def git_commit_pending(mission_collection_guid):
+    from .models import MissionCollection
+
+    mission_collection = MissionCollection.query.get(mission_collection_guid)
+    if mission_collection is None:
+        return  # mission collection doesn't exist in the database
+    mission_collection.git_commit_pending()
+
+
+@celery.task
+def git_commit_pending_sweep():
+    from .models import MissionCollection
+
+    MissionCollection.git_commit_pending_sweep()
+
+
 @celery.task(
     autoretry_for=(
         GitlabInitializationError,
@@ -82,9 +113,4 @@ def git_push(mission_collection_guid):
     mission_collection = MissionCollection.query.get(mission_collection_guid)
     if mission_collection is None:
         return  # mission collection doesn't exist in the database
-    repo = mission_collection.get_repository()
-    if 'origin' not in repo.remotes:
-        ensure_remote(mission_collection_guid)
-    log.debug('Pushing to authorized URL')
-    repo.git.push('--set-upstream', repo.remotes.origin, repo.head.ref)
-    log.debug(f'...pushed to {repo.head.ref}')
+    mission_collection.git_push()
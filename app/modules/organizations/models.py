@@ -98,7 +98,7 @@ class OrganizationEDMMixin(EDMObjectMixin):
                     user=user,
                 )
 
-                with db.session.begin():
+                with db.session.begin(subtransactions=True):
                     self.user_membership_enrollments.append(enrollment)
 
     def _process_logo(self, logo):
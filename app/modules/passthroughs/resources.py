@@ -10,6 +10,7 @@ import logging
 from flask import current_app, request
 from flask_restx_patched import Resource
 from app.extensions.api import Namespace
+from app.modules.users import permissions
 
 import json
 
@@ -38,6 +39,21 @@ class EDMPassthroughTargets(Resource):
         return targets
 
 
+@edm_pass.route('/cache')
+@edm_pass.login_required(oauth_scopes=['passthroughs:read'])
+class EDMPassthroughCache(Resource):
+    """
+    Statistics of the EDM documents cache.
+    """
+
+    @edm_pass.permission_required(permissions.AdminRolePermission())
+    def get(self):
+        """
+        Hits, misses and invalidations of the cached EDM documents.
+        """
+        return current_app.edm.data_cache.get_stats()
+
+
 @edm_pass.route('/<string:target>/', defaults={'path': None}, doc=False)
 @edm_pass.route('/<string:target>/<path:path>')
 @edm_pass.login_required(oauth_scopes=['passthroughs:read'])
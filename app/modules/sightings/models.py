@@ -441,7 +441,9 @@ class Sighting(db.Model, FeatherModel):
         return job_data
 
     def get_debug_sighting_json(self):
-        response = current_app.edm.get_dict('sighting.data_complete', self.guid)
+        response = current_app.edm.get_dict_cached(
+            'sighting.data_complete', self.guid, self.version
+        )
         if not isinstance(response, dict):  # some non-200 thing, incl 404
             return response
         if not response.get('success', False):
@@ -462,9 +464,23 @@ class Sighting(db.Model, FeatherModel):
         edm_response.pop('id', None)
         return self._augment_edm_json(edm_response)
 
-    def get_augmented_sighting_json(self):
-        if is_extension_enabled('edm'):
-            response = current_app.edm.get_dict('sighting.data_complete', self.guid)
+    @classmethod
+    def get_edm_complete_data_many(cls, sightings):
+        """The sighting.data_complete EDM responses of the sightings, fetched
+        concurrently, to pass to get_augmented_sighting_json()"""
+        return current_app.edm.fan_out(
+            current_app.edm.get_dict_cached,
+            [
+                ('sighting.data_complete', sighting.guid, sighting.version)
+                for sighting in sightings
+            ],
+        )
+
+    def get_augmented_sighting_json(self, response=None):
+        if response is None and is_extension_enabled('edm'):
+            response = current_app.edm.get_dict_cached(
+                'sighting.data_complete', self.guid, self.version
+            )
 
         if not isinstance(response, dict):  # some non-200 thing, incl 404
             return response
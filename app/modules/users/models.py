@@ -11,7 +11,12 @@ from flask import current_app
 from sqlalchemy_utils import types as column_types
 
 from flask_login import current_user  # NOQA
-from app.extensions import db, FeatherModel, is_extension_enabled
+from app.extensions import (
+    db,
+    FeatherModel,
+    is_extension_enabled,
+    search_trigram_index,
+)
 from app.modules import module_required, is_module_enabled
 from app.extensions.auth import security
 from app.extensions.api.parameters import _get_is_static_role_property
@@ -81,7 +86,7 @@ if is_extension_enabled('edm'):
                     is_researcher=False,
                     is_user_manager=False,
                 )
-                with db.session.begin():
+                with db.session.begin(subtransactions=True):
                     db.session.add(user)
                 db.session.refresh(user)
 
@@ -506,12 +511,12 @@ class User(db.Model, FeatherModel, UserEDMMixin):
         return None
 
     @classmethod
-    def query_search_term_hook(cls, term):
+    def query_search_columns(cls):
         return (
-            cls.email.contains(term),
-            cls.affiliation.contains(term),
-            cls.forum_id.contains(term),
-            cls.full_name.contains(term),
+            cls.email,
+            cls.affiliation,
+            cls.forum_id,
+            cls.full_name,
         )
 
     @property
@@ -670,9 +675,17 @@ class User(db.Model, FeatherModel, UserEDMMixin):
 
     @module_required('sightings', resolve='warn', default=[])
     def get_sightings_json(self, start, end):
+        from app.modules.sightings.models import Sighting
+
+        sightings = self.get_sightings()[start:end]
+        if not is_extension_enabled('edm'):
+            return [sighting.get_augmented_sighting_json() for sighting in sightings]
+
+        # One concurrent fan out to the EDM rather than a round trip per sighting
+        responses = Sighting.get_edm_complete_data_many(sightings)
         return [
-            sighting.get_augmented_sighting_json()
-            for sighting in self.get_sightings()[start:end]
+            sighting.get_augmented_sighting_json(response)
+            for sighting, response in zip(sightings, responses)
         ]
 
     def get_id(self):
@@ -923,6 +936,9 @@ class User(db.Model, FeatherModel, UserEDMMixin):
         return None
 
 
+search_trigram_index(User)
+
+
 USER_ROLES = [
     role.value[-1]
     for role in User.StaticRoles.__members__.values()
@@ -59,6 +59,7 @@ OBJECT_USER_MAP = {
     ('SiteSetting', AccessOperation.WRITE): ['is_admin'],
     ('SiteSetting', AccessOperation.DELETE): ['is_admin'],
     ('AssetGroup', AccessOperation.READ_PRIVILEGED): ['is_staff'],
+    ('AssetGroup', AccessOperation.WRITE_PRIVILEGED): ['is_internal'],
     ('AssetGroupSighting', AccessOperation.READ): [
         'is_admin',
         'is_researcher',
@@ -5,6 +5,9 @@ Houston Common utils
 --------------------------
 """
 
+import collections
+import threading
+
 from flask_login import current_user  # NOQA
 import app.extensions.logging as AuditLog  # NOQA
 
@@ -30,6 +33,44 @@ class HoustonException(Exception):
         return self._kwargs.get(argval, default)
 
 
+class LRUCache(object):
+    """Small thread safe least recently used cache"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def items(self):
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
 # h/t https://www.delftstack.com/howto/python/python-unicode-to-string/
 def to_ascii(val):
     if val is None or not isinstance(val, str):
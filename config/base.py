@@ -284,6 +284,16 @@ class ACMConfig(object):
     ACM_URIS, ACM_AUTHENTICATIONS = get_env_rest_config('ACM')
     if 'default' not in ACM_URIS:
         ACM_URIS['default'] = 'https://sandbox.tier2.dyn.wildme.io'
+    # Connection pools kept alive per target and connections kept per pool
+    ACM_POOL_CONNECTIONS = int(os.getenv('ACM_POOL_CONNECTIONS', 10))
+    ACM_POOL_MAXSIZE = int(os.getenv('ACM_POOL_MAXSIZE', 32))
+    # Concurrent fan out calls to each target
+    ACM_MAX_CONCURRENCY = int(os.getenv('ACM_MAX_CONCURRENCY', ACM_POOL_MAXSIZE))
+    # Seconds a request waits for the same request in flight before sending its own
+    ACM_COALESCED_TIMEOUT = int(os.getenv('ACM_COALESCED_TIMEOUT', 300))
+
+    # Most images sent to Sage in one detection job
+    SAGE_DETECTION_BATCH_SIZE = int(os.getenv('SAGE_DETECTION_BATCH_SIZE', 500))
 
 
 class EDMConfig(object):
@@ -291,6 +301,25 @@ class EDMConfig(object):
     EDM_URIS, EDM_AUTHENTICATIONS = get_env_rest_config('EDM')
     if 'default' not in EDM_URIS:
         EDM_URIS['default'] = 'https://nextgen.dev-wildbook.org/'
+    # Connection pools kept alive per target and connections kept per pool
+    EDM_POOL_CONNECTIONS = int(os.getenv('EDM_POOL_CONNECTIONS', 10))
+    EDM_POOL_MAXSIZE = int(os.getenv('EDM_POOL_MAXSIZE', 32))
+    # Concurrent fan out calls to each target
+    EDM_MAX_CONCURRENCY = int(os.getenv('EDM_MAX_CONCURRENCY', EDM_POOL_MAXSIZE))
+    # Seconds a request waits for the same request in flight before sending its own
+    EDM_COALESCED_TIMEOUT = int(os.getenv('EDM_COALESCED_TIMEOUT', 300))
+
+    # EDM documents cached in process (0 disables the cache), seconds they are kept
+    # at most and whether they are cached in Redis instead.  Only the Redis cache is
+    # shared by, and invalidated from, all the processes, so the in process cache is
+    # off by default
+    EDM_DATA_CACHE_SIZE = int(os.getenv('EDM_DATA_CACHE_SIZE', 0))
+    EDM_DATA_CACHE_TTL = int(os.getenv('EDM_DATA_CACHE_TTL', 3600))
+    EDM_DATA_CACHE_REDIS = bool(int(os.getenv('EDM_DATA_CACHE_REDIS', 0)))
+
+    # Concurrent EDM fetches and items committed per transaction by edm_sync_all
+    EDM_SYNC_WORKERS = int(os.getenv('EDM_SYNC_WORKERS', 8))
+    EDM_SYNC_BATCH_SIZE = int(os.getenv('EDM_SYNC_BATCH_SIZE', 500))
 
 
 class AssetGroupConfig(object):
@@ -301,6 +330,10 @@ class AssetGroupConfig(object):
     GITLAB_REMOTE_LOGIN_PAT = os.getenv('GITLAB_REMOTE_LOGIN_PAT')
     # FIXME: Note, if you change the SSH key, you should also delete the ssh_id file (see GIT_SSH_KEY_FILEPATH)
     GIT_SSH_KEY = os.getenv('GIT_SSH_KEY')
+    # Files larger than this are stored without delta compression
+    GIT_BIG_FILE_THRESHOLD = os.getenv('GIT_BIG_FILE_THRESHOLD', '16m')
+    # Space separated patterns of files to store with git-lfs (if installed)
+    GIT_LFS_PATTERNS = os.getenv('GIT_LFS_PATTERNS', '').split()
 
     #: using lowercase so Flask won't pick it up as a legit setting
     default_git_ssh_key_filepath = DATA_ROOT / 'id_ssh_key'
@@ -351,6 +384,25 @@ class ElasticsearchConfig:
     # - to specify a port use a colon and port number (e.g. `elasticsearch:9200`)
     ELASTICSEARCH_HOSTS = _parse_elasticsearch_hosts(os.getenv('ELASTICSEARCH_HOSTS'))
 
+    # Bulk indexing configuration
+    # - documents are sent in batches of at most BULK_CHUNK_SIZE documents
+    #   and BULK_MAX_CHUNK_BYTES bytes, whichever limit is hit first
+    # - BULK_THREAD_COUNT is the number of bulk requests kept in flight
+    ELASTICSEARCH_BULK_CHUNK_SIZE = int(os.getenv('ELASTICSEARCH_BULK_CHUNK_SIZE', 500))
+    ELASTICSEARCH_BULK_MAX_CHUNK_BYTES = int(
+        os.getenv('ELASTICSEARCH_BULK_MAX_CHUNK_BYTES', 10 * 1024 * 1024)
+    )
+    ELASTICSEARCH_BULK_THREAD_COUNT = int(os.getenv('ELASTICSEARCH_BULK_THREAD_COUNT', 4))
+
+    # Number of rows fetched at a time from the server-side cursors used to
+    # stream the index queries (bounds the worker memory used while indexing)
+    ELASTICSEARCH_INDEX_FETCH_SIZE = int(os.getenv('ELASTICSEARCH_INDEX_FETCH_SIZE', 1000))
+
+    # Number of index change feed entries reindexed per batch
+    ELASTICSEARCH_INDEX_CHANGE_BATCH_SIZE = int(
+        os.getenv('ELASTICSEARCH_INDEX_CHANGE_BATCH_SIZE', 500)
+    )
+
 
 class WildbookDatabaseConfig:
     WILDBOOK_DB_USER = os.getenv('WILDBOOK_DB_USER')
@@ -359,6 +411,12 @@ class WildbookDatabaseConfig:
     WILDBOOK_DB_PORT = os.getenv('WILDBOOK_DB_PORT', '5432')
     WILDBOOK_DB_NAME = os.getenv('WILDBOOK_DB_NAME')
 
+    # Connection pool sizing for the engines used to sync the search indexes
+    # (both the wildbook and houston database engines use these settings)
+    WILDBOOK_DB_POOL_SIZE = int(os.getenv('WILDBOOK_DB_POOL_SIZE', 5))
+    WILDBOOK_DB_MAX_OVERFLOW = int(os.getenv('WILDBOOK_DB_MAX_OVERFLOW', 5))
+    WILDBOOK_DB_POOL_RECYCLE = int(os.getenv('WILDBOOK_DB_POOL_RECYCLE', 3600))
+
     @property
     def WILDBOOK_DB_URI(self):
         user = self.WILDBOOK_DB_USER
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Search trigram indexes
+
+Revision ID: 5b2d8e4a9c13
+Revises: 3c7f0c1d2b8a
+Create Date: 2022-02-23 14:37:09.512846
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2d8e4a9c13'
+down_revision = '3c7f0c1d2b8a'
+
+
+# Must match query_search_document() of the models, see search_trigram_index()
+SEARCH_DOCUMENTS = {
+    'user': (
+        "coalesce(email, '') || ' ' || coalesce(affiliation, '') || ' ' || "
+        "coalesce(forum_id, '') || ' ' || coalesce(full_name, '')"
+    ),
+    'mission': (
+        "coalesce(CAST(guid AS VARCHAR), '') || ' ' || coalesce(title, '') || ' ' || "
+        "coalesce(CAST(owner_guid AS VARCHAR), '')"
+    ),
+    'mission_task': (
+        "coalesce(CAST(guid AS VARCHAR), '') || ' ' || coalesce(title, '') || ' ' || "
+        "coalesce(CAST(owner_guid AS VARCHAR), '') || ' ' || "
+        "coalesce(CAST(mission_guid AS VARCHAR), '')"
+    ),
+}
+
+
+def upgrade():
+    """
+    Upgrade Semantic Description:
+        Add trigram (GIN) indexes for the user, mission and mission task searches
+    """
+    if 'sqlite' in op.get_bind().dialect.dialect_description:
+        # SQLite cannot use an index for LIKE '%term%', nothing to gain
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table_name, document in SEARCH_DOCUMENTS.items():
+        op.execute(
+            'CREATE INDEX IF NOT EXISTS ix_%s_search_trgm '
+            'ON "%s" USING gin ((%s) gin_trgm_ops)' % (table_name, table_name, document)
+        )
+
+
+def downgrade():
+    """
+    Downgrade Semantic Description:
+        Remove the search trigram indexes
+    """
+    if 'sqlite' in op.get_bind().dialect.dialect_description:
+        return
+
+    for table_name in SEARCH_DOCUMENTS:
+        op.execute('DROP INDEX IF EXISTS ix_%s_search_trgm' % (table_name,))
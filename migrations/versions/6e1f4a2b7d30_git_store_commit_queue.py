@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Git store commit queue
+
+Revision ID: 6e1f4a2b7d30
+Revises: 5b2d8e4a9c13
+Create Date: 2022-02-24 10:12:41.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1f4a2b7d30'
+down_revision = '5b2d8e4a9c13'
+
+
+def upgrade():
+    """
+    Upgrade Semantic Description:
+        Add the queued commit messages and last pushed commit of git stores
+    """
+    with op.batch_alter_table('git_store', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pending_commit_messages', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('pushed_commit', sa.String(length=40), nullable=True))
+
+
+def downgrade():
+    """
+    Downgrade Semantic Description:
+        Remove the queued commit messages and last pushed commit of git stores
+    """
+    with op.batch_alter_table('git_store', schema=None) as batch_op:
+        batch_op.drop_column('pushed_commit')
+        batch_op.drop_column('pending_commit_messages')
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Asset group sighting job registry
+
+Revision ID: 7a3c9e5d1f42
+Revises: 6e1f4a2b7d30
+Create Date: 2022-02-25 09:41:17.530164
+
+"""
+from datetime import datetime
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+import app
+import app.extensions
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3c9e5d1f42'
+down_revision = '6e1f4a2b7d30'
+
+
+def _parse_start(value):
+    # Dates in the jobs JSON are stored in the flask JSON format
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, '%a, %d %b %Y %H:%M:%S %Z')
+        except ValueError:
+            pass
+    return datetime.utcnow()
+
+
+def upgrade():
+    """
+    Upgrade Semantic Description:
+        Add the indexed registry of the asset group sighting detection jobs
+        and fill it from the jobs JSON of the asset group sightings
+    """
+    job_table = op.create_table(
+        'asset_group_sighting_job',
+        sa.Column('job_guid', app.extensions.GUID(), nullable=False),
+        sa.Column('asset_group_sighting_guid', app.extensions.GUID(), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column(
+            'status',
+            sa.Enum(
+                'active', 'completed', 'failed', name='assetgroupsightingjobstatus'
+            ),
+            nullable=False,
+        ),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('start', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['asset_group_sighting_guid'],
+            ['asset_group_sighting.guid'],
+            name=op.f(
+                'fk_asset_group_sighting_job_asset_group_sighting_guid_asset_group_sighting'
+            ),
+            ondelete='CASCADE',
+        ),
+        sa.PrimaryKeyConstraint(
+            'job_guid',
+            'asset_group_sighting_guid',
+            name=op.f('pk_asset_group_sighting_job'),
+        ),
+    )
+    with op.batch_alter_table('asset_group_sighting_job', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_asset_group_sighting_job_active_start',
+            ['active', 'start'],
+            unique=False,
+        )
+        batch_op.create_index(
+            batch_op.f('ix_asset_group_sighting_job_asset_group_sighting_guid'),
+            ['asset_group_sighting_guid'],
+            unique=False,
+        )
+        batch_op.create_index(
+            batch_op.f('ix_asset_group_sighting_job_status'), ['status'], unique=False
+        )
+
+    rows = []
+    connection = op.get_bind()
+    for guid, jobs in connection.execute(
+        sa.text('SELECT guid, jobs FROM asset_group_sighting')
+    ):
+        if isinstance(jobs, str):
+            jobs = json.loads(jobs)
+        for job_id, job in (jobs or {}).items():
+            active = bool(job.get('active'))
+            rows.append(
+                {
+                    'job_guid': job_id,
+                    'asset_group_sighting_guid': guid,
+                    'model': job.get('model'),
+                    'status': 'active' if active else 'completed',
+                    'active': active,
+                    'start': _parse_start(job.get('start')),
+                }
+            )
+    if rows:
+        op.bulk_insert(job_table, rows)
+
+
+def downgrade():
+    """
+    Downgrade Semantic Description:
+        Remove the asset group sighting job registry, the jobs JSON is kept up
+        to date so nothing is lost
+    """
+    with op.batch_alter_table('asset_group_sighting_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_asset_group_sighting_job_status'))
+        batch_op.drop_index(
+            batch_op.f('ix_asset_group_sighting_job_asset_group_sighting_guid')
+        )
+        batch_op.drop_index('ix_asset_group_sighting_job_active_start')
+
+    op.drop_table('asset_group_sighting_job')
+    sa.Enum(name='assetgroupsightingjobstatus').drop(op.get_bind(), checkfirst=True)
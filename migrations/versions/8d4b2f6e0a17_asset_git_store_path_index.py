@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Asset git store path index
+
+Revision ID: 8d4b2f6e0a17
+Revises: 7a3c9e5d1f42
+Create Date: 2022-02-25 15:03:52.114870
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4b2f6e0a17'
+down_revision = '7a3c9e5d1f42'
+
+
+def upgrade():
+    """
+    Upgrade Semantic Description:
+        Index the assets of a git store by path
+    """
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_asset_git_store_guid_path', ['git_store_guid', 'path'], unique=False
+        )
+
+
+def downgrade():
+    """
+    Downgrade Semantic Description:
+        Remove the index of the assets of a git store by path
+    """
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_index('ix_asset_git_store_guid_path')
@@ -16,3 +16,56 @@ def embed(context):
     import utool as ut
 
     ut.embed()
+
+
+@app_context_task(
+    help={
+        'count': 'Number of entries in the canned individual.list payload',
+        'repeat': 'Number of timed runs, the best one is reported',
+    }
+)
+def benchmark_edm_decoding(context, count=50000, repeat=3):
+    """Time the decoding of a large canned EDM list response"""
+    import json
+    import timeit
+    import uuid
+    from collections import namedtuple
+
+    from app.extensions.restManager.RestManager import KEYWORD_SET, decode_json_objects
+
+    payload = json.dumps(
+        [
+            {
+                'id': str(uuid.uuid4()),
+                'version': index,
+                'names': [{'context': 'defaultName', 'value': f'name-{index}'}],
+                'class': 'org.ecocean.Individual',
+            }
+            for index in range(int(count))
+        ]
+    ).encode('utf-8')
+
+    def decode_as_dicts():
+        json.loads(payload)
+
+    def decode_as_objects():
+        response = decode_json_objects(payload)
+        assert len(response) == int(count)
+
+    def legacy_object_hook(data):
+        # The previous hook, creating a namedtuple type for every object
+        keys = [f'{key}_' if key in KEYWORD_SET else key for key in data.keys()]
+        return namedtuple('obj', keys)(*data.values())
+
+    def decode_as_legacy_objects():
+        response = json.loads(payload.decode('utf-8'), object_hook=legacy_object_hook)
+        assert len(response) == int(count)
+
+    print(f'Decoding {int(count)} individual.list entries ({len(payload)} bytes)')
+    for name, func in [
+        ('dicts', decode_as_dicts),
+        ('legacy', decode_as_legacy_objects),
+        ('objects', decode_as_objects),
+    ]:
+        elapsed = min(timeit.repeat(func, number=1, repeat=int(repeat)))
+        print(f'{name:>8}: {elapsed:.3f} seconds')
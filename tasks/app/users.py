@@ -164,11 +164,22 @@ def list_all(context):
         print('User : {} '.format(user))
 
 
-@app_context_task
-def sync_edm(context, refresh=False):
+@app_context_task(
+    help={
+        'dry-run': 'Only report what would be added and updated',
+        'checkpoint': 'File of the synced users, to resume an interrupted sync',
+    }
+)
+def sync_edm(context, refresh=False, dry_run=False, checkpoint=None):
     """
     Sync the users from the EDM onto the local Hudson
     """
     from app.modules.users.models import User
 
-    User.edm_sync_all(refresh=refresh)
+    edm_items, new_items, updated_items, failed_items = User.edm_sync_all(
+        refresh=refresh, dry_run=dry_run, checkpoint=checkpoint
+    )
+    print(
+        f'{len(edm_items)} in EDM: {len(new_items)} new, {len(updated_items)} updated, '
+        f'{len(failed_items)} failed{" (dry run)" if dry_run else ""}'
+    )
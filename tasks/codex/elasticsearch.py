@@ -12,10 +12,11 @@ from datetime import datetime, timedelta
         'before': 'YYYY-MM-DD hh:mm:ss - index when modified before this date',
         'batch-size': 'how many to index each batch',
         'batch-pause': 'seconds to pause between batches',
+        'partitions': 'how many guid ranges to index concurrently (per index type)',
     }
 )
-def catchup_index(context, before, batch_size=100, batch_pause=3):
-    from app.modules.elasticsearch.tasks import catchup_index_set
+def catchup_index(context, before, batch_size=100, batch_pause=3, partitions=4):
+    from app.modules.elasticsearch.tasks import catchup_index_reset, catchup_index_set
 
     """
     Start indexing historic data before a certain date, in batches.
@@ -26,7 +27,10 @@ def catchup_index(context, before, batch_size=100, batch_pause=3):
         'before': datetime.fromisoformat(before).strftime('%Y-%m-%d %H:%M:%S'),
         'batch_size': int(batch_size),
         'batch_pause': int(batch_pause),
+        'partitions': int(partitions),
     }
+    # Start from scratch, dropping any checkpoints from a previous catchup
+    catchup_index_reset()
     catchup_index_set(conf)
     _kickoff()
 
@@ -43,6 +47,30 @@ def catchup_index_continue(context):
     _kickoff()
 
 
+@app_context_task()
+def catchup_index_status(context):
+    """
+    Show the progress of the catchup indexing, with an estimated completion time.
+    """
+    from app.modules.elasticsearch.tasks import catchup_index_progress
+
+    progress = catchup_index_progress()
+    if not progress:
+        print('No catchup-index is running.')
+        return
+    print(
+        f"Catchup-index of data modified before {progress['before']}, "
+        f"started {progress['started']}: {progress['fraction']:.1%} done, "
+        f"ETA {progress['eta']}"
+    )
+    for index_type, type_progress in progress['types'].items():
+        print(
+            f"  {index_type}: {type_progress['fraction']:.1%} done, "
+            f"{type_progress['partitions_done']}/{progress['partitions']} partitions finished, "
+            f"{type_progress['batches']} batches"
+        )
+
+
 @app_context_task()
 def catchup_index_cancel(context):
     from app.modules.elasticsearch.tasks import catchup_index_reset
@@ -63,3 +91,73 @@ def _kickoff():
     print(
         f'Starting background catchup-indexing in {start_pause} seconds  [{async_res}].'
     )
+
+
+@app_context_task(
+    help={
+        'rows': 'how many synthetic index rows to reshape',
+    }
+)
+def benchmark_index_rows(context, rows=100000):
+    """
+    Benchmark the per-row reshaping of index query results.
+
+    Compares the previous reshaping (custom fields returned as JSON fragments
+    and merged per row, datetimes formatted and re-parsed) with the current one
+    (custom fields aggregated by the query, cached timezone offsets).  Both
+    include decoding the custom fields JSON, which the database driver does for
+    the aggregated custom fields of the current query.
+    """
+    import json
+    import timeit
+
+    from app.modules.elasticsearch.tasks import combine_datetime
+
+    def legacy_reshape(row):
+        result = dict(row)
+        if row['datetime']:
+            result['datetime'] = datetime.fromisoformat(
+                row['datetime'].isoformat() + result.pop('timezone')
+            )
+        if result['custom_fields']:
+            custom_fields = {}
+            for field_value_dict in json.loads(result['custom_fields']):
+                if not field_value_dict or not isinstance(field_value_dict, dict):
+                    continue
+                for field, value in field_value_dict.items():
+                    if field in custom_fields:
+                        if not isinstance(custom_fields[field], list):
+                            custom_fields[field] = [custom_fields[field]]
+                        custom_fields[field].append(value)
+                    else:
+                        custom_fields[field] = value
+            result['custom_fields'] = custom_fields
+        return result
+
+    rows = int(rows)
+    dt = datetime(2014, 4, 3, 21, 0)
+    legacy_row = {
+        'id': '0001b6e4-2f31-460c-a868-03620bad8fd6',
+        'datetime': dt,
+        'timezone': '+03:00',
+        'custom_fields': json.dumps(
+            [
+                {'2fe1c780-983c-41b9-9974-44d77a9a9035': 'no wind'},
+                {'9acc33ef-caa1-4341-b475-9a5d762cd243': 'Grazing'},
+                {'9acc33ef-caa1-4341-b475-9a5d762cd243': 'A second value'},
+            ]
+        ),
+    }
+    row = dict(legacy_row, custom_fields=legacy_reshape(legacy_row)['custom_fields'])
+    assert combine_datetime(row) == legacy_reshape(legacy_row)
+    custom_fields_json = json.dumps(row['custom_fields'])
+
+    def current_reshape():
+        # Decoded by the database driver for the current query
+        json.loads(custom_fields_json)
+        return combine_datetime(row)
+
+    legacy = timeit.timeit(lambda: legacy_reshape(legacy_row), number=rows)
+    current = timeit.timeit(current_reshape, number=rows)
+    print(f'legacy:  {legacy / rows * 1e6:.2f} us/row')
+    print(f'current: {current / rows * 1e6:.2f} us/row ({legacy / current:.1f}x faster)')
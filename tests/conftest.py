@@ -208,14 +208,17 @@ def flask_app(gitlab_remote_login_pat):
             if utils.redis_unavailable():
                 # Run code in foreground if redis not available
                 from app.modules.asset_groups import tasks
+                from app.modules.assets import tasks as asset_tasks
                 from app.modules.sightings import tasks as sighting_tasks
 
                 tasks_patch = []
                 for func in (
                     'delete_remote',
                     'ensure_remote',
+                    'git_commit_pending',
                     'git_push',
                     'sage_detection',
+                    'sage_detection_batch',
                 ):
                     tasks_patch.append(
                         mock.patch.object(
@@ -224,6 +227,13 @@ def flask_app(gitlab_remote_login_pat):
                             getattr(tasks, func),
                         ),
                     )
+                tasks_patch.append(
+                    mock.patch.object(
+                        asset_tasks.make_derived_images,
+                        'delay',
+                        asset_tasks.make_derived_images,
+                    ),
+                )
                 tasks_patch.append(
                     mock.patch.object(
                         getattr(sighting_tasks, 'send_identification'),
@@ -76,3 +76,173 @@ def test_reauthentication_fails(flask_app):
         random_id = uuid.uuid4()
         result = flask_app.edm.get_dict('encounter.data', random_id)
         assert result.status_code == 401
+
+
+@pytest.mark.skipif(extension_unavailable('edm'), reason='EDM extension disabled')
+def test_edm_sessions_share_connection_pool(flask_app):
+    import threading
+
+    flask_app.edm._ensure_initialized()
+    session = flask_app.edm.sessions['default']
+    adapter = session.get_adapter(flask_app.edm.uris['default'])
+
+    other = {}
+
+    def other_thread():
+        with flask_app.app_context():
+            flask_app.edm._ensure_session('default')
+            other['session'] = flask_app.edm.sessions['default']
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    thread.join()
+
+    # Each thread has its own session but they use the same pool and cookies
+    assert other['session'] is not session
+    assert other['session'].get_adapter(flask_app.edm.uris['default']) is adapter
+    assert other['session'].cookies is session.cookies
+    assert 'default' in flask_app.edm.get_pool_stats()
+
+
+@pytest.mark.skipif(extension_unavailable('edm'), reason='EDM extension disabled')
+def test_edm_sync_dry_run(flask_app, db, admin_user):
+    from app.modules.users.models import User
+
+    new_guid = uuid.uuid4()
+    edm_items = {
+        admin_user.guid: {'version': (admin_user.version or 0) + 1},
+        new_guid: {'version': 1},
+    }
+
+    new_guids, stale_items = User.edm_sync_plan(edm_items)
+    assert new_guids == [new_guid]
+    assert sorted(stale_items, key=str) == sorted(
+        [(admin_user.guid, (admin_user.version or 0) + 1), (new_guid, 1)], key=str
+    )
+    # Guids from a checkpoint are skipped
+    assert User.edm_sync_plan(edm_items, skip={admin_user.guid})[1] == [(new_guid, 1)]
+
+    with mock.patch.object(flask_app.edm, 'get_list', return_value=edm_items):
+        with mock.patch.object(flask_app.edm, 'get_data_item') as get_data_item:
+            result = User.edm_sync_all(verbose=False, dry_run=True)
+    assert result == (edm_items, [new_guid], [admin_user.guid], [])
+    assert not get_data_item.called
+    assert User.query.get(new_guid) is None
+
+
+@pytest.mark.skipif(extension_unavailable('edm'), reason='EDM extension disabled')
+def test_edm_data_cache(flask_app, monkeypatch):
+    from app.extensions.edm.cache import EDMDataCache
+
+    cache = EDMDataCache()
+    # The in process cache is only enabled explicitly
+    monkeypatch.setitem(flask_app.config, 'EDM_DATA_CACHE_REDIS', False)
+    monkeypatch.setitem(flask_app.config, 'EDM_DATA_CACHE_SIZE', 0)
+    assert not cache.enabled
+    monkeypatch.setitem(flask_app.config, 'EDM_DATA_CACHE_SIZE', 1024)
+    assert cache.enabled
+    sighting_guid, encounter_guid, other_guid = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    document = {
+        'success': True,
+        'result': {'id': str(sighting_guid), 'encounters': [{'id': str(encounter_guid)}]},
+    }
+    tag = 'sighting.data_complete'
+
+    assert cache.get('default', tag, sighting_guid, 1) is None
+    cache.set('default', tag, sighting_guid, 1, document, cache.get_generation())
+    cached = cache.get('default', tag, sighting_guid, 1)
+    assert cached == document
+    # Callers get their own copy to modify
+    cached['result'].pop('encounters')
+    assert cache.get('default', tag, sighting_guid, 1) == document
+
+    # Nothing is cached without a local version
+    cache.set('default', tag, other_guid, None, document, cache.get_generation())
+    assert cache.get('default', tag, other_guid, None) is None
+
+    # A new local version makes the document stale
+    assert cache.get('default', tag, sighting_guid, 2) is None
+    assert cache.get('default', tag, sighting_guid, 1) is None
+
+    # Changing an embedded encounter invalidates the sighting document
+    cache.set('default', tag, sighting_guid, 2, document, cache.get_generation())
+    cache.invalidate([other_guid])
+    assert cache.get('default', tag, sighting_guid, 2) == document
+    cache.invalidate([encounter_guid])
+    assert cache.get('default', tag, sighting_guid, 2) is None
+
+    # A document fetched before an invalidation is not cached
+    generation = cache.get_generation()
+    cache.invalidate([other_guid])
+    cache.set('default', tag, sighting_guid, 2, document, generation)
+    assert cache.get('default', tag, sighting_guid, 2) is None
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['stale'], stats['invalidations']) == (3, 1, 1)
+    assert stats['dropped'] == 1
+    assert stats['misses'] == 4
+    assert stats['size'] == 0
+
+
+@pytest.mark.skipif(extension_unavailable('edm'), reason='EDM extension disabled')
+def test_edm_sync_resume(flask_app, db, tmp_path):
+    import sqlalchemy
+
+    from app.modules.users.models import User
+
+    synced_guid, conflict_guid, unreachable_guid = (uuid.uuid4() for _ in range(3))
+    edm_items = {guid: {'version': 1} for guid in (synced_guid, conflict_guid)}
+    edm_items[unreachable_guid] = {'version': 1}
+    checkpoint = str(tmp_path / 'users.checkpoint')
+    failing = {conflict_guid, unreachable_guid}
+
+    def fetch_edm_data(guid, item_name=None):
+        if guid == unreachable_guid and guid in failing:
+            raise ConnectionError('EDM unreachable')
+        return mock.Mock(id=str(guid))
+
+    def process_edm_data(self, data, claimed_version):
+        if self.guid == conflict_guid and self.guid in failing:
+            raise sqlalchemy.exc.IntegrityError('UPDATE', {}, Exception('conflict'))
+        self.version = claimed_version
+
+    def sync():
+        with mock.patch.object(flask_app.edm, 'get_list', return_value=edm_items):
+            with mock.patch.object(
+                User, '_fetch_edm_data', side_effect=fetch_edm_data
+            ) as fetch:
+                with mock.patch.object(
+                    User, '_process_edm_data', autospec=True, side_effect=process_edm_data
+                ):
+                    result = User.edm_sync_all(
+                        verbose=False,
+                        refresh=True,
+                        checkpoint=checkpoint,
+                        batch_size=3,
+                        workers=2,
+                    )
+        return result, sorted(call.args[0] for call in fetch.call_args_list)
+
+    try:
+        # The chunk fails on the conflict and is applied item by item
+        (_, new_items, updated_items, failed_items), fetched = sync()
+        assert fetched == sorted(edm_items)
+        assert [user.guid for user in new_items] == [synced_guid]
+        assert updated_items == []
+        assert sorted(failed_items) == sorted(failing)
+        # Only the committed item is checkpointed, and the checkpoint is kept
+        with open(checkpoint) as checkpoint_file:
+            assert checkpoint_file.read() == f'{synced_guid}\n'
+
+        # The next run resumes with the failed items only
+        failing.clear()
+        (_, new_items, updated_items, failed_items), fetched = sync()
+        assert fetched == sorted([conflict_guid, unreachable_guid])
+        assert sorted(user.guid for user in new_items) == fetched
+        assert failed_items == []
+        assert not (tmp_path / 'users.checkpoint').exists()
+        assert User.query.get(conflict_guid).version == 1
+    finally:
+        with db.session.begin():
+            for user in User.query.filter(User.guid.in_(list(edm_items))):
+                db.session.delete(user)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=missing-docstring
+import os
+from unittest import mock
+
+import pytest
+import xxhash
+
+from tests.utils import module_unavailable
+
+
+def test_compute_xxhash64_digest_filepath(tmp_path):
+    from app.extensions.git_store import compute_xxhash64_digest_filepath
+
+    data = os.urandom(10000)
+    filepath = tmp_path / 'data.bin'
+    filepath.write_bytes(data)
+
+    # Streaming gives the same digest as hashing the whole file at once
+    expected = xxhash.xxh64_hexdigest(data)
+    assert compute_xxhash64_digest_filepath(str(filepath)) == expected
+    assert compute_xxhash64_digest_filepath(str(filepath), chunk_size=3) == expected
+    assert compute_xxhash64_digest_filepath(str(filepath), chunk_size=5000) == expected
+
+    # Failures give no digest
+    assert compute_xxhash64_digest_filepath(str(tmp_path / 'missing.bin')) is None
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_update_asset_symlinks_hashes_changed_files(test_asset_group_uuid):
+    from app.extensions import git_store
+    from app.modules.asset_groups.models import AssetGroup
+
+    asset_group = AssetGroup.query.get(test_asset_group_uuid)
+    asset_group.update_asset_symlinks(verbose=False)
+    file_cache = asset_group.load_file_cache()
+    assert file_cache
+    assert os.path.dirname(asset_group.get_file_cache_path()).endswith('.git')
+
+    # Unchanged files are not hashed again
+    compute = mock.Mock(wraps=git_store.compute_xxhash64_digest_filepath)
+    with mock.patch.object(git_store, 'compute_xxhash64_digest_filepath', compute):
+        asset_group.update_asset_symlinks(verbose=False)
+    assert compute.call_count == 0
+
+    # A modified file is
+    relative_path = sorted(file_cache)[0]
+    filepath = os.path.join(asset_group.get_absolute_path(), relative_path)
+    stat = os.stat(filepath)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    with mock.patch.object(git_store, 'compute_xxhash64_digest_filepath', compute):
+        asset_group.update_asset_symlinks(verbose=False)
+    assert [call[0][0] for call in compute.call_args_list] == [filepath]
+    assert asset_group.load_file_cache()[relative_path] == dict(
+        file_cache[relative_path], mtime=stat.st_mtime_ns + 1000
+    )
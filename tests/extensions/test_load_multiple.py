@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=invalid-name,missing-docstring
+import uuid
+
+from sqlalchemy import event
+
+
+def test_load_multiple(flask_app, db, researcher_1, readonly_user):
+    from app.modules.users.models import User
+
+    statements = []
+
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    missing_guid = uuid.uuid4()
+    guids = [readonly_user.guid, missing_guid, str(researcher_1.guid), 'not-a-guid']
+
+    # Results are in input order, with explicit misses
+    assert User.load_multiple(guids) == [readonly_user, None, researcher_1, None]
+    assert User.get_multiple(guids + [readonly_user.guid]) == [
+        readonly_user,
+        researcher_1,
+    ]
+
+    event.listen(db.engine, 'before_cursor_execute', count_statements)
+    try:
+        # Objects already loaded in this session are not queried again
+        assert User.load_multiple([researcher_1.guid, readonly_user.guid]) == [
+            researcher_1,
+            readonly_user,
+        ]
+        assert statements == []
+
+        # Only the misses go to the database, in batches
+        assert User.load_multiple([missing_guid, uuid.uuid4()], batch_size=1) == [
+            None,
+            None,
+        ]
+        assert len(statements) == 2
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_statements)
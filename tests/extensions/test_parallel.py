@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+
+def _square(value, delay=0):
+    time.sleep(delay)
+    if value < 0:
+        raise ValueError(value)
+    return value * value
+
+
+def test_parallel_iter_streams_generator():
+    from app.extensions import parallel_iter
+
+    consumed = []
+
+    def args_generator():
+        for value in range(20):
+            consumed.append(value)
+            yield (value,)
+
+    results = parallel_iter(_square, args_generator(), workers=2, in_flight=2)
+    first = next(results)
+    # Only a bounded number of calls has been taken from the generator
+    assert len(consumed) <= 3
+    assert sorted([first] + list(results)) == [value * value for value in range(20)]
+
+
+def test_parallel_iter_ordered():
+    from app.extensions import parallel_iter
+
+    args_list = [(value,) for value in range(10)]
+    # Earlier calls take longer, so they complete last
+    kwargs_list = [{'delay': (10 - value) * 0.01} for value in range(10)]
+    results = list(
+        parallel_iter(_square, args_list, kwargs_list, workers=4, ordered=True)
+    )
+    assert results == [value * value for value in range(10)]
+
+
+@pytest.mark.parametrize('thread', [True, False])
+def test_parallel_iter_partial_failures(thread):
+    from app.extensions import parallel_iter
+
+    args_list = [(1,), (-2,), (3,), (-4,)]
+    errors = []
+    results = parallel_iter(
+        _square,
+        args_list,
+        thread=thread,
+        workers=2,
+        chunksize=2,
+        ordered=True,
+        progress='log',
+        errors=errors,
+    )
+    assert list(results) == [1, 9]
+    assert [(args, str(exception)) for args, _, exception in errors] == [
+        ((-2,), '-2'),
+        ((-4,), '-4'),
+    ]
+
+    with pytest.raises(ValueError):
+        list(parallel_iter(_square, args_list, thread=thread, workers=2))
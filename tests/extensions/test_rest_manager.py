@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=missing-docstring
+import json
+
+import pytest
+
+
+def test_decode_json_objects_reuses_record_types():
+    from app.extensions.restManager.RestManager import decode_json_objects
+
+    payload = json.dumps(
+        [
+            {'id': 'a', 'version': 1, 'logo': {'uuid': 'x', 'class': 'y'}},
+            {'id': 'b', 'version': 2, 'logo': {'uuid': 'z', 'class': 'w'}},
+        ]
+    )
+    first, second = decode_json_objects(payload.encode('utf-8'))
+
+    assert (first.id, first.version, second.id, second.version) == ('a', 1, 'b', 2)
+    assert first._fields == ('id', 'version', 'logo')
+    # Keywords are renamed with a trailing underscore
+    assert second.logo.class_ == 'w'
+    # Objects with the same keys share one record type
+    assert type(first) is type(second)
+    assert type(first.logo) is type(second.logo)
+    assert decode_json_objects(payload)[1].logo.uuid == 'z'
+
+
+class _FakeResponse(object):
+    ok = True
+
+    def __init__(self, value):
+        self.value = value
+
+    def json(self):
+        return {'value': self.value}
+
+
+def _make_manager(request_func):
+    from app.extensions.restManager.RestManager import RestManager
+
+    class TestManager(RestManager):
+        NAME = 'TEST'
+        ENDPOINT_PREFIX = 'api'
+        ENDPOINTS = {'item': {'data': '//v0/item/%s'}}
+
+    manager = TestManager()
+    manager._ensure_initialized = lambda: None
+    manager._request = request_func
+    return manager
+
+
+def test_rest_manager_coalesces_gets(flask_app):
+    import threading
+    import time
+
+    sent = []
+
+    def request_func(method, tag, guid, **kwargs):
+        sent.append(guid)
+        time.sleep(0.2)
+        return _FakeResponse(guid)
+
+    manager = _make_manager(request_func)
+    results = []
+
+    def get():
+        with flask_app.app_context():
+            results.append(manager.get_dict('item.data', 'a'))
+
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sent == ['a']
+    assert results == [{'value': 'a'}] * 5
+    # Every caller gets its own decoded copy
+    assert len(set(id(result) for result in results)) == 5
+
+    # Once the request completed, it is sent again
+    assert manager.get_dict('item.data', 'a') == {'value': 'a'}
+    assert sent == ['a', 'a']
+
+
+def test_rest_manager_coalesced_failures(flask_app, monkeypatch):
+    import threading
+    import time
+
+    class Interrupted(BaseException):
+        pass
+
+    sent = []
+
+    def request_func(method, tag, guid, **kwargs):
+        sent.append(guid)
+        time.sleep(0.2)
+        if len(sent) == 1:
+            raise Interrupted()
+        return _FakeResponse(guid)
+
+    manager = _make_manager(request_func)
+    results = []
+
+    def get():
+        with flask_app.app_context():
+            try:
+                results.append(manager.get_dict('item.data', 'a'))
+            except Interrupted as exception:
+                results.append(exception)
+
+    # Waiters are released when the request they wait for is interrupted
+    threads = [threading.Thread(target=get) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert sent == ['a']
+    assert all(isinstance(result, Interrupted) for result in results)
+
+    # Waiters give up on a request in flight for too long and send their own
+    monkeypatch.setitem(flask_app.config, 'TEST_COALESCED_TIMEOUT', 0.05)
+    results.clear()
+    threads = [threading.Thread(target=get) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert sent == ['a', 'a', 'a']
+    assert results == [{'value': 'a'}] * 2
+
+
+def test_rest_manager_fan_out(flask_app):
+    def request_func(method, tag, guid, **kwargs):
+        if guid == 'bad':
+            raise ValueError(guid)
+        return _FakeResponse(guid)
+
+    manager = _make_manager(request_func)
+    guids = [str(index) for index in range(20)]
+
+    results = manager.fan_out(manager.get_dict, [('item.data', guid) for guid in guids])
+    assert results == [{'value': guid} for guid in guids]
+
+    results = manager.fan_out(
+        manager.get_dict,
+        [('item.data', 'bad'), ('item.data', '1')],
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], ValueError)
+    assert results[1] == {'value': '1'}
+
+    with pytest.raises(ValueError):
+        manager.fan_out(manager.get_dict, [('item.data', 'bad')])
@@ -382,11 +382,14 @@ class AssetGroupCreationData(object):
 def create_asset_group(
     flask_app_client, user, data, expected_status_code=200, expected_error=''
 ):
-    from app.modules.asset_groups.tasks import sage_detection
+    from app.modules.asset_groups.tasks import sage_detection, sage_detection_batch
 
     # Call sage_detection in the foreground by skipping "delay"
     with mock.patch(
         'app.modules.asset_groups.tasks.sage_detection.delay', side_effect=sage_detection
+    ), mock.patch(
+        'app.modules.asset_groups.tasks.sage_detection_batch.delay',
+        side_effect=sage_detection_batch,
     ):
         if user:
             with flask_app_client.login(user, auth_scopes=('asset_groups:write',)):
@@ -454,8 +457,9 @@ def create_asset_group_sim_sage_init_resp(
             }
             assert params['endpoint'] == '/api/engine/detect/cnn/lightnet/'
             assert re.match('[a-f0-9-]{36}', params['jobid'])
+            # Sent by the asset group for all its sightings at creation
             assert re.match(
-                r'houston\+http://houston:5000/api/v1/asset_groups/sighting/[a-f0-9-]{36}/sage_detected/'
+                r'houston\+http://houston:5000/api/v1/asset_groups/[a-f0-9-]{36}/sage_detected/'
                 + params['jobid'],
                 params['callback_url'],
             )
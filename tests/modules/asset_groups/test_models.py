@@ -14,7 +14,12 @@ from tests.utils import module_unavailable, extension_unavailable
     module_unavailable('asset_groups'), reason='AssetGroups module disabled'
 )
 def test_asset_group_sightings_jobs(flask_app, db, admin_user, test_root, request):
-    from app.modules.asset_groups.models import AssetGroup, AssetGroupSighting
+    from app.modules.asset_groups.models import (
+        AssetGroup,
+        AssetGroupSighting,
+        AssetGroupSightingJob,
+        AssetGroupSightingJobStatus,
+    )
 
     transaction_id = str(uuid.uuid4())
     trans_dir = (
@@ -83,6 +88,21 @@ def test_asset_group_sightings_jobs(flask_app, db, admin_user, test_root, reques
         },
     }
 
+    # The jobs are indexed in the job registry too
+    active_jobs = {
+        (job.asset_group_sighting_guid, job.job_guid): job
+        for job in AssetGroupSightingJob.get_active_jobs()
+    }
+    assert active_jobs[(ags1.guid, job_id1)].start == now
+    assert active_jobs[(ags2.guid, job_id2)].model == 'african_terrestrial'
+    assert ags1.any_jobs_active()
+
+    ags1.job_complete(str(job_id1))
+    assert not ags1.any_jobs_active()
+    job = AssetGroupSightingJob.query.get((job_id1, ags1.guid))
+    assert job.status == AssetGroupSightingJobStatus.completed
+    assert not job.active
+
 
 @pytest.mark.skipif(
     module_unavailable('asset_groups'), reason='AssetGroups module disabled'
@@ -119,6 +139,230 @@ def test_asset_group_sightings_bulk(
             )
 
 
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_group_sightings_detection_batch(
+    flask_app, flask_app_client, researcher_1, internal_user, test_root, request
+):
+    import json
+
+    from app.modules.annotations.models import Annotation
+    from app.modules.asset_groups.models import (
+        AssetGroupSighting,
+        AssetGroupSightingStage,
+    )
+
+    # Sightings of 2 and 2 images, packed into jobs of 3 images
+    data = asset_group_utils.get_bulk_creation_data(
+        test_root, request, 'african_terrestrial'
+    )
+    with mock.patch.dict(flask_app.config, {'SAGE_DETECTION_BATCH_SIZE': 3}):
+        with mock.patch.object(
+            flask_app.acm, 'request_passthrough_result', return_value={'success': True}
+        ) as detection_started:
+            resp = asset_group_utils.create_asset_group(
+                flask_app_client, researcher_1, data.get()
+            )
+    asset_group_guid = resp.json['guid']
+    request.addfinalizer(
+        lambda: asset_group_utils.delete_asset_group(
+            flask_app_client, researcher_1, asset_group_guid
+        )
+    )
+
+    assert detection_started.call_count == 2
+    job_ids = [call[0][2]['params']['jobid'] for call in detection_started.call_args_list]
+    job_sizes = [
+        len(json.loads(call[0][2]['params']['image_uuid_list']))
+        for call in detection_started.call_args_list
+    ]
+    assert job_sizes == [3, 1]
+
+    ags_guids = [ags['guid'] for ags in resp.json['asset_group_sightings']]
+    ags1, ags2 = sorted(
+        (AssetGroupSighting.query.get(guid) for guid in ags_guids),
+        key=lambda ags: len(ags.jobs),
+    )
+    # The first sighting is in the first job only, the second is split over both
+    assert list(ags1.jobs.keys()) == [job_ids[0]]
+    assert ags1.jobs[job_ids[0]]['batch_offset'] == 0
+    assert sorted(ags2.jobs.keys()) == sorted(job_ids)
+    assert ags2.jobs[job_ids[0]]['batch_offset'] == 2
+    assert ags2.jobs[job_ids[1]]['batch_offset'] == 0
+
+    # A retried send resumes, the images already in active jobs are not resent
+    model = ags1.jobs[job_ids[0]]['model']
+    with mock.patch.object(flask_app.acm, 'request_passthrough_result') as resent:
+        AssetGroupSighting.send_detection_batch_to_sage([ags1, ags2], model)
+    assert resent.call_count == 0
+
+    def send_response(job_id, num_images):
+        sage_resp = {
+            'status': 'completed',
+            'jobid': job_id,
+            'json_result': {
+                'image_uuid_list': [
+                    {'__UUID__': str(uuid.uuid4())} for _ in range(num_images)
+                ],
+                'results_list': [
+                    [
+                        {
+                            'uuid': {'__UUID__': str(uuid.uuid4())},
+                            'xtl': 10,
+                            'ytl': 20,
+                            'width': 30,
+                            'height': 40,
+                            'theta': 0.0,
+                            'class': 'zebra',
+                            'viewpoint': 'right',
+                        }
+                    ]
+                    for _ in range(num_images)
+                ],
+            },
+        }
+        with flask_app_client.login(
+            internal_user, auth_scopes=('asset_group_sightings:write',)
+        ):
+            response = flask_app_client.post(
+                f'{asset_group_utils.PATH}{asset_group_guid}/sage_detected/{job_id}',
+                content_type='application/json',
+                data=json.dumps(sage_resp),
+            )
+        assert response.status_code == 200, response.json
+
+    def num_annotations(ags):
+        return Annotation.query.filter(
+            Annotation.asset_guid.in_([asset.guid for asset in ags.get_assets()])
+        ).count()
+
+    send_response(job_ids[0], 3)
+    assert ags1.stage == AssetGroupSightingStage.curation
+    assert ags2.stage == AssetGroupSightingStage.detection
+    assert num_annotations(ags1) == 2
+    assert num_annotations(ags2) == 1
+
+    send_response(job_ids[1], 1)
+    assert ags2.stage == AssetGroupSightingStage.curation
+    assert num_annotations(ags2) == 2
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_group_sightings_detection_batch_failure(
+    flask_app, flask_app_client, researcher_1, internal_user, test_root, request
+):
+    import json
+    import logging
+
+    from app.modules.asset_groups.models import (
+        AssetGroupSighting,
+        AssetGroupSightingJob,
+        AssetGroupSightingJobStatus,
+        AssetGroupSightingStage,
+    )
+    from app.utils import HoustonException
+
+    # The second job, with the rest of the second sighting, fails to start
+    data = asset_group_utils.get_bulk_creation_data(
+        test_root, request, 'african_terrestrial'
+    )
+    with mock.patch.dict(flask_app.config, {'SAGE_DETECTION_BATCH_SIZE': 3}):
+        with mock.patch.object(
+            flask_app.acm,
+            'request_passthrough_result',
+            side_effect=[
+                {'success': True},
+                HoustonException(logging.getLogger(__name__), 'Sage unavailable'),
+            ],
+        ) as detection_started:
+            resp = asset_group_utils.create_asset_group(
+                flask_app_client, researcher_1, data.get()
+            )
+    asset_group_guid = resp.json['guid']
+    request.addfinalizer(
+        lambda: asset_group_utils.delete_asset_group(
+            flask_app_client, researcher_1, asset_group_guid
+        )
+    )
+
+    job_id = detection_started.call_args_list[0][0][2]['params']['jobid']
+    ags_guids = [ags['guid'] for ags in resp.json['asset_group_sightings']]
+    ags1, ags2 = sorted(
+        (AssetGroupSighting.query.get(guid) for guid in ags_guids),
+        key=lambda ags: ags.stage == AssetGroupSightingStage.failed,
+    )
+    # The part of the failed sighting in the job already sent is not waited for
+    assert ags2.stage == AssetGroupSightingStage.failed
+    assert ags2.jobs[job_id]['active'] is False
+    job = AssetGroupSightingJob.query.filter_by(
+        job_guid=uuid.UUID(job_id), asset_group_sighting_guid=ags2.guid
+    ).one()
+    assert job.status == AssetGroupSightingJobStatus.failed
+
+    sage_resp = {
+        'status': 'completed',
+        'jobid': job_id,
+        'json_result': {
+            'image_uuid_list': [{'__UUID__': str(uuid.uuid4())} for _ in range(3)],
+            'results_list': [[] for _ in range(3)],
+        },
+    }
+    with flask_app_client.login(
+        internal_user, auth_scopes=('asset_group_sightings:write',)
+    ):
+        response = flask_app_client.post(
+            f'{asset_group_utils.PATH}{asset_group_guid}/sage_detected/{job_id}',
+            content_type='application/json',
+            data=json.dumps(sage_resp),
+        )
+    assert response.status_code == 200, response.json
+    assert ags1.stage == AssetGroupSightingStage.curation
+    assert ags2.stage == AssetGroupSightingStage.failed
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_group_sighting_encounters_json(
+    flask_app_client, db, researcher_1, test_root, request
+):
+    from app.modules.asset_groups.models import AssetGroupSighting
+
+    data = asset_group_utils.get_bulk_creation_data(test_root, request)
+    resp = asset_group_utils.create_asset_group(
+        flask_app_client, researcher_1, data.get()
+    )
+    asset_group_guid = resp.json['guid']
+    request.addfinalizer(
+        lambda: asset_group_utils.delete_asset_group(
+            flask_app_client, researcher_1, asset_group_guid
+        )
+    )
+    ags = AssetGroupSighting.query.get(resp.json['asset_group_sightings'][0]['guid'])
+
+    encounters_json = ags.get_encounters_json()
+    assert [enc['guid'] for enc in encounters_json] == [
+        enc['guid'] for enc in ags.config['encounters']
+    ]
+    assert all(enc['owner']['guid'] == researcher_1.guid for enc in encounters_json)
+    assert all(enc['annotations'] == [] for enc in encounters_json)
+    # Rendered once and then served from the cache
+    assert ags.get_encounters_json() is encounters_json
+    encounter_guid = encounters_json[0]['guid']
+    assert ags.get_encounter_json(encounter_guid) is encounters_json[0]
+    assert ags.get_encounter_json(str(uuid.uuid4())) is None
+
+    # Changes to the config are rendered, even before they are flushed
+    config = dict(ags.config)
+    config['encounters'] = [dict(enc) for enc in config['encounters']]
+    config['encounters'][0]['decimalLatitude'] = 25.9999
+    ags.config = config
+    assert ags.get_encounter_json(encounter_guid)['decimalLatitude'] == 25.9999
+
+
 @pytest.mark.skipif(
     module_unavailable('asset_groups'), reason='AssetGroups module disabled'
 )
@@ -4,6 +4,7 @@ import os
 import pathlib
 import pytest
 import shutil
+from unittest import mock
 
 from tests.utils import module_unavailable
 from tests.extensions.tus import utils as tus_utils
@@ -48,3 +49,79 @@ def test_create_asset_group_from_tus(flask_app, db, researcher_1, test_root):
     if os.path.exists(sub.get_absolute_path()):
         shutil.rmtree(sub.get_absolute_path())
     sub.delete()
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_group_git_commit_queue(flask_app, db, researcher_1, test_root):
+    from app.modules.asset_groups.models import AssetGroup
+
+    tid, valid_file = tus_utils.prep_tus_dir(test_root)
+    with mock.patch.object(AssetGroup, 'git_commit_pending_delay') as commit_delay:
+        sub = AssetGroup.create_from_tus('PYTEST', researcher_1, tid)
+        # The assets are available before the commit is made
+        assert len(sub.assets) == 1
+        assert sub.assets[0].path == valid_file
+        assert sub.git_state == 'pending'
+        assert commit_delay.call_count == 1
+
+        # Changes queued before the commit runs do not schedule another commit
+        sub.git_commit_delay('Second change')
+        assert commit_delay.call_count == 1
+
+        # The sweep queues the commit again, in case the commit task was lost
+        swept = AssetGroup.git_commit_pending_sweep()
+        assert swept >= 1
+        assert commit_delay.call_count == 1 + swept
+
+    try:
+        repo = sub.get_repository()
+        with mock.patch.object(AssetGroup, 'git_push_delay') as push_delay:
+            assert sub.git_commit_pending()
+            assert push_delay.call_count == 1
+            assert not sub.git_commit_pending()
+        assert sub.git_state == 'committed'
+        assert sub.pending_commit_messages == []
+        assert sub.commit == repo.head.commit.hexsha
+        # The queued changes are coalesced into a single commit
+        assert len(list(repo.iter_commits())) == 1
+        assert repo.head.commit.message.splitlines() == [
+            'Commit of 2 changes',
+            '',
+            '- Tus collect commit for 1 files.',
+            '- Second change',
+        ]
+    finally:
+        if os.path.exists(sub.get_absolute_path()):
+            shutil.rmtree(sub.get_absolute_path())
+        sub.delete()
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_asset_group_get_assets_for_files(flask_app, db, researcher_1, test_root):
+    from app.modules.asset_groups.models import AssetGroup
+
+    tid, valid_file = tus_utils.prep_tus_dir(test_root)
+    tus_utils.prep_tus_dir(test_root, filename='fluke.jpg', transaction_id=tid)
+    sub = AssetGroup.create_from_tus('PYTEST', researcher_1, tid)
+    try:
+        assets = {asset.path: asset for asset in sub.assets}
+        assert sorted(assets) == sorted([valid_file, 'fluke.jpg'])
+
+        # From the loaded assets
+        filenames = ['fluke.jpg', 'missing.jpg', valid_file]
+        expected = [assets['fluke.jpg'], None, assets[valid_file]]
+        assert sub.get_assets_for_files(filenames) == expected
+        assert sub.get_asset_for_file('fluke.jpg') == assets['fluke.jpg']
+
+        # From the database when the assets are not loaded
+        db.session.expire(sub, ['assets'])
+        assert sub.get_assets_for_files(filenames) == expected
+        assert sub.get_asset_for_file('missing.jpg') is None
+    finally:
+        if os.path.exists(sub.get_absolute_path()):
+            shutil.rmtree(sub.get_absolute_path())
+        sub.delete()
@@ -2,6 +2,7 @@
 # pylint: disable=missing-docstring
 import hashlib
 import json
+from unittest import mock
 
 import tests.modules.asset_groups.resources.utils as asset_group_utils
 import tests.modules.assets.resources.utils as asset_utils
@@ -61,6 +62,17 @@ def test_find_asset(
         )
         # Derived files are always jpegs
         assert src_response.content_type == 'image/jpeg'
+        src_response.close()
+
+        # The files are available locally, the git store is left alone
+        from app.modules.asset_groups.models import AssetGroup
+
+        with mock.patch.object(AssetGroup, 'ensure_store') as ensure_store:
+            src_response = asset_utils.read_src_asset(
+                flask_app_client, researcher_1, asset_guid
+            )
+        assert src_response.content_type == 'image/jpeg'
+        assert ensure_store.call_count == 0
     finally:
         # Force the server to release the file handler
         if src_response is not None:
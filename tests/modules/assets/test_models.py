@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import pathlib
 import shutil
 from unittest import mock
@@ -115,6 +116,38 @@ def test_asset_meta_and_delete(flask_app, db, test_root, admin_user, request):
     assert AssetGroup.query.get(asset_group.guid) is None
 
 
+@pytest.mark.skipif(
+    module_unavailable('asset_groups', 'sightings'), reason='AssetGroups module disabled'
+)
+def test_asset_bulk_delete_cascade(flask_app, db, test_root, admin_user, request):
+    from app.modules.annotations.models import Annotation
+    from app.modules.assets.models import Asset
+    from app.modules.asset_groups.models import AssetGroup
+    from app.modules.sightings.models import Sighting, SightingAssets
+
+    asset_group = set_up_assets(flask_app, db, test_root, admin_user, request)
+
+    asset_guids = [a.guid for a in asset_group.assets]
+    annotation = asset_group.assets[0].annotations[0]
+    annotation_guid = annotation.guid
+    sighting = asset_group.assets[0].asset_sightings[0].sighting
+
+    # Delete all assets except the last, in one go
+    Asset.bulk_delete_cascade(asset_guids[:-1])
+    db.session.refresh(asset_group)
+
+    # Assets, annotations and sighting assets should be deleted
+    assert [a.guid for a in asset_group.assets] == asset_guids[-1:]
+    assert Asset.query.filter(Asset.guid.in_(asset_guids[:-1])).count() == 0
+    assert list(SightingAssets.query.filter_by(asset_guid=asset_guids[0])) == []
+    assert Annotation.query.get(annotation_guid) is None
+    assert annotation not in db.session
+
+    # Sighting and asset group are still around
+    assert Sighting.query.get(sighting.guid) is not None
+    assert AssetGroup.query.get(asset_group.guid) is not None
+
+
 @pytest.mark.skipif(
     module_unavailable('asset_groups'), reason='AssetGroups module disabled'
 )
@@ -213,3 +246,56 @@ def test_derived_images_and_rotation(test_asset_group_uuid, request):
     # The original should be still the same
     with Image.open(zebra.get_original_path()) as im:
         assert im.size == (1000, 664)
+
+
+def test_make_derived_images(test_root, tmp_path):
+    from app.modules.assets.models import Asset, make_derived_images
+
+    formats = {
+        format: (str(tmp_path / 'derived' / f'zebra.{format}.jpg'), tuple(size))
+        for format, size in Asset.FORMATS.items()
+    }
+    lock_path = str(tmp_path / 'locks' / 'zebra.lock')
+    source_path = str(test_root / 'zebra.jpg')
+
+    # All formats are made from one decode of the source
+    made = make_derived_images(source_path, formats, lock_path)
+    assert sorted(made) == sorted(Asset.FORMATS)
+    sizes = {}
+    for format, (path, _) in formats.items():
+        with Image.open(path) as im:
+            sizes[format] = im.size
+    assert sizes == {'master': (1000, 664), 'mid': (1000, 664), 'thumb': (256, 170)}
+    # No temporary files are left behind, nor written next to the images
+    assert sorted(os.listdir(tmp_path / 'derived')) == sorted(
+        os.path.basename(path) for path, _ in formats.values()
+    )
+    assert os.listdir(tmp_path / 'locks') == ['zebra.lock']
+
+    # Only missing formats are made
+    assert make_derived_images(source_path, formats, lock_path) == []
+    os.remove(formats['thumb'][0])
+    assert make_derived_images(source_path, formats, lock_path) == ['thumb']
+
+
+@pytest.mark.skipif(
+    module_unavailable('asset_groups'), reason='AssetGroups module disabled'
+)
+def test_update_asset_symlinks_incremental(test_asset_group_uuid):
+    from app.extensions import git_store
+    from app.modules.asset_groups.models import AssetGroup
+
+    asset_group = AssetGroup.query.get(test_asset_group_uuid)
+    assets = sorted(asset_group.assets)
+    asset_group.update_asset_symlinks(verbose=False)
+    assert sorted(asset_group.assets) == assets
+
+    # Unchanged files are not inspected or hashed again
+    with mock.patch('magic.from_file') as from_file:
+        with mock.patch.object(git_store, 'compute_xxhash64_digest_filepath') as compute:
+            asset_group.update_asset_symlinks(verbose=False)
+    assert from_file.call_count == 0
+    assert compute.call_count == 0
+    assert sorted(asset_group.assets) == assets
+    for asset in assets:
+        assert asset.get_symlink().exists()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import uuid
+
+import pytest
+
+from tests.utils import module_unavailable
+
+
+@pytest.mark.skipif(
+    module_unavailable('elasticsearch'), reason='Elasticsearch module disabled'
+)
+def test_index_change_feed(db, researcher_1):
+    from app.modules.elasticsearch.models import IndexChange
+    from app.modules.encounters.models import Encounter
+    from app.modules.individuals.models import Individual
+
+    def recorded_changes():
+        return {(change.index_type, change.guid) for change in IndexChange.query.all()}
+
+    IndexChange.forget([change.id for change in IndexChange.query.all()])
+
+    individual = Individual()
+    encounter = Encounter(
+        owner=researcher_1,
+        individual=individual,
+        asset_group_sighting_encounter_guid=uuid.uuid4(),
+    )
+    try:
+        with db.session.begin():
+            db.session.add(individual)
+            db.session.add(encounter)
+
+        # The encounter and the individual embedding it need reindexing
+        assert recorded_changes() == {
+            ('encounter', encounter.guid),
+            ('individual', individual.guid),
+        }
+
+        # Draining the feed removes only the processed changes
+        changes = IndexChange.get_batch(1)
+        assert len(changes) == 1
+        IndexChange.forget([changes[0].id])
+        assert len(recorded_changes()) == 1
+
+        # Moving the encounter off the individual reindexes the old individual
+        IndexChange.forget([change.id for change in IndexChange.query.all()])
+        with db.session.begin():
+            encounter.individual = None
+        assert recorded_changes() == {
+            ('encounter', encounter.guid),
+            ('individual', individual.guid),
+        }
+    finally:
+        with db.session.begin():
+            db.session.delete(encounter)
+            db.session.delete(individual)
+        IndexChange.forget([change.id for change in IndexChange.query.all()])
@@ -163,6 +163,43 @@ def test_User_find_with_password(
         db.session.delete(user2)
 
 
+def test_User_query_search(
+    patch_User_password_scheme, db
+):  # pylint: disable=unused-argument
+    user1 = models.User(
+        email='search1@localhost',
+        password='user1password',
+        full_name='Ada Lovelace',
+        affiliation='Analytical Engines',
+    )
+    user2 = models.User(
+        email='search2@localhost',
+        password='user2password',
+        full_name='Charles Babbage',
+    )
+    with db.session.begin():
+        db.session.add(user1)
+        db.session.add(user2)
+
+    index_names = {index.name for index in models.User.__table__.indexes}
+    assert 'ix_user_search_trgm' in index_names
+
+    try:
+        # Terms match any column, every term must match
+        assert models.User.query_search('Lovelace').all() == [user1]
+        assert models.User.query_search('Engines').all() == [user1]
+        assert models.User.query_search('search2@').all() == [user2]
+        assert set(models.User.query_search('search').all()) >= {user1, user2}
+        assert models.User.query_search('search, Babbage').all() == [user2]
+        # Terms do not match across column boundaries
+        assert models.User.query_search('Lovelace Analytical').all() == [user1]
+        assert models.User.query_search('LovelaceAnalytical').all() == []
+    finally:
+        with db.session.begin():
+            db.session.delete(user1)
+            db.session.delete(user2)
+
+
 def test_User_must_have_password():
     with pytest.raises(ValueError, match='User must have a password'):
         user = models.User(email='user1@localhost', full_name='Lord Lucan')